@@ -24,7 +24,7 @@ import zipfile
 from pathlib import Path
 import shutil
 import plotly.express as px
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.table import Table, TableStyleInfo
@@ -34,9 +34,14 @@ from email.mime.text import MIMEText
 from contextlib import contextmanager
 import time
 import json
-from typing import Union, Dict, List, Any, Optional, Tuple
+from typing import Callable, NamedTuple, Union, Dict, List, Any, Optional, Tuple
 import logging
 import gc
+import threading
+import functools
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
 import psutil  # For memory checking
 
 
@@ -54,37 +59,495 @@ SMTP_SERVER = "smtp.example.com"  # e.g., "smtp.gmail.com"
 SMTP_PORT = 587  # Typical port for TLS
 SMTP_USERNAME = "your_email@example.com"
 SMTP_PASSWORD = "your_email_password"
+SMTP_POOL_SIZE = 3  # Concurrent SMTP sessions used for bulk email
+SMTP_USE_SSL = False  # Implicit TLS (SMTP_SSL, usually port 465) instead of STARTTLS
+SMTP_USE_TLS = True  # Require STARTTLS; only disable for a local test server
+EMAIL_RATE_PER_SECOND = 5.0  # Provider send limit; None for no limit
+EMAIL_MAX_ATTEMPTS = 3  # Per recipient, for transient failures
+EMAIL_RETRY_DELAY = 30.0  # Seconds before the first retry, doubling after
+
+DB_PATH = "student_registration.db"
 
 if not os.path.exists("uploads"):
     os.makedirs("uploads")
 
 
-@contextmanager
-def get_db_connection(max_retries=5, retry_delay=1):
+#####################################
+# Pooled SQLite Connection Provider #
+#####################################
+
+
+class RetryingCursor(sqlite3.Cursor):
+    """
+    Cursor that retries statements failing with "database is locked"/"busy"
+    so that every query in the module gets the same lock handling.
+    """
+
+    def execute(self, sql, parameters=()):
+        return self.connection._with_lock_retry(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.connection._with_lock_retry(
+            super().executemany, sql, seq_of_parameters
+        )
+
+    def executescript(self, sql_script):
+        return self.connection._with_lock_retry(super().executescript, sql_script)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection handed out by ConnectionPool.
+
+    It is a real sqlite3.Connection subclass (so pandas.read_sql_query and
+    DataFrame.to_sql keep working), but close() returns it to the pool
+    instead of tearing it down.
+    """
+
+    _pool = None
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or RetryingCursor)
+
+    # The C-level Connection.execute* shortcuts bypass cursor methods, so
+    # route them through RetryingCursor explicitly.
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        return self._with_lock_retry(super().commit)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            super().close()
+
+    def _with_lock_retry(self, func, *args):
+        attempt = 0
+        while True:
+            try:
+                return func(*args)
+            except sqlite3.OperationalError as e:
+                message = str(e)
+                retryable = "database is locked" in message or "busy" in message
+                if not retryable or self._pool is None:
+                    raise
+                attempt += 1
+                if attempt > self._pool.max_lock_retries:
+                    raise
+                self._pool._record("lock_retries")
+                time.sleep(min(self._pool.retry_delay * (2 ** (attempt - 1)), 2.0))
+
+
+class ConnectionPool:
     """
-    Context manager for database connections with retry mechanism
-    for handling locked database situations.
+    Thread-aware pool of tuned SQLite connections for a single database file.
+
+    - A thread that already holds a connection gets the same one back
+      (re-entrant), so nested helpers never open a second writer.
+    - Idle connections are reused instead of paying connection setup and
+      PRAGMA cost on every Streamlit rerun.
+    - Connections checked out by threads that have since died are reclaimed.
     """
-    attempt = 0
-    while attempt < max_retries:
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-20000",  # ~20MB page cache per connection
+        "PRAGMA mmap_size=268435456",  # 256MB memory-mapped I/O
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    def __init__(
+        self,
+        db_path: str,
+        max_connections: int = 8,
+        busy_timeout_ms: int = 20000,
+        cached_statements: int = 256,
+        wait_timeout: float = 10.0,
+        max_lock_retries: int = 5,
+        retry_delay: float = 0.1,
+    ):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.wait_timeout = wait_timeout
+        self.max_lock_retries = max_lock_retries
+        self.retry_delay = retry_delay
+
+        self._idle = []
+        self._checked_out = {}
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "reentrant": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "lock_retries": 0,
+            "reclaimed": 0,
+            "overflow": 0,
+        }
+
+    def _record(self, key, amount=1):
+        with self._cond:
+            self._metrics[key] += amount
+
+    def _create_connection(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=PooledConnection,
+        )
+        conn._pool = self
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _reclaim_dead_threads(self):
+        """Return connections held by threads that no longer exist (caller holds lock)."""
+        for conn_id, (conn, owner) in list(self._checked_out.items()):
+            if not owner.is_alive():
+                del self._checked_out[conn_id]
+                self._reset(conn)
+                self._idle.append(conn)
+                self._metrics["reclaimed"] += 1
+
+    @staticmethod
+    def _reset(conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            pass
+        conn.row_factory = None
+
+    def acquire(self) -> PooledConnection:
+        held = getattr(self._local, "conn", None)
+        if held is not None and id(held) in self._checked_out:
+            self._local.depth += 1
+            self._record("reentrant")
+            return held
+
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+        wait_started = time.monotonic()
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._metrics["hits"] += 1
+                    break
+                if len(self._checked_out) < self.max_connections:
+                    conn = None
+                    self._metrics["misses"] += 1
+                    break
+                self._reclaim_dead_threads()
+                if self._idle:
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Never block a request forever; open an extra connection.
+                    conn = None
+                    self._metrics["overflow"] += 1
+                    break
+                if not waited:
+                    waited = True
+                    self._metrics["waits"] += 1
+                self._cond.wait(remaining)
+            if waited:
+                self._metrics["wait_time"] += time.monotonic() - wait_started
+
+        if conn is None:
+            conn = self._create_connection()
+
+        with self._cond:
+            self._checked_out[id(conn)] = (conn, threading.current_thread())
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: PooledConnection):
+        if getattr(self._local, "conn", None) is conn:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.conn = None
+
+        self._reset(conn)
+        with self._cond:
+            if self._checked_out.pop(id(conn), None) is None:
+                return
+            if len(self._idle) < self.max_connections:
+                self._idle.append(conn)
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            sqlite3.Connection.close(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
         try:
-            conn = sqlite3.connect("student_registration.db", timeout=20)
-            conn.row_factory = sqlite3.Row
             yield conn
+        finally:
             conn.close()
-            break
-        except sqlite3.OperationalError as e:
-            if "database is locked" in str(e):
-                attempt += 1
-                if attempt == max_retries:
-                    raise
-                time.sleep(retry_delay)
-            else:
-                raise
+
+    def checkpoint(self, mode: str = "TRUNCATE"):
+        """Fold the WAL back into the main database file (used before file copies)."""
+        with self.connection() as conn:
+            conn.execute(f"PRAGMA wal_checkpoint({mode})")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._metrics)
+            stats["in_use"] = len(self._checked_out)
+            stats["idle"] = len(self._idle)
+        requests = stats["hits"] + stats["misses"] + stats["reentrant"]
+        stats["hit_rate"] = (
+            (stats["hits"] + stats["reentrant"]) / requests if requests else 0.0
+        )
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+
+_connection_pools: Dict[str, ConnectionPool] = {}
+_connection_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path: str = DB_PATH) -> ConnectionPool:
+    """Return the process-wide pool for db_path, creating it on first use."""
+    key = os.path.abspath(db_path)
+    with _connection_pools_lock:
+        pool = _connection_pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _connection_pools[key] = pool
+        return pool
 
 
-def init_db():
-    conn = sqlite3.connect("student_registration.db")
+def discard_connection_pool(db_path: str):
+    """Close and forget the pool for db_path (scratch/benchmark databases)."""
+    with _connection_pools_lock:
+        pool = _connection_pools.pop(os.path.abspath(db_path), None)
+    if pool is not None:
+        pool.close_all()
+
+
+def connect_db(db_path: str = DB_PATH) -> PooledConnection:
+    """
+    Drop-in replacement for sqlite3.connect(): returns a pooled, tuned
+    connection. Calling close() on it hands it back to the pool.
+    """
+    return get_connection_pool(db_path).acquire()
+
+
+@contextmanager
+def get_db_connection(max_retries=5, retry_delay=1):
+    """
+    Context manager for pooled database connections. Retrying on
+    "database is locked" is handled by the pooled connection itself; the
+    arguments are kept for existing callers.
+    """
+    conn = connect_db()
+    previous_factory = conn.row_factory
+    try:
+        conn.row_factory = sqlite3.Row
+        yield conn
+    finally:
+        conn.row_factory = previous_factory
+        conn.close()
+
+
+###############
+# Query Cache #
+###############
+
+QUERY_CACHE_TTL = 60  # Seconds a cached result may be served
+QUERY_CACHE_MAX_ENTRIES = 1024
+
+
+class QueryCache:
+    """
+    Process-wide in-memory LRU of read-mostly query results.
+
+    Entries expire after a TTL and are tagged with the tables they were
+    read from; write paths call invalidate(table) after committing so the
+    next read reloads. The TTL bounds staleness for writers that do not.
+    Cached values are copied on the way out, so callers may modify them.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl: float = QUERY_CACHE_TTL):
+        from collections import OrderedDict
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tables, value)
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by invalidate(); guards in-flight loads
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "invalidated": 0, "evicted": 0}
+
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, pd.DataFrame):
+            return value.copy()
+        if isinstance(value, (dict, list, set)):
+            return type(value)(value)
+        return value
+
+    def get_or_load(self, key, tables, loader: Callable, ttl: Optional[float] = None):
+        """
+        Cached value for key, calling loader() on a miss.
+
+        Args:
+            key: Hashable cache key
+            tables: Tables the value is read from (invalidation tags)
+            loader: Zero-argument callable producing the value
+            ttl: Seconds to keep the value (default: the cache TTL)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.metrics["hits"] += 1
+                    return self._copy(entry[2])
+                del self._entries[key]
+                self.metrics["expired"] += 1
+            self.metrics["misses"] += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            # Skip storing if a write invalidated the cache while loading
+            if generation == self._generation:
+                self._entries[key] = (
+                    now + (self.ttl if ttl is None else ttl),
+                    frozenset(tables),
+                    value,
+                )
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.metrics["evicted"] += 1
+        return self._copy(value)
+
+    def invalidate(self, *tables: str):
+        """Drops entries read from any of tables (every entry if none given)"""
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key
+                for key, (_, entry_tables, _) in self._entries.items()
+                if not tables or entry_tables.intersection(tables)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.metrics["invalidated"] += len(stale)
+
+    def cached(self, *tables: str, ttl: Optional[float] = None):
+        """Decorator caching a function's results by its arguments"""
+
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+                return self.get_or_load(key, tables, lambda: func(*args, **kwargs), ttl)
+
+            wrapper.uncached = func
+            return wrapper
+
+        return decorate
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and the number of entries"""
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                **self.metrics,
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+query_cache = QueryCache()
+
+
+def invalidate_query_cache(*tables: str):
+    """Write-path hook: call after committing changes to tables"""
+    query_cache.invalidate(*tables)
+
+
+@query_cache.cached("student_info")
+def get_student_programmes() -> List[str]:
+    """Distinct non-empty programmes of students"""
+    conn = connect_db()
+    try:
+        return [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT programme FROM student_info WHERE programme IS NOT NULL AND programme != ''"
+            )
+        ]
+    finally:
+        conn.close()
+
+
+@query_cache.cached("course_registration")
+def get_registered_programmes() -> List[str]:
+    """Distinct programmes that have course registrations"""
+    conn = connect_db()
+    try:
+        return [
+            row[0]
+            for row in conn.execute(
+                "SELECT DISTINCT programme FROM course_registration WHERE programme IS NOT NULL"
+            )
+        ]
+    finally:
+        conn.close()
+
+
+@query_cache.cached("student_info")
+def get_student_options(approved_only: bool = False) -> pd.DataFrame:
+    """student_id, surname and other_names of every student, by name"""
+    where = "WHERE approval_status = 'approved'" if approved_only else ""
+    conn = connect_db()
+    try:
+        return pd.read_sql_query(
+            f"""
+            SELECT student_id, surname, other_names
+            FROM student_info
+            {where}
+            ORDER BY surname, other_names
+            """,
+            conn,
+        )
+    finally:
+        conn.close()
+
+
+def init_db(db_path=DB_PATH):
+    conn = connect_db(db_path)
     c = conn.cursor()
 
     # Create admin table
@@ -148,11 +611,6 @@ def init_db():
         """
     )
 
-    try:
-        c.execute("SELECT programme FROM student_info LIMIT 1")
-    except sqlite3.OperationalError:
-        c.execute("ALTER TABLE student_info ADD COLUMN programme TEXT")
-
     c.execute(
         """
         CREATE TABLE IF NOT EXISTS course_registration (
@@ -206,18 +664,270 @@ def init_db():
     conn.commit()
     conn.close()
 
+    # Bring older databases up to date (missing columns, indexes, ...)
+    DatabaseMigrationHandler(db_path).apply_migrations()
+
 
 import sqlite3
 import pandas as pd
 import json
 from datetime import datetime
 import os
+import random
 import shutil
+import statistics
+import tempfile
+import tracemalloc
 import zipfile
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional
 import logging
 
 
+def _add_column_if_missing(conn, table: str, column: str, declaration: str):
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+# Course registration items
+#
+# course_registration.courses keeps the legacy "CODE|TITLE|CREDITS" lines
+# (one per course); course_registration_items holds the same data one row
+# per course so enrolment and credit aggregates can run in SQL.
+
+INSERT_REGISTRATION_ITEM_SQL = """
+    INSERT INTO course_registration_items
+        (registration_id, position, course_code, course_title, credits)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def parse_course_lines(courses_text) -> List[tuple]:
+    """
+    Splits a legacy courses value into (course_code, course_title, credits)
+    tuples, skipping blank or malformed lines.
+    """
+    items = []
+    if not courses_text or not isinstance(courses_text, str):
+        return items
+    for line in courses_text.split("\n"):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) != 3 or not parts[0]:
+            continue
+        code, title, credits = parts
+        try:
+            credits = int(float(credits))
+        except ValueError:
+            credits = 0
+        items.append((code, title, credits))
+    return items
+
+
+def sync_registration_items(conn, registration_id, courses_text):
+    """
+    Rewrites the course_registration_items rows of one registration from its
+    courses text. Runs inside the caller's transaction.
+    """
+    conn.execute(
+        "DELETE FROM course_registration_items WHERE registration_id = ?",
+        (registration_id,),
+    )
+    conn.executemany(
+        INSERT_REGISTRATION_ITEM_SQL,
+        [
+            (registration_id, position, code, title, credits)
+            for position, (code, title, credits) in enumerate(
+                parse_course_lines(courses_text)
+            )
+        ],
+    )
+
+
+def rebuild_registration_items(conn):
+    """Backfills course_registration_items from every registration's courses text."""
+    rows = conn.execute(
+        "SELECT registration_id, courses FROM course_registration "
+        "WHERE courses IS NOT NULL AND courses != ''"
+    ).fetchall()
+    conn.execute("DELETE FROM course_registration_items")
+    conn.executemany(
+        INSERT_REGISTRATION_ITEM_SQL,
+        (
+            (registration_id, position, code, title, credits)
+            for registration_id, courses in rows
+            for position, (code, title, credits) in enumerate(
+                parse_course_lines(courses)
+            )
+        ),
+    )
+
+
+# Student full-text search
+#
+# student_search is an external-content FTS5 index over student_info kept in
+# sync by triggers. Its rows are linked to student_info by rowid, so it has to
+# be rebuilt (ensure_student_search_index) after anything that rewrites the
+# table wholesale, such as a database import or VACUUM.
+
+STUDENT_SEARCH_COLUMNS = [
+    "student_id",
+    "surname",
+    "other_names",
+    "email",
+    "telephone",
+    "ghana_card_id",
+    "programme",
+]
+
+# bm25() column weights, in STUDENT_SEARCH_COLUMNS order
+STUDENT_SEARCH_WEIGHTS = (10.0, 5.0, 5.0, 2.0, 2.0, 2.0, 1.0)
+
+
+def fts5_available(conn) -> bool:
+    """True when the linked SQLite library was built with FTS5"""
+    return any(row[0] == "ENABLE_FTS5" for row in conn.execute("PRAGMA compile_options"))
+
+
+def student_search_available(conn) -> bool:
+    """True when the student_search index exists in this database"""
+    return (
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_search'"
+        ).fetchone()
+        is not None
+    )
+
+
+def ensure_student_search_index(conn):
+    """
+    Creates the student_search FTS5 table and its sync triggers if missing,
+    then rebuilds its contents from student_info. Does nothing when SQLite
+    has no FTS5 support (searches then fall back to LIKE).
+    """
+    if not fts5_available(conn):
+        return
+    columns = ", ".join(STUDENT_SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in STUDENT_SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in STUDENT_SEARCH_COLUMNS)
+
+    conn.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS student_search USING fts5(
+            {columns},
+            content='student_info',
+            content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS student_search_ai AFTER INSERT ON student_info
+        BEGIN
+            INSERT INTO student_search (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS student_search_ad AFTER DELETE ON student_info
+        BEGIN
+            INSERT INTO student_search (student_search, rowid, {columns})
+            VALUES ('delete', old.rowid, {old_values});
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS student_search_au
+        AFTER UPDATE OF {columns} ON student_info
+        BEGIN
+            INSERT INTO student_search (student_search, rowid, {columns})
+            VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO student_search (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+        """
+    )
+    conn.execute("INSERT INTO student_search (student_search) VALUES ('rebuild')")
+
+
+def build_fts_query(phrase: str) -> str:
+    """
+    Turns free text into an FTS5 prefix query: every word typed must match
+    the beginning of a token. Returns "" when nothing searchable is left.
+    """
+    terms = []
+    for word in phrase.split():
+        if not any(ch.isalnum() for ch in word):
+            continue
+        terms.append('"{}"*'.format(word.replace('"', '""')))
+    return " ".join(terms)
+
+
+def student_search_subquery() -> str:
+    """
+    SELECT over student_search yielding (search_rowid, search_rank) for one
+    MATCH parameter; lower search_rank is a better match.
+    """
+    weights = ", ".join(str(weight) for weight in STUDENT_SEARCH_WEIGHTS)
+    return f"""
+        SELECT rowid AS search_rowid, bm25(student_search, {weights}) AS search_rank
+        FROM student_search
+        WHERE student_search MATCH ?
+    """
+
+
+def _sqlite_arrow_type(declared: str):
+    """Arrow type for a column, from its declared SQLite type (affinity rules)"""
+    import pyarrow as pa
+
+    declared = (declared or "").upper()
+    if "INT" in declared or "BOOL" in declared:
+        return pa.int64()
+    if any(name in declared for name in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+def _arrow_cell(value, arrow_type):
+    """
+    Coerces a SQLite value to arrow_type. SQLite columns can hold values of
+    any type; ones that do not fit a numeric column become None.
+    """
+    import pyarrow as pa
+
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type):
+        return value.hex() if isinstance(value, bytes) else str(value)
+    try:
+        if pa.types.is_integer(arrow_type):
+            return int(value) if isinstance(value, int) else int(float(value))
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def snapshot_database(db_path: str, snapshot_path: str):
+    """
+    Writes a consistent copy of the live database to snapshot_path with
+    SQLite's online backup API; writers are only paused between steps.
+    """
+    conn = connect_db(db_path)
+    try:
+        target = sqlite3.connect(snapshot_path)
+        try:
+            conn.backup(target, pages=4096)
+            # A standalone file should not expect a WAL next to it
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+    finally:
+        conn.close()
+
+
 class DatabaseMigrationHandler:
     """
     Handles database migrations, exports, and imports while maintaining data consistency
@@ -225,6 +935,21 @@ class DatabaseMigrationHandler:
 
     SCHEMA_VERSION = "1.0"
 
+    EXPORT_FORMAT = "sqlite-backup"
+    SNAPSHOT_NAME = "database.sqlite"
+
+    # Tables carried by database exports, parents before children
+    EXPORT_TABLES = [
+        "student_info",
+        "course_registration",
+        "course_registration_items",
+        "notifications",
+        "notification_reads",
+    ]
+
+    # Rows per batch when streaming tables out of or into a snapshot
+    COPY_BATCH_ROWS = 10_000
+
     # Define the expected schema for each table
     SCHEMAS = {
         "student_info": {
@@ -287,128 +1012,755 @@ class DatabaseMigrationHandler:
         },
     }
 
-    def __init__(self, db_path: str, backup_dir: str = "db_backups"):
-        self.db_path = db_path
-        self.backup_dir = backup_dir
-        self.logger = self._setup_logger()
-
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-
-    def _setup_logger(self) -> logging.Logger:
-        """Sets up logging configuration"""
-        logger = logging.getLogger("DatabaseMigration")
-        logger.setLevel(logging.INFO)
-        handler = logging.FileHandler("db_migration.log")
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        return logger
-
-    def backup_database(self) -> str:
-        """Creates a backup of the current database"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(self.backup_dir, f"backup_{timestamp}.db")
-        shutil.copy2(self.db_path, backup_path)
-        self.logger.info(f"Database backed up to {backup_path}")
-        return backup_path
-
-    def export_database(self, export_path: str) -> str:
-        """
-        Exports the database to a zip file containing:
-        - Excel files for each table
-        - JSON schema file
-        - Metadata file
-        """
-        try:
-            # Create a temporary directory for export files
-            temp_dir = "temp_export"
-            if not os.path.exists(temp_dir):
-                os.makedirs(temp_dir)
-
-            conn = sqlite3.connect(self.db_path)
-
-            # Export each table to Excel
-            for table_name in self.SCHEMAS.keys():
-                df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
-                excel_path = os.path.join(temp_dir, f"{table_name}.xlsx")
-                df.to_excel(excel_path, index=False)
-
-            # Create metadata file
-            metadata = {
-                "schema_version": self.SCHEMA_VERSION,
-                "export_date": datetime.now().isoformat(),
-                "tables": list(self.SCHEMAS.keys()),
-            }
-            with open(os.path.join(temp_dir, "metadata.json"), "w") as f:
-                json.dump(metadata, f)
-
-            # Create schema file
-            with open(os.path.join(temp_dir, "schema.json"), "w") as f:
-                json.dump(self.SCHEMAS, f)
-
-            # Create zip file
-            with zipfile.ZipFile(export_path, "w") as zipf:
-                for root, _, files in os.walk(temp_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.basename(file_path)
-                        zipf.write(file_path, arcname)
-
-            self.logger.info(f"Database exported to {export_path}")
-            return export_path
-
-        except Exception as e:
-            self.logger.error(f"Export failed: {str(e)}")
-            raise
-
-        finally:
-            if "conn" in locals():
-                conn.close()
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-
-    def import_database(self, import_path: str, validate: bool = True) -> bool:
-        """
-        Imports database from a zip file while maintaining data consistency
-        """
-        try:
-            # Create temporary directory for import
-            temp_dir = "temp_import"
-            if not os.path.exists(temp_dir):
-                os.makedirs(temp_dir)
-
-            # Extract zip file
-            with zipfile.ZipFile(import_path, "r") as zipf:
-                zipf.extractall(temp_dir)
-
-            # Validate import data
-            if validate:
-                self._validate_import(temp_dir)
-
-            # Create backup before import
-            self.backup_database()
-
-            # Import data
-            conn = sqlite3.connect(self.db_path)
-            for table_name in self.SCHEMAS.keys():
-                excel_path = os.path.join(temp_dir, f"{table_name}.xlsx")
-                if os.path.exists(excel_path):
-                    df = pd.read_excel(excel_path)
-                    df.to_sql(table_name, conn, if_exists="replace", index=False)
+    # Secondary indexes backing the hot admin/portal queries: (name, table, columns)
+    SECONDARY_INDEXES = [
+        # Pending/approved lists read only these columns, so the index covers them
+        (
+            "idx_student_info_status",
+            "student_info",
+            "approval_status, surname, other_names, student_id",
+        ),
+        ("idx_student_info_programme_status", "student_info", "programme, approval_status"),
+        ("idx_student_info_surname", "student_info", "surname, other_names"),
+        ("idx_student_info_created_at", "student_info", "created_at"),
+        ("idx_student_info_gender", "student_info", "gender"),
+        (
+            "idx_course_registration_student",
+            "course_registration",
+            "student_id, date_registered",
+        ),
+        (
+            "idx_course_registration_programme_level",
+            "course_registration",
+            "programme, level, semester",
+        ),
+        ("idx_course_registration_status", "course_registration", "approval_status"),
+        ("idx_course_registration_date", "course_registration", "date_registered"),
+        # One index range per recipient type, newest first (cursor pagination)
+        (
+            "idx_notifications_audience",
+            "notifications",
+            "recipient_type, recipient_id, notification_id",
+        ),
+        ("idx_notifications_expires", "notifications", "expires_at"),
+        (
+            "idx_notification_reads_student",
+            "notification_reads",
+            "student_id, notification_id",
+        ),
+        # Keyset pagination orderings: (sort column, unique key)
+        ("idx_student_info_surname_key", "student_info", "surname, student_id"),
+        ("idx_student_info_created_key", "student_info", "created_at, student_id"),
+        ("idx_student_info_programme_key", "student_info", "programme, student_id"),
+        # registration_id is the rowid, so single-column indexes already end with it
+        ("idx_course_registration_student_key", "course_registration", "student_id"),
+        ("idx_course_registration_programme", "course_registration", "programme"),
+    ]
 
-            self.logger.info("Database import completed successfully")
-            return True
+    # Numbered schema migrations, applied in order by apply_migrations().
+    # Each entry is (version, description, steps); a step is either an SQL
+    # statement or a callable that receives the open connection.
+    MIGRATIONS = [
+        (
+            1,
+            "Add student_info.programme",
+            [
+                lambda conn: _add_column_if_missing(
+                    conn, "student_info", "programme", "TEXT"
+                )
+            ],
+        ),
+        (
+            2,
+            "Add student portal authentication columns",
+            [
+                lambda conn: _add_column_if_missing(
+                    conn, "student_info", "password", "TEXT"
+                ),
+                lambda conn: _add_column_if_missing(
+                    conn, "student_info", "last_login", "DATETIME"
+                ),
+                lambda conn: _add_column_if_missing(
+                    conn, "student_info", "password_reset_required", "BOOLEAN DEFAULT 1"
+                ),
+            ],
+        ),
+        (
+            3,
+            "Create secondary indexes for hot queries",
+            [
+                lambda conn: DatabaseMigrationHandler.create_secondary_indexes(conn),
+                "ANALYZE",
+            ],
+        ),
+        (
+            4,
+            "Normalize registered courses into course_registration_items",
+            [
+                """
+                CREATE TABLE IF NOT EXISTS course_registration_items (
+                    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    registration_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL DEFAULT 0,
+                    course_code TEXT NOT NULL,
+                    course_title TEXT,
+                    credits INTEGER DEFAULT 0,
+                    FOREIGN KEY (registration_id)
+                        REFERENCES course_registration (registration_id)
+                        ON DELETE CASCADE
+                )
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS idx_registration_items_registration
+                ON course_registration_items (registration_id, position)
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS idx_registration_items_course
+                ON course_registration_items (course_code, registration_id, credits)
+                """,
+                rebuild_registration_items,
+                "ANALYZE course_registration_items",
+            ],
+        ),
+        (
+            5,
+            "Create student_search full-text index",
+            [ensure_student_search_index],
+        ),
+        (
+            6,
+            "Create keyset pagination indexes",
+            [
+                lambda conn: DatabaseMigrationHandler.create_secondary_indexes(conn),
+                "ANALYZE",
+            ],
+        ),
+        (
+            7,
+            "Create background jobs table",
+            [
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_type TEXT NOT NULL,
+                    title TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    params TEXT,
+                    progress_done INTEGER DEFAULT 0,
+                    progress_total INTEGER,
+                    message TEXT,
+                    result TEXT,
+                    result_path TEXT,
+                    error TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    started_at DATETIME,
+                    updated_at DATETIME,
+                    finished_at DATETIME
+                )
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS idx_jobs_status
+                ON jobs (status, job_id)
+                """,
+            ],
+        ),
+        (
+            8,
+            "Create email outbox tables",
+            [
+                """
+                CREATE TABLE IF NOT EXISTS email_batches (
+                    batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    subject TEXT,
+                    body TEXT,
+                    attachment_path TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    outbox_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    batch_id INTEGER NOT NULL REFERENCES email_batches (batch_id),
+                    recipient TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    next_attempt_at DATETIME,
+                    sent_at DATETIME
+                )
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS idx_email_outbox_batch_status
+                ON email_outbox (batch_id, status)
+                """,
+            ],
+        ),
+        (
+            9,
+            "Add notification audience indexes and unread counters",
+            [
+                """
+                CREATE TABLE IF NOT EXISTS notification_counters (
+                    student_id TEXT PRIMARY KEY,
+                    unread INTEGER NOT NULL DEFAULT 0
+                )
+                """,
+                "DROP INDEX IF EXISTS idx_notifications_recipient",
+                lambda conn: DatabaseMigrationHandler.create_secondary_indexes(conn),
+                # A programme change alters which broadcasts a student gets;
+                # dropping the counter row makes it recount on next use.
+                """
+                CREATE TRIGGER IF NOT EXISTS notification_counters_programme
+                AFTER UPDATE OF programme ON student_info
+                WHEN OLD.programme IS NOT NEW.programme
+                BEGIN
+                    DELETE FROM notification_counters WHERE student_id = NEW.student_id;
+                END
+                """,
+                """
+                CREATE TRIGGER IF NOT EXISTS notification_counters_student_delete
+                AFTER DELETE ON student_info
+                BEGIN
+                    DELETE FROM notification_counters WHERE student_id = OLD.student_id;
+                END
+                """,
+            ],
+        ),
+        (
+            10,
+            "Create pre-aggregated report statistics",
+            [
+                """
+                CREATE TABLE IF NOT EXISTS report_stats (
+                    source TEXT NOT NULL,
+                    dimension TEXT NOT NULL,
+                    key1 TEXT NOT NULL DEFAULT '',
+                    key2 TEXT NOT NULL DEFAULT '',
+                    key3 TEXT NOT NULL DEFAULT '',
+                    records INTEGER NOT NULL DEFAULT 0,
+                    with_receipt INTEGER NOT NULL DEFAULT 0,
+                    amount REAL NOT NULL DEFAULT 0,
+                    receipt_amount REAL NOT NULL DEFAULT 0,
+                    credits REAL NOT NULL DEFAULT 0,
+                    credit_rows INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source, dimension, key1, key2, key3)
+                ) WITHOUT ROWID
+                """,
+                # Receipt amount range for the payment dashboard
+                """
+                CREATE INDEX IF NOT EXISTS idx_student_info_receipt_amount
+                ON student_info (COALESCE(receipt_amount, 0))
+                WHERE receipt_path IS NOT NULL
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS idx_course_registration_receipt_amount
+                ON course_registration (COALESCE(receipt_amount, 0))
+                WHERE receipt_path IS NOT NULL
+                """,
+                lambda conn: rebuild_report_stats(conn),
+            ],
+        ),
+        (
+            11,
+            "Store uploads by content hash",
+            [
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    sha256 TEXT PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE,
+                    size INTEGER NOT NULL,
+                    mime TEXT,
+                    refcount INTEGER NOT NULL DEFAULT 0,
+                    owner TEXT,
+                    original_name TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_documents_owner ON documents (owner)",
+                lambda conn: migrate_uploads_to_store(conn),
+                lambda conn: rebuild_document_refcounts(conn),
+            ],
+        ),
+        (
+            12,
+            "Add upload garbage collector state",
+            [
+                """
+                CREATE TABLE IF NOT EXISTS upload_gc_state (
+                    root TEXT PRIMARY KEY,
+                    cursor TEXT NOT NULL DEFAULT '',
+                    passes INTEGER NOT NULL DEFAULT 0,
+                    updated_at DATETIME
+                )
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS upload_quarantine (
+                    quarantine_path TEXT PRIMARY KEY,
+                    original_path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    quarantined_at DATETIME NOT NULL
+                )
+                """,
+                """
+                CREATE INDEX IF NOT EXISTS idx_upload_quarantine_quarantined_at
+                ON upload_quarantine (quarantined_at)
+                """,
+                """
+                CREATE TABLE IF NOT EXISTS upload_gc_runs (
+                    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_at DATETIME NOT NULL,
+                    scanned INTEGER NOT NULL,
+                    quarantined INTEGER NOT NULL,
+                    restored INTEGER NOT NULL,
+                    deleted INTEGER NOT NULL,
+                    bytes_quarantined INTEGER NOT NULL,
+                    bytes_reclaimed INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    cursor TEXT
+                )
+                """,
+            ],
+        ),
+    ]
+
+    def __init__(self, db_path: str, backup_dir: str = "db_backups"):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.logger = self._setup_logger()
+
+        if not os.path.exists(backup_dir):
+            os.makedirs(backup_dir)
+
+    def _setup_logger(self) -> logging.Logger:
+        """Sets up logging configuration"""
+        logger = logging.getLogger("DatabaseMigration")
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            handler = logging.FileHandler("db_migration.log")
+            formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        return logger
+
+    @classmethod
+    def create_secondary_indexes(cls, conn):
+        """Creates every index in SECONDARY_INDEXES that does not exist yet"""
+        for name, table, columns in cls.SECONDARY_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+    @classmethod
+    def drop_secondary_indexes(cls, conn):
+        """Drops every index in SECONDARY_INDEXES (used by benchmarks)"""
+        for name, _, _ in cls.SECONDARY_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def get_migration_version(self) -> int:
+        """Returns the number of the last migration applied to the database"""
+        conn = connect_db(self.db_path)
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    def apply_migrations(self) -> List[int]:
+        """
+        Applies pending migrations in order. Each migration runs in its own
+        IMMEDIATE transaction, is recorded in schema_migrations and bumps
+        PRAGMA user_version, so concurrent app starts apply it only once.
+        """
+        latest = self.MIGRATIONS[-1][0]
+        applied = []
+        conn = connect_db(self.db_path)
+        try:
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= latest:
+                return applied
+
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            conn.commit()
+
+            for version, description, steps in self.MIGRATIONS:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if conn.execute(
+                        "SELECT 1 FROM schema_migrations WHERE version = ?", (version,)
+                    ).fetchone():
+                        conn.rollback()
+                        continue
+                    for step in steps:
+                        if callable(step):
+                            step(conn)
+                        else:
+                            conn.execute(step)
+                    conn.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                        (version, description),
+                    )
+                    conn.execute(f"PRAGMA user_version = {int(version)}")
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    self.logger.error(f"Migration {version} failed: {str(e)}")
+                    raise
+                applied.append(version)
+                self.logger.info(f"Applied migration {version}: {description}")
+        finally:
+            conn.close()
+        return applied
+
+    def backup_database(self, label: str = "database only") -> str:
+        """
+        Creates a database-only backup in the backup store.
+
+        Args:
+            label: Free text stored in the manifest (e.g. "pre-import")
+
+        Returns:
+            The backup ID
+        """
+        manifest = BackupStore(self.backup_dir, self.db_path, uploads_dir=None).create_backup(
+            label=label
+        )
+        self.logger.info(f"Database backed up as {manifest['backup_id']}")
+        return manifest["backup_id"]
+
+    def _write_parquet(self, conn, table: str, parquet_path: str):
+        """Streams one table into a Parquet file, COPY_BATCH_ROWS rows at a time"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            [
+                (name, _sqlite_arrow_type(declared))
+                for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({table})")
+            ]
+        )
+        cursor = conn.execute(f"SELECT * FROM {table}")
+        with pq.ParquetWriter(parquet_path, schema) as writer:
+            for rows in iter(lambda: cursor.fetchmany(self.COPY_BATCH_ROWS), []):
+                arrays = [
+                    pa.array(
+                        [_arrow_cell(row[position], field.type) for row in rows],
+                        type=field.type,
+                    )
+                    for position, field in enumerate(schema)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    def _write_excel(self, conn, table: str, excel_path: str):
+        """Streams one table into a write-only workbook (human-readable copy)"""
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet(table)
+        cursor = conn.execute(f"SELECT * FROM {table}")
+        worksheet.append([column[0] for column in cursor.description])
+        for rows in iter(lambda: cursor.fetchmany(self.COPY_BATCH_ROWS), []):
+            for row in rows:
+                worksheet.append(
+                    [value.hex() if isinstance(value, bytes) else value for value in row]
+                )
+        workbook.save(excel_path)
+
+    def export_database(
+        self,
+        export_path: str,
+        include_parquet: bool = False,
+        include_excel: bool = False,
+    ) -> str:
+        """
+        Exports the database to a zip file containing:
+        - database.sqlite: an online-backup snapshot with the full schema
+        - metadata.json: format, versions, row counts, schema SQL and the
+          sha256 of every other file in the archive
+        - schema.json: the expected table columns
+        - optionally <table>.parquet for each exported table
+        - optionally <table>.xlsx, a human-readable copy that older app
+          versions can also import
+        """
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                snapshot_path = os.path.join(temp_dir, self.SNAPSHOT_NAME)
+                snapshot_database(self.db_path, snapshot_path)
+
+                snapshot = sqlite3.connect(snapshot_path)
+                try:
+                    existing = {
+                        row[0]
+                        for row in snapshot.execute(
+                            "SELECT name FROM sqlite_master WHERE type = 'table'"
+                        )
+                    }
+                    tables = {
+                        table: snapshot.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                        for table in self.EXPORT_TABLES
+                        if table in existing
+                    }
+                    schema_sql = {
+                        name: sql
+                        for name, sql in snapshot.execute(
+                            "SELECT name, sql FROM sqlite_master "
+                            "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+                        )
+                    }
+                    migration_version = snapshot.execute("PRAGMA user_version").fetchone()[0]
+                    for table in tables:
+                        if include_parquet:
+                            self._write_parquet(
+                                snapshot, table, os.path.join(temp_dir, f"{table}.parquet")
+                            )
+                        if include_excel:
+                            self._write_excel(
+                                snapshot, table, os.path.join(temp_dir, f"{table}.xlsx")
+                            )
+                finally:
+                    snapshot.close()
+
+                with open(os.path.join(temp_dir, "schema.json"), "w") as f:
+                    json.dump(self.SCHEMAS, f)
+
+                metadata = {
+                    "schema_version": self.SCHEMA_VERSION,
+                    "format": self.EXPORT_FORMAT,
+                    "migration_version": migration_version,
+                    "export_date": datetime.now().isoformat(),
+                    "tables": tables,
+                    "schema_sql": schema_sql,
+                    "checksums": {
+                        name: file_sha256(os.path.join(temp_dir, name))
+                        for name in sorted(os.listdir(temp_dir))
+                    },
+                }
+                with open(os.path.join(temp_dir, "metadata.json"), "w") as f:
+                    json.dump(metadata, f, indent=2)
+
+                with zipfile.ZipFile(export_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+                    for name in sorted(os.listdir(temp_dir)):
+                        zipf.write(os.path.join(temp_dir, name), name)
+
+            self.logger.info(f"Database exported to {export_path}")
+            return export_path
+
+        except Exception as e:
+            self.logger.error(f"Export failed: {str(e)}")
+            raise
+
+    def import_database(
+        self, import_path: str, validate: bool = True, progress_callback=None
+    ) -> bool:
+        """
+        Imports database from a zip file while maintaining data consistency.
+
+        Archives with a database.sqlite snapshot are checksum-verified and
+        copied row by row in batches into the existing tables, which keep
+        their schema, keys and defaults. Older Excel-only archives are still
+        accepted.
+
+        Args:
+            import_path: Zip file created by export_database
+            validate: Also check schema and migration versions and run an
+                integrity check on the snapshot
+            progress_callback: Optional callable(done, total) invoked per batch
+        """
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                with zipfile.ZipFile(import_path, "r") as zipf:
+                    zipf.extractall(temp_dir)
+
+                snapshot_path = os.path.join(temp_dir, self.SNAPSHOT_NAME)
+                if not os.path.exists(snapshot_path):
+                    self._import_excel_tables(temp_dir, validate)
+                else:
+                    with open(os.path.join(temp_dir, "metadata.json"), "r") as f:
+                        metadata = json.load(f)
+                    self._verify_checksums(temp_dir, metadata)
+                    if validate:
+                        self._validate_snapshot(snapshot_path, metadata)
+
+                    # Create backup before import
+                    self.backup_database(label="pre-import")
+                    self._copy_snapshot(snapshot_path, metadata, progress_callback)
+
+            invalidate_query_cache()
+            self.logger.info("Database import completed successfully")
+            return True
 
         except Exception as e:
             self.logger.error(f"Import failed: {str(e)}")
             raise
 
+    def _verify_checksums(self, import_dir: str, metadata: Dict[str, Any]):
+        """Raises ValueError unless every file listed in metadata matches its sha256"""
+        checksums = metadata.get("checksums") or {}
+        if self.SNAPSHOT_NAME not in checksums:
+            raise ValueError("Export metadata has no checksum for the database snapshot")
+        for name, expected in checksums.items():
+            path = os.path.join(import_dir, name)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Missing file in export: {name}")
+            if file_sha256(path) != expected:
+                raise ValueError(f"Checksum mismatch for {name}; the export is corrupt")
+
+    def _validate_snapshot(self, snapshot_path: str, metadata: Dict[str, Any]) -> bool:
+        """
+        Checks a snapshot before import: schema version, that it was not
+        written by a newer schema migration than ours, SQLite's quick_check
+        and the row counts recorded at export time.
+        """
+        if metadata["schema_version"] != self.SCHEMA_VERSION:
+            raise ValueError(
+                f"Schema version mismatch. Expected {self.SCHEMA_VERSION}, got {metadata['schema_version']}"
+            )
+        if metadata.get("migration_version", 0) > self.MIGRATIONS[-1][0]:
+            raise ValueError(
+                f"Export was made by a newer app version (migration "
+                f"{metadata['migration_version']}); update before importing"
+            )
+
+        snapshot = sqlite3.connect(snapshot_path)
+        try:
+            status = snapshot.execute("PRAGMA quick_check").fetchone()[0]
+            if status != "ok":
+                raise ValueError(f"Database snapshot failed integrity check: {status}")
+            for table, expected_rows in metadata["tables"].items():
+                rows = snapshot.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                if rows != expected_rows:
+                    raise ValueError(
+                        f"{table} has {rows} rows, export recorded {expected_rows}"
+                    )
         finally:
-            if "conn" in locals():
-                conn.close()
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
+            snapshot.close()
+        return True
+
+    def _copy_snapshot(self, snapshot_path: str, metadata: Dict[str, Any], progress_callback=None):
+        """
+        Replaces the rows of every exported table with those of the snapshot
+        in one transaction. Rows are copied in rowid batches of
+        COPY_BATCH_ROWS through an attached database; only columns both
+        schemas share are copied, so the live table definitions are kept.
+        Indexes and search triggers are rebuilt once at the end. Tables the
+        snapshot does not contain (older or partial exports) are left as
+        they are.
+        """
+        done = 0
+
+        conn = connect_db(self.db_path)
+        try:
+            conn.execute("ATTACH DATABASE ? AS snapshot", (snapshot_path,))
+            try:
+                snapshot_tables = {
+                    row[0]
+                    for row in conn.execute(
+                        "SELECT name FROM snapshot.sqlite_master WHERE type = 'table'"
+                    )
+                }
+                tables = [
+                    table
+                    for table in self.EXPORT_TABLES
+                    if table in snapshot_tables and table in metadata["tables"]
+                ]
+                skipped = [table for table in self.EXPORT_TABLES if table not in tables]
+                if skipped:
+                    self.logger.warning(
+                        f"Snapshot has no {', '.join(skipped)}; keeping the current rows"
+                    )
+                total = sum(metadata["tables"][table] for table in tables)
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    rebuild_search = _defer_bulk_indexes(conn)
+                    for table in reversed(tables):
+                        conn.execute(f"DELETE FROM main.{table}")
+                    # Derived from the copied rows; recounted on demand
+                    conn.execute("DELETE FROM main.notification_counters")
+
+                    for table in tables:
+                        snapshot_columns = {
+                            row[1]
+                            for row in conn.execute(f"PRAGMA snapshot.table_info({table})")
+                        }
+                        columns = ", ".join(
+                            row[1]
+                            for row in conn.execute(f"PRAGMA main.table_info({table})")
+                            if row[1] in snapshot_columns
+                        )
+                        last_rowid = 0
+                        while True:
+                            upper = conn.execute(
+                                f"""
+                                SELECT MAX(rowid) FROM (
+                                    SELECT rowid FROM snapshot.{table}
+                                    WHERE rowid > ? ORDER BY rowid LIMIT ?
+                                )
+                                """,
+                                (last_rowid, self.COPY_BATCH_ROWS),
+                            ).fetchone()[0]
+                            if upper is None:
+                                break
+                            copied = conn.execute(
+                                f"""
+                                INSERT INTO main.{table} ({columns})
+                                SELECT {columns} FROM snapshot.{table}
+                                WHERE rowid > ? AND rowid <= ? ORDER BY rowid
+                                """,
+                                (last_rowid, upper),
+                            ).rowcount
+                            last_rowid = upper
+                            done += copied
+                            if progress_callback:
+                                progress_callback(done, total)
+
+                    self.create_secondary_indexes(conn)
+                    if rebuild_search:
+                        ensure_student_search_index(conn)
+                    rebuild_report_stats(conn)
+                    rebuild_document_refcounts(conn)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            finally:
+                conn.execute("DETACH DATABASE snapshot")
+        finally:
+            conn.close()
+
+    def _import_excel_tables(self, import_dir: str, validate: bool):
+        """Imports an Excel-only archive written by older app versions"""
+        # Validate import data
+        if validate:
+            self._validate_import(import_dir)
+
+        # Create backup before import
+        self.backup_database(label="pre-import")
+
+        conn = connect_db(self.db_path)
+        try:
+            for table_name in self.SCHEMAS.keys():
+                excel_path = os.path.join(import_dir, f"{table_name}.xlsx")
+                if os.path.exists(excel_path):
+                    # Streamed so large tables never sit in memory whole
+                    reader = TableReader(excel_path)
+                    if_exists = "replace"
+                    for chunk in reader:
+                        chunk.to_sql(table_name, conn, if_exists=if_exists, index=False)
+                        if_exists = "append"
+                    if if_exists == "replace":
+                        pd.DataFrame(columns=reader.columns).to_sql(
+                            table_name, conn, if_exists="replace", index=False
+                        )
+
+            # Replaced tables lose their indexes, triggers and derived rows
+            self.create_secondary_indexes(conn)
+            rebuild_registration_items(conn)
+            ensure_student_search_index(conn)
+            conn.commit()
+        finally:
+            conn.close()
 
     def _validate_import(self, import_dir: str) -> bool:
         """
@@ -428,19 +1780,15 @@ class DatabaseMigrationHandler:
             if import_schema != self.SCHEMAS:
                 raise ValueError("Schema mismatch between import and current database")
 
-        # Validate data in Excel files
+        # Validate the header row of each Excel file
         for table_name in self.SCHEMAS.keys():
             excel_path = os.path.join(import_dir, f"{table_name}.xlsx")
             if not os.path.exists(excel_path):
                 raise FileNotFoundError(f"Missing table data: {table_name}")
 
-            df = pd.read_excel(excel_path)
-            expected_columns = set(self.SCHEMAS[table_name].keys())
-            actual_columns = set(df.columns)
-
-            if not expected_columns.issubset(actual_columns):
-                missing_columns = expected_columns - actual_columns
-                raise ValueError(f"Missing columns in {table_name}: {missing_columns}")
+            TableReader(
+                excel_path, required_columns=list(self.SCHEMAS[table_name])
+            ).read_header()
 
         return True
 
@@ -450,13 +1798,317 @@ class DatabaseMigrationHandler:
         """
         return {
             "version": self.SCHEMA_VERSION,
+            "migration_version": self.get_migration_version(),
             "tables": self.SCHEMAS,
             "backup_location": self.backup_dir,
         }
 
 
+BENCHMARK_START_DATE = datetime(2025, 1, 1)
+
+
+@contextmanager
+def benchmark_database(n_students: int, seed: int = 42):
+    """
+    Yields a pooled connection to a scratch database holding n_students
+    synthetic students, one course registration each and some
+    notifications. The database is deleted afterwards.
+    """
+    rng = random.Random(seed)
+    programmes = ["CIMG", "CIM-UK", "ICAG", "ACCA"]
+    statuses = ["pending"] + ["approved"] * 8 + ["rejected"]
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        db_path = os.path.join(scratch_dir, "benchmark.db")
+        init_db(db_path)
+        conn = connect_db(db_path)
+        try:
+            students = []
+            registrations = []
+            for i in range(n_students):
+                student_id = f"S{i:07d}"
+                programme = rng.choice(programmes)
+                created = BENCHMARK_START_DATE + timedelta(minutes=i)
+                students.append(
+                    (
+                        student_id,
+                        f"Surname{rng.randint(0, 5000)}",
+                        f"Name{i}",
+                        f"{student_id.lower()}@example.com",
+                        f"0{rng.randint(200000000, 599999999)}",
+                        f"GHA-{rng.randint(100000000, 999999999)}-{rng.randint(0, 9)}",
+                        rng.choice(["Male", "Female"]),
+                        rng.choice(statuses),
+                        created.isoformat(sep=" "),
+                        programme,
+                    )
+                )
+                registrations.append(
+                    (
+                        student_id,
+                        programme,
+                        f"Level {rng.randint(1, 4)}",
+                        rng.choice(["First", "Second"]),
+                        created.date().isoformat(),
+                        rng.choice(statuses),
+                    )
+                )
+            conn.executemany(
+                """
+                INSERT INTO student_info (
+                    student_id, surname, other_names, email, telephone,
+                    ghana_card_id, gender, approval_status, created_at, programme
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                students,
+            )
+            conn.executemany(
+                """
+                INSERT INTO course_registration (
+                    student_id, programme, level, semester, date_registered, approval_status
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                registrations,
+            )
+            conn.executemany(
+                """
+                INSERT INTO notifications (recipient_id, recipient_type, title, message)
+                VALUES (?, ?, ?, ?)
+                """,
+                [
+                    (f"S{rng.randrange(n_students):07d}", "student", "Notice", "Body")
+                    for _ in range(max(n_students // 50, 1))
+                ],
+            )
+            conn.commit()
+            yield conn
+        finally:
+            conn.close()
+            discard_connection_pool(db_path)
+
+
+def _median_query_ms(conn, sql: str, params, repeats: int) -> float:
+    """Median wall time of running sql and fetching all rows, in milliseconds"""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def benchmark_schema_indexes(n_students: int = 100_000, repeats: int = 20) -> pd.DataFrame:
+    """
+    Times the hot admin/portal queries against a scratch database of
+    n_students synthetic students, without and with the secondary indexes.
+
+    Returns a DataFrame with the median time per query in milliseconds.
+    """
+    probe_id = f"S{n_students // 2:07d}"
+    recent = (BENCHMARK_START_DATE + timedelta(minutes=int(n_students * 0.95))).date()
+    queries = [
+        (
+            "Pending students",
+            "SELECT student_id, surname, other_names FROM student_info WHERE approval_status = 'pending'",
+            (),
+        ),
+        (
+            "Approved count by programme",
+            "SELECT COUNT(*) FROM student_info WHERE programme = ? AND approval_status = 'approved'",
+            ("ICAG",),
+        ),
+        (
+            "Registrations for a student",
+            "SELECT * FROM course_registration WHERE student_id = ? ORDER BY date_registered DESC",
+            (probe_id,),
+        ),
+        (
+            "Programme/level roster",
+            "SELECT student_id, academic_year, semester FROM course_registration WHERE programme = ? AND level = ?",
+            ("ACCA", "Level 2"),
+        ),
+        (
+            "Registrations since date",
+            "SELECT COUNT(*) FROM course_registration WHERE date_registered >= ?",
+            (recent.isoformat(),),
+        ),
+        (
+            "Student notifications",
+            """
+            SELECT notification_id FROM notifications
+            WHERE recipient_type = 'student' AND recipient_id = ?
+              AND (expires_at IS NULL OR expires_at > datetime('now'))
+            """,
+            (probe_id,),
+        ),
+    ]
+
+    with benchmark_database(n_students) as conn:
+        DatabaseMigrationHandler.drop_secondary_indexes(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+        without_indexes = {
+            label: _median_query_ms(conn, sql, params, repeats)
+            for label, sql, params in queries
+        }
+
+        DatabaseMigrationHandler.create_secondary_indexes(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+        with_indexes = {
+            label: _median_query_ms(conn, sql, params, repeats)
+            for label, sql, params in queries
+        }
+
+    return pd.DataFrame(
+        [
+            {
+                "query": label,
+                "without_indexes_ms": round(without_indexes[label], 3),
+                "with_indexes_ms": round(with_indexes[label], 3),
+                "speedup": round(
+                    without_indexes[label] / max(with_indexes[label], 1e-6), 1
+                ),
+            }
+            for label, _, _ in queries
+        ]
+    )
+
+
+def benchmark_student_search(n_students: int = 100_000, repeats: int = 20) -> pd.DataFrame:
+    """
+    Compares the legacy leading-wildcard LIKE search of the Student Records
+    page with the student_search FTS5 index on a scratch database.
+
+    Returns a DataFrame with median latency (ms) and hit counts per phrase.
+    """
+    like_sql = """
+        SELECT student_id FROM student_info
+        WHERE student_id LIKE ? OR surname LIKE ? OR other_names LIKE ?
+    """
+    fts_sql = f"""
+        SELECT si.student_id FROM student_info si
+        JOIN ({student_search_subquery()}) hits ON hits.search_rowid = si.rowid
+        ORDER BY hits.search_rank
+    """
+    probe_id = f"S{n_students // 2:07d}"
+    phrases = [
+        ("Exact student ID", probe_id),
+        ("Student ID prefix", probe_id[:-2]),
+        ("Surname prefix", "Surname42"),
+        ("Other names", f"Name{n_students // 3}"),
+    ]
+
+    rows = []
+    with benchmark_database(n_students) as conn:
+        if not student_search_available(conn):
+            raise RuntimeError("SQLite was built without FTS5; nothing to compare")
+        for label, phrase in phrases:
+            like_params = (f"%{phrase}%",) * 3
+            fts_params = (build_fts_query(phrase),)
+            like_ms = _median_query_ms(conn, like_sql, like_params, repeats)
+            fts_ms = _median_query_ms(conn, fts_sql, fts_params, repeats)
+            rows.append(
+                {
+                    "search": label,
+                    "phrase": phrase,
+                    "like_ms": round(like_ms, 3),
+                    "fts_ms": round(fts_ms, 3),
+                    "like_hits": len(conn.execute(like_sql, like_params).fetchall()),
+                    "fts_hits": len(conn.execute(fts_sql, fts_params).fetchall()),
+                    "speedup": round(like_ms / max(fts_ms, 1e-6), 1),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def benchmark_database_export(n_students: int = 100_000) -> pd.DataFrame:
+    """
+    Round-trips a scratch database of n_students synthetic students through
+    the former Excel export (to_excel per table, read_excel + to_sql on
+    import) and through the snapshot export of DatabaseMigrationHandler,
+    with and without Parquet copies.
+
+    Returns a DataFrame with seconds, archive size and rows per second.
+    """
+    rows = []
+    with benchmark_database(n_students) as conn, tempfile.TemporaryDirectory() as scratch_dir:
+        source_path = conn.execute("PRAGMA database_list").fetchone()[2]
+        tables = list(DatabaseMigrationHandler.SCHEMAS)
+        table_rows = sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables
+        )
+
+        def record(step, seconds, size_path=None, row_count=table_rows):
+            rows.append(
+                {
+                    "step": step,
+                    "seconds": round(seconds, 3),
+                    "archive_mb": (
+                        round(os.path.getsize(size_path) / (1024 * 1024), 2)
+                        if size_path
+                        else None
+                    ),
+                    "rows_per_second": round(row_count / max(seconds, 1e-6)),
+                }
+            )
+
+        excel_dir = os.path.join(scratch_dir, "excel")
+        os.makedirs(excel_dir)
+        excel_zip = os.path.join(scratch_dir, "excel_export.zip")
+        started = time.perf_counter()
+        with zipfile.ZipFile(excel_zip, "w") as zipf:
+            for table in tables:
+                excel_path = os.path.join(excel_dir, f"{table}.xlsx")
+                pd.read_sql_query(f"SELECT * FROM {table}", conn).to_excel(
+                    excel_path, index=False
+                )
+                zipf.write(excel_path, os.path.basename(excel_path))
+        record("Excel export", time.perf_counter() - started, excel_zip)
+
+        target_path = os.path.join(scratch_dir, "excel_target.db")
+        init_db(target_path)
+        target = connect_db(target_path)
+        try:
+            started = time.perf_counter()
+            for table in tables:
+                pd.read_excel(os.path.join(excel_dir, f"{table}.xlsx")).to_sql(
+                    table, target, if_exists="replace", index=False
+                )
+            target.commit()
+            record("Excel import", time.perf_counter() - started)
+        finally:
+            target.close()
+            discard_connection_pool(target_path)
+
+        handler = DatabaseMigrationHandler(
+            source_path, backup_dir=os.path.join(scratch_dir, "backups")
+        )
+        snapshot_zip = os.path.join(scratch_dir, "snapshot_export.zip")
+        for step, include_parquet, archive in (
+            ("Snapshot export", False, snapshot_zip),
+            ("Snapshot + Parquet export", True, os.path.join(scratch_dir, "parquet_export.zip")),
+        ):
+            started = time.perf_counter()
+            handler.export_database(archive, include_parquet=include_parquet)
+            record(step, time.perf_counter() - started, archive)
+
+        target_path = os.path.join(scratch_dir, "snapshot_target.db")
+        init_db(target_path)
+        try:
+            started = time.perf_counter()
+            DatabaseMigrationHandler(
+                target_path, backup_dir=os.path.join(scratch_dir, "backups")
+            ).import_database(snapshot_zip)
+            record("Snapshot import", time.perf_counter() - started)
+        finally:
+            discard_connection_pool(target_path)
+
+    return pd.DataFrame(rows)
+
+
 def reset_db():
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
     c = conn.cursor()
 
     # Drop existing tables
@@ -484,149 +2136,293 @@ def check_db_locked():
         raise
 
 
-def get_program_courses(program):
-    courses = {
-        "CIMG": {
-            "Pathway 1": [
-                "PCM 101|FUNDAMENTALS OF MARKETING|3",
-                "PCM 103|BUYER BEHAVIOUR|3",
-                "PCM 102|BUSINESS LAW AND ETHICS|3",
-            ],
-            "Pathway 2": [
-                "PAC 202|MANAGEMENT IN PRACTICE|3",
-                "PCM 203|DIGITAL MARKETING TECHNIQUES|3",
-                "PAC 201|DECISION-MAKING TECHNIQUES|3",
-            ],
-            "Pathway 3": [
-                "PDM 301|BRANDS MANAGEMENT|3",
-                "PDM 302|MARKETING RESEARCH AND INSIGHTS|3",
-                "PDM 304|DIGITAL OPTIMISATION AND STRATEGY|3",
-                "PDM 303|SELLING AND SALES MANAGEMENT|3",
-            ],
-            "Pathway 4": [
-                "PDA 407|MASTERING MARKETING METRICS|3",
-                "PDA 408|MANAGING CORPORATE REPUTATION|3",
-                "PDA 404|DIGITAL CUSTOMER EXPERIENCE|3",
-                "PDA 405|PRODUCT MANAGEMENT|3",
-                "PDA 403|MANAGING MARKETING PROJECTS|3",
-                "PDA 406|CUSTOMER RELATIONSHIP MANAGEMENT|3",
-                "PDA 402|FINANCIAL MANAGEMENT FOR MARKETERS|3",
-                "PDA 401|INTERNATIONAL MARKETING|3",
-            ],
-            "Pathway 5": [
-                "PGD 502|STRATEGIC MARKETING PRACTICE- CASE STUDY|3",
-                "PGD 503|STRATEGIC MARKETING MANAGEMENT|3",
-                "PGD 501|INTEGRATED MARKETING COMMUNICATIONS|3",
-                "PGD 504|ADVANCED DIGITAL MARKETING|3",
-            ],
-            "Pathway 6": [
-                "PMS 613|SPECIALISED COMMODITIES MARKETING|3",
-                "PMS 607|TRANSPORT AND LOGISTICS MARKETING|3",
-                "PMS 606|NGO MARKETING|3",
-                "PMS 608|AGRI-BUSINESS MARKETING|3",
-                "PMS 604|PUBLIC SECTOR MARKETING|3",
-                "PMS 601|FINANCIAL SERVICES MARKETING|3",
-                "PMS 611|EDUCATION, HEALTHCARE AND HOSPITALITY MARKETING|3",
-                "PMS 602|ENERGY MARKETING|3",
-                "PMS 610|PRINTING, COMMUNICATIONS AGENCY AND PUBLISHING MARKETING|3",
-                "PMS 609|TELECOMMUNICATIONS AND DIGITAL PLATFORM MARKETING|3",
-                "PMS 605|POLITICAL MARKETING|3",
-                "PMS 612|SPORTS AND ENTERTAINMENT MARKETING|3",
-                "PMS 603|FAST MOVING CONSUMER GOOD MARKETING|3",
-            ],
-            "Pathway 7": [
-                "PMD 701|MARKETING CONSULTANCY PRACTICE|3",
-                "PMD 703|PROFESSIONAL SERVICES MARKETING|3",
-                "PMD 702|CHANGE AND TRANSFORMATION MARKETING|3",
-            ],
-        },
-        "CIM-UK": {
-            "Level 4": [
-                "CIM101|Marketing Principles|6",
-                "CIM102|Communications in Practice|6",
-                "CIM103|Customer Communications|6",
-            ],
-            "Level 5": [
-                "CIM201|Applied Marketing|6",
-                "CIM202|Planning Campaigns|6",
-                "CIM203|Customer Insights|6",
-            ],
-            "Level 6": [
-                "CIM301|Marketing & Digital Strategy|6",
-                "CIM302|Innovation in Marketing|6",
-                "CIM303|Resource Management|6",
-            ],
-            "Level 7": [
-                "CIM401|Global Marketing Decisions|6",
-                "CIM402|Corporate Digital Communications|6",
-                "CIM403|Creating Entrepreneurial Change|6",
-            ],
-        },
-        "ICAG": {
-            "Level 1": [
-                "ICAG101|Financial Accounting|3",
-                "ICAG102|Business Management & Information Systems|3",
-                "ICAG103|Business Law|3",
-                "ICAG104|Introduction to Management Accounting|3",
-            ],
-            "Level 2": [
-                "ICAG201|Financial Reporting|3",
-                "ICAG202|Management Accounting|3",
-                "ICAG203|Audit & Assurance|3",
-                "ICAG204|Financial Management|3",
-                "ICAG205|Corporate Law|3",
-                "ICAG206|Public Sector Accounting|3",
-            ],
-            "Level 3": [
-                "ICAG301|Corporate Reporting|3",
-                "ICAG302|Advanced Management Accounting|3",
-                "ICAG303|Advanced Audit & Assurance|3",
-                "ICAG304|Advanced Financial Management|3",
-                "ICAG305|Strategy & Governance|3",
-                "ICAG306|Advanced Taxation|3",
-            ],
-        },
-        "ACCA": {
-            "Level 1 (Applied Knowledge)": [
-                "AB101|Accountant in Business|3",
-                "MA101|Management Accounting|3",
-                "FA101|Financial Accounting|3",
-            ],
-            "Level 2 (Applied Skills)": [
-                "LW201|Corporate and Business Law|3",
-                "PM201|Performance Management|3",
-                "TX201|Taxation|3",
-                "FR201|Financial Reporting|3",
-                "AA201|Audit and Assurance|3",
-                "FM201|Financial Management|3",
-            ],
-            "Level 3 Strategic Professional (Essentials)": [
-                "SBL301|Strategic Business Leader|6",
-                "SBR301|Strategic Business Reporting|6",
-            ],
-            "Strategic Professional (Options)": [
-                "AFM401|Advanced Financial Management|6",
-                "APM401|Advanced Performance Management|6",
-                "ATX401|Advanced Taxation|6",
-                "AAA401|Advanced Audit and Assurance|6",
-            ],
-        },
-    }
-    return courses.get(program, {})
+#####################
+# Course Catalog    #
+#####################
+#
+# Programmes, their levels and courses. Built once into immutable records
+# indexed by programme, level and course code; the stored registration
+# format stays "CODE|TITLE|CREDITS" lines. A course_catalog.json next to
+# the app (same shape as DEFAULT_COURSE_CATALOG) overrides the built-in
+# catalog and is picked up again when the file changes.
+
+COURSE_CATALOG_PATH = "course_catalog.json"
+
+DEFAULT_COURSE_CATALOG = {
+    "CIMG": {
+        "Pathway 1": [
+            "PCM 101|FUNDAMENTALS OF MARKETING|3",
+            "PCM 103|BUYER BEHAVIOUR|3",
+            "PCM 102|BUSINESS LAW AND ETHICS|3",
+        ],
+        "Pathway 2": [
+            "PAC 202|MANAGEMENT IN PRACTICE|3",
+            "PCM 203|DIGITAL MARKETING TECHNIQUES|3",
+            "PAC 201|DECISION-MAKING TECHNIQUES|3",
+        ],
+        "Pathway 3": [
+            "PDM 301|BRANDS MANAGEMENT|3",
+            "PDM 302|MARKETING RESEARCH AND INSIGHTS|3",
+            "PDM 304|DIGITAL OPTIMISATION AND STRATEGY|3",
+            "PDM 303|SELLING AND SALES MANAGEMENT|3",
+        ],
+        "Pathway 4": [
+            "PDA 407|MASTERING MARKETING METRICS|3",
+            "PDA 408|MANAGING CORPORATE REPUTATION|3",
+            "PDA 404|DIGITAL CUSTOMER EXPERIENCE|3",
+            "PDA 405|PRODUCT MANAGEMENT|3",
+            "PDA 403|MANAGING MARKETING PROJECTS|3",
+            "PDA 406|CUSTOMER RELATIONSHIP MANAGEMENT|3",
+            "PDA 402|FINANCIAL MANAGEMENT FOR MARKETERS|3",
+            "PDA 401|INTERNATIONAL MARKETING|3",
+        ],
+        "Pathway 5": [
+            "PGD 502|STRATEGIC MARKETING PRACTICE- CASE STUDY|3",
+            "PGD 503|STRATEGIC MARKETING MANAGEMENT|3",
+            "PGD 501|INTEGRATED MARKETING COMMUNICATIONS|3",
+            "PGD 504|ADVANCED DIGITAL MARKETING|3",
+        ],
+        "Pathway 6": [
+            "PMS 613|SPECIALISED COMMODITIES MARKETING|3",
+            "PMS 607|TRANSPORT AND LOGISTICS MARKETING|3",
+            "PMS 606|NGO MARKETING|3",
+            "PMS 608|AGRI-BUSINESS MARKETING|3",
+            "PMS 604|PUBLIC SECTOR MARKETING|3",
+            "PMS 601|FINANCIAL SERVICES MARKETING|3",
+            "PMS 611|EDUCATION, HEALTHCARE AND HOSPITALITY MARKETING|3",
+            "PMS 602|ENERGY MARKETING|3",
+            "PMS 610|PRINTING, COMMUNICATIONS AGENCY AND PUBLISHING MARKETING|3",
+            "PMS 609|TELECOMMUNICATIONS AND DIGITAL PLATFORM MARKETING|3",
+            "PMS 605|POLITICAL MARKETING|3",
+            "PMS 612|SPORTS AND ENTERTAINMENT MARKETING|3",
+            "PMS 603|FAST MOVING CONSUMER GOOD MARKETING|3",
+        ],
+        "Pathway 7": [
+            "PMD 701|MARKETING CONSULTANCY PRACTICE|3",
+            "PMD 703|PROFESSIONAL SERVICES MARKETING|3",
+            "PMD 702|CHANGE AND TRANSFORMATION MARKETING|3",
+        ],
+    },
+    "CIM-UK": {
+        "Level 4": [
+            "CIM101|Marketing Principles|6",
+            "CIM102|Communications in Practice|6",
+            "CIM103|Customer Communications|6",
+        ],
+        "Level 5": [
+            "CIM201|Applied Marketing|6",
+            "CIM202|Planning Campaigns|6",
+            "CIM203|Customer Insights|6",
+        ],
+        "Level 6": [
+            "CIM301|Marketing & Digital Strategy|6",
+            "CIM302|Innovation in Marketing|6",
+            "CIM303|Resource Management|6",
+        ],
+        "Level 7": [
+            "CIM401|Global Marketing Decisions|6",
+            "CIM402|Corporate Digital Communications|6",
+            "CIM403|Creating Entrepreneurial Change|6",
+        ],
+    },
+    "ICAG": {
+        "Level 1": [
+            "ICAG101|Financial Accounting|3",
+            "ICAG102|Business Management & Information Systems|3",
+            "ICAG103|Business Law|3",
+            "ICAG104|Introduction to Management Accounting|3",
+        ],
+        "Level 2": [
+            "ICAG201|Financial Reporting|3",
+            "ICAG202|Management Accounting|3",
+            "ICAG203|Audit & Assurance|3",
+            "ICAG204|Financial Management|3",
+            "ICAG205|Corporate Law|3",
+            "ICAG206|Public Sector Accounting|3",
+        ],
+        "Level 3": [
+            "ICAG301|Corporate Reporting|3",
+            "ICAG302|Advanced Management Accounting|3",
+            "ICAG303|Advanced Audit & Assurance|3",
+            "ICAG304|Advanced Financial Management|3",
+            "ICAG305|Strategy & Governance|3",
+            "ICAG306|Advanced Taxation|3",
+        ],
+    },
+    "ACCA": {
+        "Level 1 (Applied Knowledge)": [
+            "AB101|Accountant in Business|3",
+            "MA101|Management Accounting|3",
+            "FA101|Financial Accounting|3",
+        ],
+        "Level 2 (Applied Skills)": [
+            "LW201|Corporate and Business Law|3",
+            "PM201|Performance Management|3",
+            "TX201|Taxation|3",
+            "FR201|Financial Reporting|3",
+            "AA201|Audit and Assurance|3",
+            "FM201|Financial Management|3",
+        ],
+        "Level 3 Strategic Professional (Essentials)": [
+            "SBL301|Strategic Business Leader|6",
+            "SBR301|Strategic Business Reporting|6",
+        ],
+        "Strategic Professional (Options)": [
+            "AFM401|Advanced Financial Management|6",
+            "APM401|Advanced Performance Management|6",
+            "ATX401|Advanced Taxation|6",
+            "AAA401|Advanced Audit and Assurance|6",
+        ],
+    },
+}
 
 
-def generate_student_info_pdf(data):
-    filename = f"student_info_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    doc = SimpleDocTemplate(
-        filename,
-        pagesize=A4,
-        rightMargin=1.5 * cm,
-        leftMargin=1.5 * cm,
-        topMargin=1.5 * cm,
-        bottomMargin=1.5 * cm,
-    )
+class Course(NamedTuple):
+    """One catalog course"""
+
+    code: str
+    title: str
+    credits: int
+
+    @property
+    def line(self) -> str:
+        """The course as stored in course_registration.courses"""
+        return f"{self.code}|{self.title}|{self.credits}"
+
+    def label(self) -> str:
+        return f"{self.code} - {self.title} ({self.credits} credits)"
+
 
-    # Styles
+class CourseCatalog:
+    """
+    Read-only course catalog.
+
+    Args:
+        programmes: {programme: {level: [course, ...]}} where each course is
+            a "CODE|TITLE|CREDITS" line or a (code, title, credits) sequence
+    """
+
+    __slots__ = ("programmes", "_levels", "_courses", "_level_credits", "_by_code", "_by_line")
+
+    def __init__(self, programmes: Dict[str, Dict[str, list]]):
+        from types import MappingProxyType
+
+        levels, courses, level_credits, by_code, by_line = {}, {}, {}, {}, {}
+        for programme, programme_levels in programmes.items():
+            levels[programme] = tuple(programme_levels)
+            for level, entries in programme_levels.items():
+                records = []
+                for entry in entries:
+                    if isinstance(entry, str):
+                        parsed = parse_course_lines(entry)
+                        if not parsed:
+                            raise ValueError(f"Malformed catalog course: {entry!r}")
+                        entry = parsed[0]
+                    code, title, credits = entry
+                    course = Course(str(code).strip(), str(title).strip(), int(credits))
+                    records.append(course)
+                    by_code.setdefault(course.code, course)
+                    by_line[course.line] = course
+                courses[(programme, level)] = tuple(records)
+                level_credits[(programme, level)] = sum(c.credits for c in records)
+
+        self.programmes = tuple(programmes)
+        self._levels = MappingProxyType(levels)
+        self._courses = MappingProxyType(courses)
+        self._level_credits = MappingProxyType(level_credits)
+        self._by_code = MappingProxyType(by_code)
+        self._by_line = MappingProxyType(by_line)
+
+    @classmethod
+    def from_json(cls, path: str) -> "CourseCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def to_json(self, path: str):
+        """Writes the catalog in the shape from_json() reads"""
+        data = {
+            programme: {
+                level: [course.line for course in self.courses(programme, level)]
+                for level in self.levels(programme)
+            }
+            for programme in self.programmes
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def levels(self, programme: str) -> Tuple[str, ...]:
+        return self._levels.get(programme, ())
+
+    def courses(self, programme: str, level: str) -> Tuple[Course, ...]:
+        return self._courses.get((programme, level), ())
+
+    def level_credits(self, programme: str, level: str) -> int:
+        """Credits of every course of a level, precomputed"""
+        return self._level_credits.get((programme, level), 0)
+
+    def course(self, code: str) -> Optional[Course]:
+        return self._by_code.get(code)
+
+    def parse(self, courses_text) -> List[Course]:
+        """
+        Courses of a stored courses value. Catalog lines resolve to their
+        records without splitting; other lines (older catalogs, imports)
+        are parsed.
+        """
+        if not courses_text or not isinstance(courses_text, str):
+            return []
+        courses = []
+        for line in courses_text.split("\n"):
+            course = self._by_line.get(line)
+            if course is None:
+                parsed = parse_course_lines(line)
+                if not parsed:
+                    continue
+                course = Course(*parsed[0])
+            courses.append(course)
+        return courses
+
+    @staticmethod
+    def total_credits(courses) -> int:
+        return sum(course.credits for course in courses)
+
+
+_course_catalog = None
+_course_catalog_mtime = None
+_course_catalog_lock = threading.Lock()
+
+
+def get_course_catalog() -> CourseCatalog:
+    """
+    The course catalog: COURSE_CATALOG_PATH when present (reloaded when its
+    modification time changes), otherwise DEFAULT_COURSE_CATALOG.
+    """
+    global _course_catalog, _course_catalog_mtime
+    try:
+        mtime = os.path.getmtime(COURSE_CATALOG_PATH)
+    except OSError:
+        mtime = None
+    with _course_catalog_lock:
+        if _course_catalog is None or mtime != _course_catalog_mtime:
+            if mtime is None:
+                _course_catalog = CourseCatalog(DEFAULT_COURSE_CATALOG)
+            else:
+                try:
+                    _course_catalog = CourseCatalog.from_json(COURSE_CATALOG_PATH)
+                except (OSError, ValueError, TypeError, AttributeError) as e:
+                    logging.error(f"Invalid course catalog {COURSE_CATALOG_PATH}: {e}")
+                    if _course_catalog is None:
+                        _course_catalog = CourseCatalog(DEFAULT_COURSE_CATALOG)
+            _course_catalog_mtime = mtime
+        return _course_catalog
+
+
+@functools.lru_cache(maxsize=1)
+def get_pdf_styles():
+    """
+    Stylesheet shared by the student PDFs. Built once per process and
+    treated as read-only by the callers.
+    """
     styles = getSampleStyleSheet()
     styles.add(
         ParagraphStyle(
@@ -649,18 +2445,75 @@ def generate_student_info_pdf(data):
             spaceAfter=10,
         )
     )
+    return styles
+
+
+@functools.lru_cache(maxsize=1)
+def _logo_bytes() -> bytes:
+    with open("upsa_logo.jpg", "rb") as f:
+        return f.read()
+
+
+def pdf_logo(size=1.2 * inch):
+    """UPSA logo flowable; the file is read once per process"""
+    return RLImage(io.BytesIO(_logo_bytes()), width=size, height=size)
+
+
+def _write_pdf_output(pdf_bytes: bytes, output, default_filename: str):
+    """Writes PDF bytes to output (a path or a binary buffer) or default_filename"""
+    target = output if output is not None else default_filename
+    if hasattr(target, "write"):
+        target.write(pdf_bytes)
+    else:
+        with open(target, "wb") as f:
+            f.write(pdf_bytes)
+    return target
+
+
+def generate_student_info_pdf(data, output=None):
+    """
+    Writes the student information PDF to output (a path or a binary
+    buffer), by default a new timestamped file in the working directory.
+    Unchanged records are served from the PDF cache.
+
+    Returns the path or buffer written to.
+    """
+    pdf_bytes = get_pdf_cache().get_or_render(
+        "student_info",
+        data,
+        data["passport_photo_path"],
+        lambda buffer: _render_student_info_pdf(data, buffer),
+    )
+    return _write_pdf_output(
+        pdf_bytes,
+        output,
+        f"student_info_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+    )
+
+
+def _render_student_info_pdf(data, filename):
+    doc = SimpleDocTemplate(
+        filename,
+        pagesize=A4,
+        rightMargin=1.5 * cm,
+        leftMargin=1.5 * cm,
+        topMargin=1.5 * cm,
+        bottomMargin=1.5 * cm,
+    )
+
+    styles = get_pdf_styles()
 
     elements = []
 
     # Header with Logo
     header_data = [
         [
-            RLImage("upsa_logo.jpg", width=1.2 * inch, height=1.2 * inch),
+            pdf_logo(),
             Paragraph(
                 "UNIVERSITY OF PROFESSIONAL STUDIES, ACCRA<br/>IPS DIRECTORATE",
                 styles["CustomTitle"],
             ),
-            RLImage("upsa_logo.jpg", width=1.2 * inch, height=1.2 * inch),
+            pdf_logo(),
         ]
     ]
     # Use RLTable instead of Table
@@ -687,8 +2540,10 @@ def generate_student_info_pdf(data):
         try:
             photo_data = [
                 [
-                    Image(
-                        data["passport_photo_path"], width=1.5 * inch, height=1.5 * inch
+                    RLImage(
+                        thumbnail_path(data["passport_photo_path"], "large"),
+                        width=1.5 * inch,
+                        height=1.5 * inch,
                     )
                 ]
             ]
@@ -809,27 +2664,66 @@ def generate_student_info_pdf(data):
         elements.append(t)
         elements.append(Spacer(1, 20))
 
-    # Footer
-    footer_style = ParagraphStyle(
-        "Footer",
-        parent=styles["Normal"],
-        fontSize=8,
-        textColor=colors.grey,
-        alignment=TA_CENTER,
+    # Footer
+    footer_style = ParagraphStyle(
+        "Footer",
+        parent=styles["Normal"],
+        fontSize=8,
+        textColor=colors.grey,
+        alignment=TA_CENTER,
+    )
+    elements.append(
+        Paragraph(
+            f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | UPSA Student Information System",
+            footer_style,
+        )
+    )
+
+    doc.build(elements)
+    return filename
+
+
+def generate_course_registration_pdf(data, output=None, student_info=None):
+    """
+    Writes the proof-of-registration PDF to output (a path or a binary
+    buffer), by default a new timestamped file in the working directory.
+    Unchanged registrations are served from the PDF cache.
+
+    student_info is the (passport_photo_path, surname, other_names, email)
+    row of the student; it is looked up when not supplied by the caller.
+
+    Returns the path or buffer written to.
+    """
+    # Get student info from database
+    if student_info is None:
+        conn = connect_db()
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT passport_photo_path, surname, other_names, email 
+            FROM student_info 
+            WHERE student_id = ?
+            """,
+            (data["student_id"],),
+        )
+        student_info = c.fetchone()
+        conn.close()
+
+    pdf_bytes = get_pdf_cache().get_or_render(
+        "course_registration",
+        data,
+        student_info[0] if student_info else None,
+        lambda buffer: _render_course_registration_pdf(data, buffer, student_info),
+        extra=list(student_info) if student_info else None,
     )
-    elements.append(
-        Paragraph(
-            f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | UPSA Student Information System",
-            footer_style,
-        )
+    return _write_pdf_output(
+        pdf_bytes,
+        output,
+        f"course_registration_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
     )
 
-    doc.build(elements)
-    return filename
 
-
-def generate_course_registration_pdf(data):
-    filename = f"course_registration_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+def _render_course_registration_pdf(data, filename, student_info):
     doc = SimpleDocTemplate(
         filename,
         pagesize=A4,
@@ -839,51 +2733,15 @@ def generate_course_registration_pdf(data):
         bottomMargin=1.5 * cm,
     )
 
-    # Styles
-    styles = getSampleStyleSheet()
-    styles.add(
-        ParagraphStyle(
-            name="CustomTitle",
-            parent=styles["Heading1"],
-            fontSize=16,
-            alignment=TA_CENTER,
-            spaceAfter=30,
-            textColor=colors.HexColor("#003366"),
-        )
-    )
-    styles.add(
-        ParagraphStyle(
-            name="SectionHeader",
-            parent=styles["Heading2"],
-            fontSize=12,
-            textColor=colors.HexColor("#003366"),
-            spaceBefore=15,
-            spaceAfter=10,
-        )
-    )
+    styles = get_pdf_styles()
 
     elements = []
-    # Get student info from database
-    conn = sqlite3.connect("student_registration.db")
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT passport_photo_path, surname, other_names, email 
-        FROM student_info 
-        WHERE student_id = ?
-        """,
-        (data["student_id"],),
-    )
-    student_info = c.fetchone()
-    conn.close()
 
     # Header with logo and student photo
     header_elements = []
     
     # First column: UPSA logo
-    header_elements.append(
-        RLImage("upsa_logo.jpg", width=1.2 * inch, height=1.2 * inch)
-    )
+    header_elements.append(pdf_logo())
     
     # Middle column: Title
     header_elements.append(
@@ -896,27 +2754,19 @@ def generate_course_registration_pdf(data):
     # Third column: Student photo or UPSA logo if no photo
     if student_info and student_info[0] and os.path.exists(student_info[0]):
         try:
-            # Create a BytesIO object to hold the image data
-            img_buffer = io.BytesIO()
-            
-            # Open, resize and save the image to the buffer
-            with PILImage.open(student_info[0]) as img:
-                img.thumbnail((100, 100))  # Resize while maintaining aspect ratio
-                img.save(img_buffer, format=img.format)
-                img_buffer.seek(0)
-            
-            # Add the image from the buffer
-            header_elements.append(RLImage(img_buffer, width=1.2 * inch, height=1.2 * inch))
-        except Exception as e:
-            # If there's an error, use the UPSA logo instead
             header_elements.append(
-                RLImage("upsa_logo.jpg", width=1.2 * inch, height=1.2 * inch)
+                RLImage(
+                    thumbnail_path(student_info[0], "large"),
+                    width=1.2 * inch,
+                    height=1.2 * inch,
+                )
             )
+        except Exception as e:
+            # If there's an error, use the UPSA logo instead
+            header_elements.append(pdf_logo())
     else:
         # If no photo, use the UPSA logo
-        header_elements.append(
-            RLImage("upsa_logo.jpg", width=1.2 * inch, height=1.2 * inch)
-        )
+        header_elements.append(pdf_logo())
     
     # Create the header table
     header_table = RLTable([header_elements], [2 * inch, 4 * inch, 2 * inch])
@@ -981,11 +2831,9 @@ def generate_course_registration_pdf(data):
     elements.append(Spacer(1, 20))
 
     elements.append(Paragraph("Selected Courses", styles["SectionHeader"]))
-    courses_list = data["courses"].split("\n")
     courses_data = [["Course Code", "Course Title", "Credit Hours"]]
-    for course in courses_list:
-        if "|" in course:
-            courses_data.append(course.split("|"))
+    for course in get_course_catalog().parse(data["courses"]):
+        courses_data.append([course.code, course.title, str(course.credits)])
     t = RLTable(courses_data, [2 * inch, 3.5 * inch, 1 * inch])
     t.setStyle(
         TableStyle(
@@ -1145,13 +2993,10 @@ def review_course_registration(form_data):
 
     st.write("**Selected Courses**")
     if form_data["courses"]:
-        courses_list = form_data["courses"].split("\n")
-
-        table_data = []
-        for course in courses_list:
-            if "|" in course:
-                code, title, credits = course.split("|")
-                table_data.append([code, title, f"{credits} credits"])
+        table_data = [
+            [course.code, course.title, f"{course.credits} credits"]
+            for course in get_course_catalog().parse(form_data["courses"])
+        ]
 
         if table_data:
             df = pd.DataFrame(
@@ -1166,7 +3011,7 @@ def review_course_registration(form_data):
 
 
 def save_student_info(form_data):
-    with sqlite3.connect("student_registration.db") as conn:
+    with get_db_connection() as conn:
         try:
             cursor = conn.cursor()
             # ... database operations ...
@@ -1282,9 +3127,10 @@ def student_info_form():
         review_student_info(st.session_state.form_data, st.session_state.uploaded_files)
         with col_buttons[1]:
             if st.button("Confirm and Submit", use_container_width=True):
-                ghana_card_path = save_uploaded_file(ghana_card, "uploads")
-                passport_photo_path = save_uploaded_file(passport_photo, "uploads")
-                certificate_path = save_uploaded_file(certificate, "uploads")
+                owner = form_data["student_id"]
+                ghana_card_path = save_uploaded_file(ghana_card, "uploads", owner)
+                passport_photo_path = save_uploaded_file(passport_photo, "uploads", owner)
+                certificate_path = save_uploaded_file(certificate, "uploads", owner)
                 # Set transcript and receipt as None
                 file_paths = {
                     "ghana_card_path": ghana_card_path,
@@ -1294,10 +3140,11 @@ def student_info_form():
                     "receipt_path": None,
                 }
                 try:
-                    conn = sqlite3.connect("student_registration.db")
+                    conn = connect_db()
                     c = conn.cursor()
                     insert_student_info(c, st.session_state.form_data, file_paths)
                     conn.commit()
+                    invalidate_query_cache("student_info")
                     st.success(
                         "Information submitted successfully! Pending admin approval."
                     )
@@ -1324,13 +3171,310 @@ def validate_file(uploaded_file, max_size_mb=6):
     return compressed_data
 
 
-def download_all_documents():
-    temp_dir = "temp_downloads"
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
+import hashlib
+import tempfile
+
+EXPORT_DIR = "exports"
+EXPORT_MANIFEST_DIR = os.path.join(EXPORT_DIR, "manifests")
+EXPORT_MANIFEST_NAME = "export_manifest.json"
+
+# Formats that are already compressed; deflating them again only burns CPU
+STORED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".pdf", ".zip", ".docx", ".xlsx",
+}
+
+
+def archive_compress_type(path: str) -> int:
+    """Returns the ZIP compression method to use for a file."""
+    ext = os.path.splitext(path)[1].lower()
+    return zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+class StreamingArchive:
+    """
+    Builds a ZIP export straight from source files.
+
+    Files are read by a small thread pool while the archive is written in
+    order, so disk reads overlap with compression. JPEG/PDF and other
+    already-compressed formats are stored rather than deflated. The archive
+    is written to a temporary file under EXPORT_DIR and only renamed into
+    place once it is complete.
+
+    In incremental mode only files that changed since the last export with
+    the same name are included. Changes are detected from size and mtime,
+    falling back to a sha256 comparison so that a touched but identical file
+    is not exported again. Every archive carries an export_manifest.json
+    listing what it contains and which files disappeared since last time.
+
+    The baseline for the next incremental export is only staged by build();
+    it moves once confirm_download() is called for that archive, so an
+    export that is built but never downloaded does not hide its files from
+    the next one.
+    """
+
+    READ_AHEAD = 16  # Files buffered ahead of the writer
+    LARGE_FILE_BYTES = 16 * 1024 * 1024  # Streamed by zipfile rather than buffered
+
+    def __init__(
+        self,
+        name: str,
+        incremental: bool = False,
+        max_workers: Optional[int] = None,
+        output_dir: str = EXPORT_DIR,
+        manifest_dir: Optional[str] = EXPORT_MANIFEST_DIR,
+    ):
+        self.name = name
+        self.incremental = incremental
+        self.max_workers = max_workers or min(8, available_cpus() * 2 + 2)
+        self.output_dir = output_dir
+        # manifest_dir=None builds a one-off archive with no baseline at all
+        self.manifest_dir = manifest_dir
+        self.manifest_path = (
+            os.path.join(manifest_dir, f"{name}.json") if manifest_dir else None
+        )
+        self.entries = []
+        self.stats = {"files": 0, "skipped": 0, "stored": 0, "deflated": 0, "bytes": 0}
+
+    def add(self, source_path: str, arcname: str):
+        """Queues a file for the archive; missing files are ignored."""
+        if source_path and os.path.isfile(source_path):
+            self.entries.append((source_path, arcname.replace(os.sep, "/")))
+
+    def add_tree(self, root_dir: str, prefix: str = ""):
+        """Queues every file under root_dir, keeping its relative layout."""
+        for dirpath, dirnames, filenames in os.walk(root_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                self.add(path, os.path.join(prefix, os.path.relpath(path, root_dir)))
+
+    def load_manifest(self) -> Dict[str, Any]:
+        if not self.manifest_path:
+            return {"files": {}}
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"files": {}}
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _pending_path(manifest_dir: str, name: str, zip_path: str) -> str:
+        return os.path.join(
+            manifest_dir, "pending", name, f"{os.path.basename(zip_path)}.json"
+        )
+
+    def _stage_manifest(self, zip_path: str, manifest: Dict[str, Any]):
+        """
+        Keeps the manifest of a freshly built archive aside until it is
+        downloaded. Only the latest build per export is kept; older ones
+        belong to download buttons that are no longer on screen.
+        """
+        pending_dir = os.path.dirname(
+            self._pending_path(self.manifest_dir, self.name, zip_path)
+        )
+        if os.path.isdir(pending_dir):
+            for filename in os.listdir(pending_dir):
+                try:
+                    os.remove(os.path.join(pending_dir, filename))
+                except OSError:
+                    pass
+        self._write_json(
+            self._pending_path(self.manifest_dir, self.name, zip_path), manifest
+        )
+
+    @classmethod
+    def confirm_download(
+        cls, name: str, zip_path: str, manifest_dir: str = EXPORT_MANIFEST_DIR
+    ) -> bool:
+        """
+        Makes the staged manifest of zip_path the baseline for the next
+        incremental export of name. Meant for a download button's on_click.
+
+        Returns:
+            True if a staged manifest was found and promoted
+        """
+        pending_path = cls._pending_path(manifest_dir, name, zip_path)
+        try:
+            with open(pending_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        cls._write_json(os.path.join(manifest_dir, f"{name}.json"), manifest)
+        try:
+            os.remove(pending_path)
+        except OSError:
+            pass
+        return True
+
+    @staticmethod
+    def _fingerprint(path: str) -> Dict[str, Any]:
+        st_info = os.stat(path)
+        return {"size": st_info.st_size, "mtime_ns": st_info.st_mtime_ns}
+
+    def _read(self, entry):
+        """
+        Runs in a reader thread. Returns (entry, fingerprint, data, digest);
+        data is None for large files, which zipfile streams itself.
+        """
+        source_path, arcname = entry
+        fingerprint = self._fingerprint(source_path)
+        if fingerprint["size"] > self.LARGE_FILE_BYTES:
+            return entry, fingerprint, None, file_sha256(source_path)
+        with open(source_path, "rb") as f:
+            data = f.read()
+        return entry, fingerprint, data, hashlib.sha256(data).hexdigest()
+
+    def _is_unchanged(self, previous, fingerprint, digest=None) -> bool:
+        if not previous:
+            return False
+        if (
+            previous.get("size") == fingerprint["size"]
+            and previous.get("mtime_ns") == fingerprint["mtime_ns"]
+        ):
+            return True
+        return digest is not None and previous.get("sha256") == digest
+
+    def _pending_entries(self, previous_files):
+        """Drops entries whose size and mtime match the previous export."""
+        for source_path, arcname in self.entries:
+            if self.incremental:
+                try:
+                    fingerprint = self._fingerprint(source_path)
+                except OSError:
+                    continue
+                previous = previous_files.get(arcname)
+                if self._is_unchanged(previous, fingerprint):
+                    self.stats["skipped"] += 1
+                    continue
+            yield source_path, arcname
+
+    def _read_in_order(self, entries):
+        """Reads files in parallel, yielding results in submission order."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            window = []
+            for entry in entries:
+                window.append(executor.submit(self._read, entry))
+                if len(window) >= self.READ_AHEAD:
+                    yield window.pop(0)
+            while window:
+                yield window.pop(0)
+
+    def build(self) -> Optional[str]:
+        """
+        Writes the archive and stages its export manifest; see
+        confirm_download().
+
+        Returns:
+            Path of the ZIP file, or None if there was nothing to export
+        """
+        previous = self.load_manifest() if self.incremental else {"files": {}}
+        previous_files = previous.get("files", {})
+        # Carry unchanged entries forward so the next export compares against them
+        current_files = {}
+        seen = set()
+        for source_path, arcname in self.entries:
+            seen.add(arcname)
+            if arcname in previous_files:
+                current_files[arcname] = previous_files[arcname]
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = "_changes" if self.incremental else ""
+        zip_path = os.path.join(self.output_dir, f"{self.name}{suffix}_{timestamp}.zip")
+        fd, tmp_path = tempfile.mkstemp(suffix=".zip.part", dir=self.output_dir)
+        os.close(fd)
+
+        included = []
+        try:
+            with zipfile.ZipFile(tmp_path, "w", allowZip64=True) as zipf:
+                for future in self._read_in_order(self._pending_entries(previous_files)):
+                    try:
+                        (source_path, arcname), fingerprint, data, digest = future.result()
+                    except OSError as e:
+                        logging.warning(f"Skipping unreadable file in export: {e}")
+                        continue
+
+                    record = dict(fingerprint, sha256=digest)
+                    if self.incremental and self._is_unchanged(
+                        previous_files.get(arcname), fingerprint, digest
+                    ):
+                        # Touched but identical; remember the new mtime only
+                        current_files[arcname] = record
+                        self.stats["skipped"] += 1
+                        continue
+
+                    info = zipfile.ZipInfo.from_file(source_path, arcname)
+                    info.compress_type = archive_compress_type(source_path)
+                    if data is None:
+                        zipf.write(source_path, arcname, compress_type=info.compress_type)
+                    else:
+                        zipf.writestr(info, data)
+
+                    current_files[arcname] = record
+                    included.append(arcname)
+                    self.stats["files"] += 1
+                    self.stats["bytes"] += fingerprint["size"]
+                    if info.compress_type == zipfile.ZIP_STORED:
+                        self.stats["stored"] += 1
+                    else:
+                        self.stats["deflated"] += 1
+
+                if included:
+                    removed = sorted(set(previous_files) - seen)
+                    zipf.writestr(
+                        EXPORT_MANIFEST_NAME,
+                        json.dumps(
+                            {
+                                "export": self.name,
+                                "created_at": datetime.now().isoformat(),
+                                "incremental": self.incremental,
+                                "since": previous.get("created_at") if self.incremental else None,
+                                "files": included,
+                                "removed": removed if self.incremental else [],
+                            },
+                            indent=2,
+                        ),
+                    )
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        if not included:
+            os.remove(tmp_path)
+            return None
+
+        os.replace(tmp_path, zip_path)
+        if self.manifest_dir:
+            self._stage_manifest(
+                zip_path,
+                {"created_at": datetime.now().isoformat(), "files": current_files},
+            )
+        return zip_path
+
+
+def download_all_documents(incremental=False):
+    """
+    Exports every uploaded student document and registration receipt as a ZIP.
+
+    Args:
+        incremental: Only include files changed since the last documents export
 
+    Returns:
+        Path of the ZIP file, or None on failure or when nothing changed
+    """
     try:
-        conn = sqlite3.connect("student_registration.db")
+        conn = connect_db()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -1355,65 +3499,45 @@ def download_all_documents():
         )
         registrations = cursor.fetchall()
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"all_documents_{timestamp}.zip"
-
-        with zipfile.ZipFile(zip_filename, "w") as zipf:
-            for student in students:
-                student_id, surname, other_names = student[:3]
-                documents = student[3:8]
-                doc_names = [
-                    "ghana_card",
-                    "passport_photo",
-                    "transcript",
-                    "certificate",
-                    "receipt",
-                ]
-                student_dir = f"student_documents/{student_id}_{surname}_{other_names}"
-                for doc_path, doc_name in zip(documents, doc_names):
-                    if doc_path and os.path.exists(doc_path):
-                        _, ext = os.path.splitext(doc_path)
-                        archive_path = f"{student_dir}/{doc_name}{ext}"
-                        zipf.write(doc_path, archive_path)
-
-            for registration in registrations:
-                (
-                    reg_id,
-                    student_id,
-                    surname,
-                    other_names,
-                    receipt_path,
-                    receipt_amount,
-                ) = registration
-                if receipt_path and os.path.exists(receipt_path):
-                    reg_dir = f"course_registration_receipts/{student_id}_{surname}_{other_names}"
-                    _, ext = os.path.splitext(receipt_path)
-                    archive_path = f"{reg_dir}/registration_{reg_id}_receipt{ext}"
-                    zipf.write(receipt_path, archive_path)
-                    
-        # Use the cleanup handler context manager
-        with zip_cleanup_handler.cleanup_after_download(zip_filename):
-            with open(zip_filename, "rb") as f:
-                st.download_button(
-                    label="Download Documents ZIP",
-                    data=f,
-                    file_name=zip_filename,
-                    mime="application/zip"
-                )
-
-        return zip_filename
-    
+        archive = StreamingArchive("all_documents", incremental=incremental)
+        for student in students:
+            student_id, surname, other_names = student[:3]
+            documents = student[3:8]
+            doc_names = [
+                "ghana_card",
+                "passport_photo",
+                "transcript",
+                "certificate",
+                "receipt",
+            ]
+            student_dir = f"student_documents/{student_id}_{surname}_{other_names}"
+            for doc_path, doc_name in zip(documents, doc_names):
+                if doc_path:
+                    _, ext = os.path.splitext(doc_path)
+                    archive.add(doc_path, f"{student_dir}/{doc_name}{ext}")
 
+        for registration in registrations:
+            (
+                reg_id,
+                student_id,
+                surname,
+                other_names,
+                receipt_path,
+                receipt_amount,
+            ) = registration
+            if receipt_path:
+                reg_dir = f"course_registration_receipts/{student_id}_{surname}_{other_names}"
+                _, ext = os.path.splitext(receipt_path)
+                archive.add(receipt_path, f"{reg_dir}/registration_{reg_id}_receipt{ext}")
+
+        return archive.build()
 
     except Exception as e:
         st.error(f"Error creating zip file: {str(e)}")
         return None
-    
 
     finally:
         conn.close()
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
 
 
 def course_registration_form():
@@ -1433,20 +3557,24 @@ def course_registration_form():
         )
         st.stop()
 
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
     c = conn.cursor()
     c.execute(
         "SELECT * FROM student_info WHERE student_id = ?", (form_data["student_id"],)
     )
     student_info = c.fetchone()
+    conn.close()
     if student_info:
         st.markdown("---")
         col_photo, col_info = st.columns([1, 3])
         with col_photo:
             if student_info[28]:
                 try:
-                    image = PILImage.open(student_info[28])
-                    st.image(image, caption="Student Photo", width=150)
+                    st.image(
+                        thumbnail_path(student_info[28]),
+                        caption="Student Photo",
+                        width=150,
+                    )
                 except Exception as e:
                     st.error(f"Error loading passport photo: {str(e)}")
             else:
@@ -1456,12 +3584,11 @@ def course_registration_form():
             st.write(f"**Student ID:** {student_info[0]}")
             st.write(f"**Email:** {student_info[8]}")
             st.write(f"**Phone:** {student_info[9]}")
+        catalog = get_course_catalog()
         col3, col4 = st.columns(2)
         with col3:
-            form_data["programme"] = st.selectbox(
-                "Programme", ["CIMG", "CIM-UK", "ICAG", "ACCA"]
-            )
-            program_levels = list(get_program_courses(form_data["programme"]).keys())
+            form_data["programme"] = st.selectbox("Programme", catalog.programmes)
+            program_levels = list(catalog.levels(form_data["programme"]))
             form_data["level"] = st.selectbox("Level/Part", program_levels)
             form_data["specialization"] = st.text_input("Specialization (Optional)")
         with col4:
@@ -1475,16 +3602,14 @@ def course_registration_form():
                 "Semester", ["First", "Second", "Third"]
             )
         st.subheader("Course Selection")
-        available_courses = get_program_courses(form_data["programme"]).get(
-            form_data["level"], []
-        )
+        available_courses = catalog.courses(form_data["programme"], form_data["level"])
         selected_courses = st.multiselect(
             "Select Courses",
             available_courses,
-            format_func=lambda x: f"{x.split('|')[0]} - {x.split('|')[1]} ({x.split('|')[2]} credits)",
+            format_func=Course.label,
         )
-        total_credits = sum([int(course.split("|")[2]) for course in selected_courses])
-        form_data["courses"] = "\n".join(selected_courses)
+        total_credits = catalog.total_credits(selected_courses)
+        form_data["courses"] = "\n".join(course.line for course in selected_courses)
         form_data["total_credits"] = total_credits
         st.text_area(
             "Selected Courses", form_data["courses"], height=150, disabled=True
@@ -1506,7 +3631,9 @@ def course_registration_form():
                 "Upload Payment Receipt (Optional)", type=["pdf", "jpg", "png"]
             )
             form_data["receipt_path"] = (
-                save_uploaded_file(receipt, "uploads") if receipt else None
+                save_uploaded_file(receipt, "uploads", form_data["student_id"])
+                if receipt
+                else None
             )
         with col6:
             form_data["receipt_amount"] = (
@@ -1517,6 +3644,8 @@ def course_registration_form():
         if st.button("Review Registration"):
             review_course_registration(form_data)
         if st.button("Confirm and Submit"):
+            conn = connect_db()
+            c = conn.cursor()
             try:
                 c.execute(
                     """
@@ -1543,7 +3672,9 @@ def course_registration_form():
                         form_data["receipt_amount"],
                     ),
                 )
+                sync_registration_items(conn, c.lastrowid, form_data["courses"])
                 conn.commit()
+                invalidate_query_cache("course_registration")
                 st.success("Course registration submitted! Pending admin approval.")
             except sqlite3.IntegrityError:
                 st.error("Error in registration. Please check if student ID exists.")
@@ -1551,10 +3682,523 @@ def course_registration_form():
                 conn.close()
     else:
         st.warning("No matching student record found. Please verify the Student ID.")
-        conn.close()
         return
 
 
+#####################
+# Background Jobs   #
+#####################
+#
+# Heavy admin actions run as jobs in worker threads of the server process,
+# so a browser refresh or navigating away no longer kills them. The jobs
+# table records parameters, progress and results; job files (uploaded
+# inputs and result artifacts) live under JOB_ARTIFACT_DIR/<job_id>/.
+# CPU-heavy handlers fan out further through their own process pools.
+
+JOB_ARTIFACT_DIR = "job_artifacts"
+JOB_WORKERS = 2  # Jobs running at the same time; the rest wait queued
+JOB_FINISHED_STATUSES = ("succeeded", "failed", "cancelled", "interrupted")
+
+# job_type -> (title, handler); handlers take (JobContext, params) and
+# return a JSON-serializable dict, whose optional "artifact" entry names a
+# result file to offer for download.
+JOB_HANDLERS: Dict[str, Tuple[str, Callable]] = {}
+
+
+def job_handler(job_type: str, title: str):
+    """Registers a function as the handler for job_type"""
+
+    def register(func):
+        JOB_HANDLERS[job_type] = (title, func)
+        return func
+
+    return register
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when an admin has cancelled it"""
+
+
+def _now_text() -> str:
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+class JobContext:
+    """Handed to job handlers for progress reporting, cancellation and files"""
+
+    def __init__(self, job_id: int, cancel_event: threading.Event, db_path: str = DB_PATH):
+        self.job_id = job_id
+        self.cancel_event = cancel_event
+        self.db_path = db_path
+        self.directory = os.path.join(JOB_ARTIFACT_DIR, str(job_id))
+        self.progress_done = 0
+        self.progress_total = None
+        self.message = None
+        self.updated_at = None
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None):
+        """
+        Records progress and raises JobCancelled if the job has been
+        cancelled. Usable directly as a progress_callback(done, total).
+
+        Progress is kept in memory and read by JobManager.list_jobs(), so
+        it costs nothing inside a handler's write transaction; it is
+        written to the jobs table when the job finishes.
+        """
+        self.check_cancelled()
+        self.progress_done = done
+        self.progress_total = total
+        if message is not None:
+            self.message = message
+        self.updated_at = _now_text()
+
+    def artifact_path(self, filename: str) -> str:
+        """Path for a result file inside this job's directory"""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, os.path.basename(filename))
+
+    def keep_artifact(self, path: str) -> str:
+        """Moves a file written elsewhere into this job's directory"""
+        target = self.artifact_path(path)
+        shutil.move(path, target)
+        return target
+
+
+class JobManager:
+    """
+    Runs registered job handlers on a thread pool and persists their state
+    in the jobs table.
+
+    On start-up, jobs left 'running' by a previous server process are
+    marked 'interrupted' and jobs still 'queued' are picked up again.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, max_workers: int = JOB_WORKERS):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.db_path = db_path
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._cancel_events: Dict[int, threading.Event] = {}
+        self._running: Dict[int, JobContext] = {}  # Live progress of running jobs
+        self._lock = threading.Lock()
+        self._recover()
+
+    def _recover(self):
+        conn = connect_db(self.db_path)
+        try:
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'interrupted', finished_at = ?,
+                    error = 'The server stopped while this job was running'
+                WHERE status = 'running'
+                """,
+                (_now_text(),),
+            )
+            conn.commit()
+            queued = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY job_id"
+                )
+            ]
+        finally:
+            conn.close()
+        for job_id in queued:
+            self._schedule(job_id)
+
+    def _schedule(self, job_id: int):
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+        self.executor.submit(self._run, job_id)
+
+    def submit(self, job_type: str, params: Optional[Dict[str, Any]] = None, files=None, title=None) -> int:
+        """
+        Queues a job.
+
+        Args:
+            job_type: A key of JOB_HANDLERS
+            params: JSON-serializable handler parameters
+            files: Optional {param name: uploaded file}; each is saved into
+                the job directory and its path passed as that parameter
+            title: Shown in the Jobs view (default: the handler's title)
+
+        Returns:
+            The job ID
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        params = dict(params or {})
+        conn = connect_db(self.db_path)
+        try:
+            cursor = conn.execute(
+                "INSERT INTO jobs (job_type, title, status, created_at) VALUES (?, ?, 'pending', ?)",
+                (job_type, title or JOB_HANDLERS[job_type][0], _now_text()),
+            )
+            job_id = cursor.lastrowid
+            conn.commit()
+
+            directory = os.path.join(JOB_ARTIFACT_DIR, str(job_id), "inputs")
+            for name, uploaded_file in (files or {}).items():
+                if uploaded_file is None:
+                    params[name] = None
+                    continue
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, os.path.basename(uploaded_file.name))
+                with open(path, "wb") as f:
+                    f.write(uploaded_file.getbuffer())
+                params[name] = path
+
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', params = ? WHERE job_id = ?",
+                (json.dumps(params), job_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._schedule(job_id)
+        return job_id
+
+    def _finish(self, job_id: int, status: str, context: Optional[JobContext] = None, **fields):
+        if context is not None and context.updated_at:
+            # Live progress is only held in memory until the job ends
+            progress = {
+                "progress_done": context.progress_done,
+                "progress_total": context.progress_total,
+            }
+            if context.message is not None:
+                progress["message"] = context.message
+            fields = {**progress, **fields}
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = connect_db(self.db_path)
+        try:
+            conn.execute(
+                f"""
+                UPDATE jobs SET status = ?, finished_at = ?, updated_at = ?
+                    {", " + assignments if assignments else ""}
+                WHERE job_id = ?
+                """,
+                (status, _now_text(), _now_text(), *fields.values(), job_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _run(self, job_id: int):
+        cancel_event = self._cancel_events.get(job_id) or threading.Event()
+        conn = connect_db(self.db_path)
+        try:
+            claimed = conn.execute(
+                """
+                UPDATE jobs SET status = 'running', started_at = ?, updated_at = ?
+                WHERE job_id = ? AND status = 'queued'
+                """,
+                (_now_text(), _now_text(), job_id),
+            ).rowcount
+            conn.commit()
+            row = conn.execute(
+                "SELECT job_type, params FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not claimed:
+            return  # Cancelled while queued
+
+        job_type, params = row
+        context = JobContext(job_id, cancel_event, self.db_path)
+        with self._lock:
+            self._running[job_id] = context
+        try:
+            _, handler = JOB_HANDLERS[job_type]
+            result = handler(context, json.loads(params or "{}")) or {}
+            artifact = result.pop("artifact", None)
+            if artifact and os.path.dirname(os.path.abspath(artifact)) != os.path.abspath(
+                context.directory
+            ):
+                artifact = context.keep_artifact(artifact)
+            self._finish(
+                job_id,
+                "succeeded",
+                context,
+                result=json.dumps(result, default=str),
+                result_path=artifact,
+            )
+        except JobCancelled:
+            self._finish(job_id, "cancelled", context, message="Cancelled by an administrator")
+        except Exception as e:
+            logging.exception(f"Job {job_id} ({job_type}) failed")
+            self._finish(job_id, "failed", context, error=str(e))
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+                self._running.pop(job_id, None)
+
+    def cancel(self, job_id: int):
+        """Cancels a queued job at once; a running one stops at its next progress report"""
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        conn = connect_db(self.db_path)
+        try:
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'cancelled', finished_at = ?,
+                    message = 'Cancelled before it started'
+                WHERE job_id = ? AND status IN ('pending', 'queued')
+                """,
+                (_now_text(), job_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        jobs = self.list_jobs(job_id=job_id)
+        return jobs[0] if jobs else None
+
+    def list_jobs(self, limit: int = 50, job_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent jobs first, with decoded result and ETA"""
+        conn = connect_db(self.db_path)
+        previous_factory = conn.row_factory
+        try:
+            conn.row_factory = sqlite3.Row
+            if job_id is None:
+                rows = conn.execute(
+                    "SELECT * FROM jobs ORDER BY job_id DESC LIMIT ?", (limit,)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchall()
+        finally:
+            conn.row_factory = previous_factory
+            conn.close()
+        with self._lock:
+            running = dict(self._running)
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            context = running.get(job["job_id"])
+            if context is not None and context.updated_at:
+                job["progress_done"] = context.progress_done
+                job["progress_total"] = context.progress_total
+                job["message"] = context.message or job["message"]
+                job["updated_at"] = context.updated_at
+            job["result"] = json.loads(job["result"]) if job["result"] else {}
+            job["eta_seconds"] = job_eta_seconds(job)
+            jobs.append(job)
+        return jobs
+
+    def clear_finished(self) -> int:
+        """Deletes finished jobs and their files; returns how many were removed"""
+        placeholders = ", ".join("?" for _ in JOB_FINISHED_STATUSES)
+        conn = connect_db(self.db_path)
+        try:
+            job_ids = [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT job_id FROM jobs WHERE status IN ({placeholders})",
+                    JOB_FINISHED_STATUSES,
+                )
+            ]
+            conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders})", JOB_FINISHED_STATUSES
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        for job_id in job_ids:
+            shutil.rmtree(os.path.join(JOB_ARTIFACT_DIR, str(job_id)), ignore_errors=True)
+        return len(job_ids)
+
+
+def job_eta_seconds(job: Dict[str, Any]) -> Optional[float]:
+    """Remaining seconds for a running job, extrapolated from its progress so far"""
+    if job["status"] != "running" or not job["started_at"]:
+        return None
+    done, total = job["progress_done"] or 0, job["progress_total"]
+    if not total or done <= 0:
+        return None
+    elapsed = (datetime.now() - datetime.fromisoformat(job["started_at"])).total_seconds()
+    return elapsed / done * max(total - done, 0)
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide JobManager"""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
+
+
+@job_handler("bulk_upload", "Bulk upload")
+def _bulk_upload_job(context: JobContext, params):
+    result = bulk_ingest(
+        TableReader(params["student_file"], required_columns=["student_id"]),
+        TableReader(params["registration_file"], required_columns=["student_id"]),
+        progress_callback=context.progress,
+    )
+    rejects = result.pop("rejects")
+    result["rejected"] = len(rejects)
+    if not rejects.empty:
+        result["artifact"] = context.artifact_path("bulk_upload_rejects.csv")
+        rejects.to_csv(result["artifact"], index=False)
+    return result
+
+
+@job_handler("batch_pdfs", "Batch PDFs")
+def _batch_pdfs_job(context: JobContext, params):
+    zip_file = generate_batch_pdfs(
+        params["document_type"], progress_callback=context.progress
+    )
+    context.check_cancelled()
+    if not zip_file:
+        raise RuntimeError("PDF generation failed; see the server log")
+    return {"artifact": zip_file}
+
+
+@job_handler("id_cards", "ID cards")
+def _id_cards_job(context: JobContext, params):
+    pdf_path, message = IDCardGenerator().generate_id_cards(
+        programme=params.get("programme"),
+        progress_callback=context.progress,
+        max_workers=params.get("max_workers"),
+        mode=params.get("mode", "raster"),
+    )
+    if not pdf_path:
+        raise RuntimeError(message)
+    return {"artifact": pdf_path, "summary": message}
+
+
+@job_handler("database_export", "Complete database export (Excel)")
+def _database_export_job(context: JobContext, params):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    zip_path = context.artifact_path(f"complete_database_{timestamp}.zip")
+    export_database_workbooks(zip_path, progress_callback=context.progress)
+    return {"artifact": zip_path}
+
+
+@job_handler("backup", "Backup")
+def _backup_job(context: JobContext, params):
+    context.progress(0, None, "Backing up database and uploads")
+    manifest = perform_backup()
+    return dict(manifest["stats"], backup_id=manifest["backup_id"])
+
+
+@job_handler("send_emails", "Send emails")
+def _send_emails_job(context: JobContext, params):
+    return EmailOutbox().deliver(params["batch_id"], progress_callback=context.progress)
+
+
+@job_handler("compress_files", "Compress oversized files")
+def _compress_files_job(context: JobContext, params):
+    return BatchFileCompressor().run(
+        progress_callback=context.progress, max_workers=params.get("max_workers")
+    )
+
+
+def submit_job(job_type: str, params=None, files=None, state_key: Optional[str] = None, title=None) -> int:
+    """
+    Queues a job from a Streamlit page, remembering its ID under state_key
+    so the page can keep showing its status (see render_job_status).
+    """
+    job_id = get_job_manager().submit(job_type, params, files=files, title=title)
+    if state_key:
+        st.session_state[state_key] = job_id
+    st.success(f"Started job #{job_id}. It keeps running if you leave this page; see Jobs.")
+    return job_id
+
+
+def _format_seconds(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds}s"
+
+
+def render_job(job: Dict[str, Any], key_prefix: str = "job"):
+    """Status, progress/ETA, result and actions of one job"""
+    status = job["status"]
+    icon = {
+        "pending": "⏳",
+        "queued": "⏳",
+        "running": "🔄",
+        "succeeded": "✅",
+        "failed": "❌",
+        "cancelled": "🚫",
+        "interrupted": "⚠️",
+    }.get(status, "")
+    st.markdown(f"**#{job['job_id']} {job['title']}** — {icon} {status}")
+
+    if status == "running":
+        done, total = job["progress_done"] or 0, job["progress_total"]
+        text = f"{done} of {total}" if total else f"{done} done"
+        if job["eta_seconds"] is not None:
+            text += f" · about {_format_seconds(job['eta_seconds'])} left"
+        progress = min(done / total, 1.0) if total else 0.0
+        st.progress(progress, text=text)
+    if job["message"]:
+        st.caption(job["message"])
+    if job["error"]:
+        st.error(job["error"])
+    if job["result"]:
+        st.caption(", ".join(f"{name}: {value}" for name, value in job["result"].items()))
+
+    if status in ("pending", "queued", "running"):
+        if st.button("Cancel", key=f"{key_prefix}_cancel_{job['job_id']}"):
+            get_job_manager().cancel(job["job_id"])
+    elif job["result_path"] and os.path.exists(job["result_path"]):
+        with open(job["result_path"], "rb") as f:
+            st.download_button(
+                label=f"Download {os.path.basename(job['result_path'])}",
+                data=f,
+                file_name=os.path.basename(job["result_path"]),
+                key=f"{key_prefix}_download_{job['job_id']}",
+            )
+
+
+@st.fragment(run_every=2)
+def render_job_status(state_key: str):
+    """Live status of the job last submitted under state_key on this page"""
+    job_id = st.session_state.get(state_key)
+    job = get_job_manager().get_job(job_id) if job_id else None
+    if job:
+        render_job(job, key_prefix=state_key)
+
+
+@st.fragment(run_every=2)
+def _job_list():
+    jobs = get_job_manager().list_jobs()
+    if not jobs:
+        st.info("No jobs yet")
+        return
+    for job in jobs:
+        with st.container(border=True):
+            render_job(job)
+
+
+def jobs_dashboard():
+    """Jobs view: every background job, refreshed every two seconds"""
+    st.subheader("Background Jobs")
+    st.caption(
+        "Long-running actions run here in the background. Only this list "
+        "refreshes; other admin pages are not blocked."
+    )
+    if st.button("Clear Finished Jobs"):
+        removed = get_job_manager().clear_finished()
+        st.success(f"Removed {removed} finished jobs and their files")
+    _job_list()
+
+
 def admin_dashboard():
     st.title("Admin Dashboard")
 
@@ -1571,6 +4215,7 @@ def admin_dashboard():
             "Send Emails",
             "Notifications",
             "ID Card Generator",
+            "Jobs",
             "System Monitor",
         ],  # Added Notifications
     )
@@ -1595,220 +4240,1217 @@ def admin_dashboard():
         admin_notification_interface()
     elif menu == "ID Card Generator":
         id_card_generator_ui()
+    elif menu == "Jobs":
+        jobs_dashboard()
     elif menu == "System Monitor":
         st.subheader("System Resource Monitor")
         metrics = system_resource_monitor()
         st.write(f"CPU Usage: {metrics['cpu']}%")
         st.write(f"Memory Usage: {metrics['memory_percent']}%")
         st.write(f"Disk Usage: {metrics['disk_percent']}%")
+
+        st.subheader("Database Connection Pool")
+        pool_stats = get_connection_pool().stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Pool Hit Rate", f"{pool_stats['hit_rate']:.0%}")
+        col2.metric("Connections In Use", pool_stats["in_use"])
+        col3.metric("Pool Waits", pool_stats["waits"])
+        col4.metric("Lock Retries", pool_stats["lock_retries"])
+        with st.expander("Pool details"):
+            st.json(pool_stats)
+
+        st.subheader("Photo Thumbnail Cache")
+        thumb_stats = get_thumbnail_cache().stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Thumbnail Hit Rate", f"{thumb_stats['hit_rate']:.0%}")
+        col2.metric("Generated", thumb_stats["generated"])
+        col3.metric(
+            "Cache Size",
+            f"{thumb_stats['size_mb']:.1f} / {thumb_stats['max_size_mb']:.0f} MB",
+        )
+
+        st.subheader("Upload Store")
+        store_stats = get_upload_store().stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Documents", store_stats["documents"])
+        col2.metric("References", store_stats["references"])
+        col3.metric("Stored", f"{store_stats['stored_mb']:.1f} MB")
+        col4.metric(
+            "Unreferenced",
+            f"{store_stats['unreferenced']} ({store_stats['unreferenced_mb']:.1f} MB)",
+        )
+
+        st.subheader("Upload Garbage Collector")
+        collector = UploadGarbageCollector()
+        gc_stats = collector.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Reclaimed", f"{gc_stats['reclaimed_mb']:.1f} MB")
+        col2.metric(
+            "In Quarantine",
+            f"{gc_stats['quarantined']} ({gc_stats['quarantined_mb']:.1f} MB)",
+        )
+        col3.metric("Time Spent", f"{gc_stats['seconds']:.1f}s over {gc_stats['runs']} runs")
+        col4.metric("Full Passes", gc_stats["passes"])
+        st.caption(
+            f"Last run: {gc_stats['last_run'] or 'never'} • "
+            f"cursor: {gc_stats['cursor'] or '(start)'}"
+        )
+        if st.button("Run Collection Now"):
+            result = run_upload_gc()
+            if result is None:
+                st.info("A collection is already running")
+            else:
+                st.json(result)
+        with st.expander("Recent collector runs"):
+            st.dataframe(collector.recent_runs(), use_container_width=True)
+
+        st.subheader("Query Cache")
+        query_stats = query_cache.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Query Hit Rate", f"{query_stats['hit_rate']:.0%}")
+        col2.metric("Hits", query_stats["hits"])
+        col3.metric("Misses", query_stats["misses"])
+        col4.metric("Entries", query_stats["entries"])
+        with st.expander("Query cache details"):
+            st.json(query_stats)
+
+        st.subheader("PDF Cache")
+        pdf_stats = get_pdf_cache().stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("PDF Hit Rate", f"{pdf_stats['hit_rate']:.0%}")
+        col2.metric("Hits", pdf_stats["hits"])
+        col3.metric("Misses", pdf_stats["misses"])
+        col4.metric(
+            "Cache Size",
+            f"{pdf_stats['size_mb']:.1f} / {pdf_stats['max_size_mb']:.0f} MB",
+        )
+
+        with st.expander("Performance Benchmarks"):
+            st.caption(
+                f"Schema migration version: "
+                f"{DatabaseMigrationHandler(DB_PATH).get_migration_version()}"
+            )
+            bench_students = st.number_input(
+                "Synthetic students",
+                min_value=1000,
+                max_value=500000,
+                value=100000,
+                step=10000,
+                key="bench_students",
+            )
+            if st.button("Run Index Benchmark"):
+                with st.spinner("Building scratch database and timing queries..."):
+                    st.dataframe(benchmark_schema_indexes(int(bench_students)))
+            if st.button("Run Search Benchmark"):
+                with st.spinner("Comparing LIKE and full-text search..."):
+                    st.dataframe(benchmark_student_search(int(bench_students)))
+            if st.button("Run Export Benchmark"):
+                with st.spinner("Exporting and importing a scratch database..."):
+                    st.dataframe(benchmark_database_export(int(bench_students)))
+            if st.button("Run Bulk Upload Benchmark"):
+                with st.spinner("Writing a 50,000-row workbook and loading it..."):
+                    st.dataframe(benchmark_bulk_ingestion(50_000))
+            if st.button("Run ID Card Benchmark"):
+                with st.spinner("Rendering 500 ID cards..."):
+                    st.dataframe(benchmark_id_cards(500))
+
+        st.subheader("Backups")
+        backup_store = BackupStore()
+        backup_stats = backup_store.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Backups", backup_stats["backups"])
+        col2.metric("Stored", f"{backup_stats['stored_mb']:.1f} MB")
+        col3.metric("Without Deduplication", f"{backup_stats['logical_mb']:.1f} MB")
         if should_backup():
             st.warning(
-                "Backup recommended: Either it has been over 30 days since the last backup or disk usage is ≥ 90%."
+                f"Backup recommended: Either it has been over {BACKUP_INTERVAL_DAYS} days since the last backup or disk usage is ≥ 90%."
             )
         if st.button("Perform Backup Now"):
-            backup_file = perform_backup()
-            st.success(f"Backup performed successfully! Backup file: {backup_file}")
-            try:
-                with open(backup_file, "rb") as f:
+            submit_job("backup", state_key="backup_job")
+        render_job_status("backup_job")
+
+        backups = backup_store.list_backups()
+        if backups:
+            with st.expander("Manage Backups"):
+                st.dataframe(
+                    pd.DataFrame(
+                        [
+                            {
+                                "backup": manifest["backup_id"],
+                                "label": manifest["label"],
+                                "created_at": manifest["created_at"],
+                                "files": manifest["stats"]["files"],
+                                "new_mb": round(manifest["stats"]["copied_bytes"] / (1024 * 1024), 2),
+                            }
+                            for manifest in backups
+                        ]
+                    )
+                )
+                backup_id = st.selectbox(
+                    "Backup", [manifest["backup_id"] for manifest in backups]
+                )
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if st.button("Download Backup"):
+                        try:
+                            zip_file = backup_store.export_archive(backup_id)
+                            with open(zip_file, "rb") as f:
+                                st.download_button(
+                                    label="Download Backup ZIP",
+                                    data=f,
+                                    file_name=os.path.basename(zip_file),
+                                    mime="application/zip",
+                                )
+                            os.remove(zip_file)
+                        except Exception as e:
+                            st.error(f"Error providing download: {str(e)}")
+                with col2:
+                    confirm_restore = st.checkbox(
+                        "I understand the database and uploads will be overwritten",
+                        key="confirm_restore",
+                    )
+                    if st.button("Restore Backup", disabled=not confirm_restore):
+                        try:
+                            counts = backup_store.restore(backup_id)
+                            st.success(
+                                f"Restored {backup_id}: {counts['restored']} files rewritten, "
+                                f"{counts['unchanged']} unchanged. The state before the "
+                                f"restore was backed up first."
+                            )
+                        except Exception as e:
+                            st.error(f"Error restoring backup: {str(e)}")
+                with col3:
+                    if st.button("Prune Old Backups"):
+                        pruned = backup_store.prune()
+                        st.success(
+                            f"Removed {pruned['backups']} backups and {pruned['objects']} "
+                            f"unreferenced files ({pruned['freed_bytes'] / (1024 * 1024):.1f} MB)."
+                        )
+
+
+# Folder and name of each referencing row's document in the uploads export
+UPLOAD_EXPORT_LAYOUT = {
+    "student_info": ("student_id", "student_documents/{key}/{column}{ext}"),
+    "course_registration": (
+        "registration_id",
+        "course_registration_receipts/registration_{key}_receipt{ext}",
+    ),
+    "email_batches": ("batch_id", "email_attachments/batch_{key}_{name}"),
+    "notifications": ("notification_id", "notification_attachments/notification_{key}_{name}"),
+}
+
+
+def zip_uploads_folder(incremental=False):
+    """
+    Zips every uploaded document that a record refers to, named after the
+    record (e.g. student_documents/<student_id>/ghana_card.pdf) rather than
+    the upload store's hash paths. Files nothing refers to, such as copies
+    left behind by the move into the upload store, are not included.
+
+    Args:
+        incremental: Only include files changed since the last uploads export
+
+    Returns:
+        The filename of the generated zip file, or None if the uploads folder
+        does not exist or nothing changed.
+    """
+    uploads_dir = "uploads"
+    if not os.path.exists(uploads_dir):
+        return None
+    archive = StreamingArchive("uploads_folder", incremental=incremental)
+    conn = connect_db()
+    try:
+        names = dict(conn.execute("SELECT path, original_name FROM documents"))
+        for table, column, json_path in DOCUMENT_REFERENCES:
+            key_column, layout = UPLOAD_EXPORT_LAYOUT[table]
+            rows = conn.execute(
+                f"""
+                SELECT {key_column}, path FROM (
+                    SELECT {key_column}, {_document_reference_sql(column, json_path)} AS path
+                    FROM {table}
+                )
+                WHERE path IS NOT NULL ORDER BY {key_column}
+                """
+            ).fetchall()
+            for key, path in rows:
+                if not os.path.isfile(path):
+                    continue
+                name = os.path.basename(names.get(path) or path)
+                archive.add(
+                    path,
+                    layout.format(
+                        key=key,
+                        column=column.removesuffix("_path"),
+                        ext=os.path.splitext(path)[1],
+                        name=name,
+                    ),
+                )
+    finally:
+        conn.close()
+    return archive.build()
+
+
+def export_database_workbooks(zip_path: str, progress_callback=None) -> str:
+    """
+    Writes student_info and course_registration to one Excel workbook each,
+    with columns sized to their contents, and zips them.
+
+    Args:
+        zip_path: Path of the ZIP file to write
+        progress_callback: Optional callable(done, total) invoked per table
+
+    Returns:
+        zip_path
+    """
+    queries = {
+        "student_info": """
+            SELECT *,
+                CASE WHEN receipt_path IS NOT NULL THEN 'Yes' ELSE 'No' END as has_receipt,
+                receipt_amount
+            FROM student_info
+        """,
+        "course_registration": """
+            SELECT *,
+                CASE WHEN receipt_path IS NOT NULL THEN 'Yes' ELSE 'No' END as has_receipt,
+                receipt_amount
+            FROM course_registration
+        """,
+    }
+    conn = connect_db()
+    try:
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for done, (table_name, query) in enumerate(queries.items()):
+                if progress_callback:
+                    progress_callback(done, len(queries))
+                df = pd.read_sql_query(query, conn)
+                buffer = io.BytesIO()
+                with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+                    df.to_excel(writer, index=False, sheet_name=table_name)
+                    worksheet = writer.sheets[table_name]
+                    for column_cells in worksheet.columns:
+                        max_length = max(
+                            (len(str(cell.value)) for cell in column_cells if cell.value is not None),
+                            default=0,
+                        )
+                        worksheet.column_dimensions[column_cells[0].column_letter].width = (
+                            max_length + 2
+                        )
+                zipf.writestr(f"{table_name}.xlsx", buffer.getvalue())
+        if progress_callback:
+            progress_callback(len(queries), len(queries))
+    finally:
+        conn.close()
+    return zip_path
+
+
+def manage_database():
+    st.subheader("Database Management")
+
+    col1, col2, col3, col4 = st.columns(4)  # Added a new column for the new button
+
+    with col1:
+        st.write("### Export Complete Database")
+        if st.button("Download Complete Database (Excel)"):
+            submit_job("database_export", state_key="database_export_job")
+        render_job_status("database_export_job")
+
+    with col2:
+        st.write("### Download All Documents")
+        docs_incremental = st.checkbox(
+            "Only changed since last export", key="export_docs_incremental"
+        )
+        if st.button("Download All Documents"):
+            with st.spinner("Creating zip file of all documents..."):
+                zip_file = download_all_documents(incremental=docs_incremental)
+                if zip_file and os.path.exists(zip_file):
+                    with open(zip_file, "rb") as f:
+                        zip_data = f.read()
+                    os.remove(zip_file)
                     st.download_button(
-                        label="Download Backup",
-                        data=f,
-                        file_name=backup_file.split(os.sep)[-1],
+                        label="Download Documents ZIP",
+                        data=zip_data,
+                        file_name=os.path.basename(zip_file),
                         mime="application/zip",
+                        on_click=StreamingArchive.confirm_download,
+                        args=("all_documents", zip_file),
                     )
-            except Exception as e:
-                st.error(f"Error providing download: {str(e)}")
+                elif docs_incremental:
+                    st.info("No documents changed since the last export")
+                else:
+                    st.error("Error creating zip file or no documents found")
+
+    with col3:
+        st.write("### Download All Receipts")
+        receipts_incremental = st.checkbox(
+            "Only changed since last export", key="export_receipts_incremental"
+        )
+        if st.button("Download All Receipts"):
+            with st.spinner("Creating zip file of all receipts..."):
+                zip_file = download_receipts(incremental=receipts_incremental)
+                if zip_file and os.path.exists(zip_file):
+                    with open(zip_file, "rb") as f:
+                        zip_data = f.read()
+                    os.remove(zip_file)
+                    st.download_button(
+                        label="Download Receipts ZIP",
+                        data=zip_data,
+                        file_name=os.path.basename(zip_file),
+                        mime="application/zip",
+                        on_click=StreamingArchive.confirm_download,
+                        args=("all_receipts", zip_file),
+                    )
+                elif receipts_incremental:
+                    st.info("No receipts changed since the last export")
+                else:
+                    st.error("Error creating zip file or no receipts found")
+
+    with col4:
+        st.write("### Download Uploads Folder")
+        uploads_incremental = st.checkbox(
+            "Only changed since last export", key="export_uploads_incremental"
+        )
+        if st.button("Download Uploads Folder"):
+            with st.spinner("Creating zip file of the uploads folder..."):
+                zip_file = zip_uploads_folder(incremental=uploads_incremental)
+                if zip_file and os.path.exists(zip_file):
+                    with open(zip_file, "rb") as f:
+                        zip_data = f.read()
+                    os.remove(zip_file)
+                    st.download_button(
+                        label="Download Uploads ZIP",
+                        data=zip_data,
+                        file_name=os.path.basename(zip_file),
+                        mime="application/zip",
+                        on_click=StreamingArchive.confirm_download,
+                        args=("uploads_folder", zip_file),
+                    )
+                elif uploads_incremental:
+                    st.info("No uploads changed since the last export")
+                else:
+                    st.error("Uploads folder not found or error creating zip")
+
+    st.write("### Generate All PDFs")
+    col_pdfs1, col_pdfs2 = st.columns(2)
+    with col_pdfs1:
+        if st.button("Generate All Student Info PDFs"):
+            submit_job(
+                "batch_pdfs",
+                {"document_type": "student_info"},
+                state_key="student_info_pdfs_job",
+                title="Student info PDFs",
+            )
+        render_job_status("student_info_pdfs_job")
+    with col_pdfs2:
+        if st.button("Generate All Course Registration PDFs"):
+            submit_job(
+                "batch_pdfs",
+                {"document_type": "course_registration"},
+                state_key="course_registration_pdfs_job",
+                title="Course registration PDFs",
+            )
+        render_job_status("course_registration_pdfs_job")
+
+    st.write("### Compress Oversized Files")
+    st.caption(
+        "Recompresses uploaded images and PDFs larger than the upload limit "
+        "and points the database at the smaller copies."
+    )
+    if st.button("Compress Oversized Files"):
+        submit_job("compress_files", state_key="compress_files_job")
+    render_job_status("compress_files_job")
+
+
+# Streaming table readers
+#
+# Intake and import files are read in bounded DataFrame chunks instead of
+# materializing whole workbooks, so memory stays flat with file size.
+
+
+class TableReader:
+    """
+    Iterates over a spreadsheet or data file as DataFrame chunks of at most
+    chunk_size rows. Each chunk's index is the row's position in the file
+    (0 = first row after the header), so row numbers stay meaningful.
+
+    Supported formats, by file extension:
+    - .xlsx/.xlsm: openpyxl in read-only mode, streamed row by row
+    - .csv: pandas chunked reader; cells are read as text so IDs and phone
+      numbers keep their leading zeros
+    - .parquet: pyarrow record batches
+    - .xls: read whole by pandas (openpyxl cannot stream the legacy format)
+
+    required_columns are checked against the header before the first chunk
+    is produced; a ValueError names any that are missing.
+    """
+
+    EXCEL_EXTENSIONS = {".xlsx", ".xlsm"}
+
+    def __init__(
+        self,
+        source,
+        chunk_size: int = 5000,
+        sheet_name: Optional[str] = None,
+        required_columns: Optional[List[str]] = None,
+    ):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.sheet_name = sheet_name
+        self.required_columns = list(required_columns or [])
+        name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+        self.name = os.path.basename(str(name))
+        self.extension = os.path.splitext(self.name)[1].lower()
+        self.columns: Optional[List[str]] = None
+        self._total_rows = None
+
+    def _rewind(self):
+        """File-like sources (e.g. Streamlit uploads) may be read more than once"""
+        if hasattr(self.source, "seek"):
+            self.source.seek(0)
+
+    def _check_header(self, columns) -> List[str]:
+        columns = [
+            str(column).strip() if column is not None else f"column_{position}"
+            for position, column in enumerate(columns)
+        ]
+        missing = [column for column in self.required_columns if column not in columns]
+        if missing:
+            raise ValueError(
+                f"{self.name or 'File'} is missing required columns: {', '.join(missing)}"
+            )
+        self.columns = columns
+        return columns
+
+    def _open_worksheet(self):
+        self._rewind()
+        workbook = load_workbook(self.source, read_only=True, data_only=True)
+        worksheet = (
+            workbook[self.sheet_name] if self.sheet_name else workbook.worksheets[0]
+        )
+        return workbook, worksheet
+
+    @property
+    def total_rows(self) -> Optional[int]:
+        """Data rows in the file when the format records it cheaply, else None"""
+        if self._total_rows is None:
+            if self.extension in self.EXCEL_EXTENSIONS:
+                workbook, worksheet = self._open_worksheet()
+                try:
+                    if worksheet.max_row:
+                        self._total_rows = max(worksheet.max_row - 1, 0)
+                finally:
+                    workbook.close()
+            elif self.extension == ".parquet":
+                import pyarrow.parquet as pq
+
+                self._rewind()
+                self._total_rows = pq.ParquetFile(self.source).metadata.num_rows
+        return self._total_rows
+
+    def read_header(self) -> List[str]:
+        """Reads and validates only the header row"""
+        for _ in self._chunks(header_only=True):
+            pass
+        return self.columns
+
+    def __iter__(self):
+        return self._chunks()
+
+    def _chunks(self, header_only: bool = False):
+        if self.extension in self.EXCEL_EXTENSIONS:
+            yield from self._excel_chunks(header_only)
+        elif self.extension == ".csv":
+            self._rewind()
+            self._check_header(pd.read_csv(self.source, nrows=0).columns)
+            if header_only:
+                return
+            self._rewind()
+            with pd.read_csv(
+                self.source,
+                chunksize=self.chunk_size,
+                dtype=str,
+                skip_blank_lines=False,
+            ) as reader:
+                for chunk in reader:
+                    chunk.columns = self.columns
+                    yield chunk.dropna(how="all")
+        elif self.extension == ".parquet":
+            import pyarrow.parquet as pq
+
+            self._rewind()
+            parquet_file = pq.ParquetFile(self.source)
+            self._check_header(parquet_file.schema_arrow.names)
+            if header_only:
+                return
+            offset = 0
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+                chunk = batch.to_pandas()
+                chunk.columns = self.columns
+                chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield chunk
+        else:
+            self._rewind()
+            df = pd.read_excel(self.source, sheet_name=self.sheet_name or 0)
+            self._check_header(df.columns)
+            if header_only:
+                return
+            df.columns = self.columns
+            for start in range(0, len(df), self.chunk_size):
+                yield df.iloc[start : start + self.chunk_size]
+
+    def _excel_chunks(self, header_only: bool):
+        workbook, worksheet = self._open_worksheet()
+        try:
+            rows = worksheet.iter_rows(values_only=True)
+            header = self._check_header(next(rows, ()))
+            if header_only:
+                return
+            width = len(header)
+            records, index = [], []
+            for position, row in enumerate(rows):
+                row = row[:width]
+                if all(value is None for value in row):
+                    continue
+                records.append(row)
+                index.append(position)
+                if len(records) >= self.chunk_size:
+                    yield pd.DataFrame.from_records(records, columns=header, index=index)
+                    records, index = [], []
+            if records:
+                yield pd.DataFrame.from_records(records, columns=header, index=index)
+        finally:
+            workbook.close()
+
+
+# Bulk ingestion
+#
+# Intake spreadsheets are normalized and validated column-wise with pandas,
+# then written in executemany chunks inside a single write transaction.
+# Rows that fail validation are reported back instead of being inserted.
+
+BULK_STUDENT_COLUMNS = [
+    "student_id",
+    "surname",
+    "other_names",
+    "date_of_birth",
+    "place_of_birth",
+    "home_town",
+    "residential_address",
+    "postal_address",
+    "email",
+    "telephone",
+    "ghana_card_id",
+    "nationality",
+    "marital_status",
+    "gender",
+    "religion",
+    "denomination",
+    "disability_status",
+    "disability_description",
+    "guardian_name",
+    "guardian_relationship",
+    "guardian_occupation",
+    "guardian_address",
+    "guardian_telephone",
+    "previous_school",
+    "qualification_type",
+    "completion_year",
+    "aggregate_score",
+    "ghana_card_path",
+    "passport_photo_path",
+    "transcript_path",
+    "certificate_path",
+    "receipt_path",
+    "programme",
+]
+
+BULK_REGISTRATION_COLUMNS = [
+    "student_id",
+    "index_number",
+    "programme",
+    "specialization",
+    "level",
+    "session",
+    "academic_year",
+    "semester",
+    "courses",
+    "total_credits",
+    "date_registered",
+    "approval_status",
+    "receipt_path",
+    "receipt_amount",
+]
+
+# Columns that default to NULL rather than "" when missing from a sheet
+BULK_NULL_DEFAULT_COLUMNS = {
+    "ghana_card_path",
+    "passport_photo_path",
+    "transcript_path",
+    "certificate_path",
+    "receipt_path",
+    "programme",
+}
+
+BULK_INSERT_STUDENT_SQL = f"""
+    INSERT OR IGNORE INTO student_info (
+        {", ".join(BULK_STUDENT_COLUMNS)},
+        receipt_amount, approval_status, created_at
+    ) VALUES ({", ".join("?" * (len(BULK_STUDENT_COLUMNS) + 3))})
+"""
+
+BULK_INSERT_REGISTRATION_SQL = f"""
+    INSERT INTO course_registration ({", ".join(BULK_REGISTRATION_COLUMNS)})
+    VALUES ({", ".join("?" * len(BULK_REGISTRATION_COLUMNS))})
+"""
+
+BULK_REJECT_COLUMNS = ["source", "row", "student_id", "reason"]
+
+BULK_EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+# Loads at least this large drop the affected secondary indexes and search
+# triggers up front and rebuild them once at the end.
+BULK_DEFER_INDEX_MIN_ROWS = 10_000
+
+
+def _blank(series: pd.Series) -> pd.Series:
+    """True where a cell is empty: NaN/None or only whitespace"""
+    return series.isna() | series.astype("string").str.strip().eq("")
+
+
+def _normalize_text_column(series: pd.Series) -> pd.Series:
+    """
+    Strips text cells and turns float columns holding whole numbers (years,
+    phone numbers read by Excel as numbers) back into "2019", not "2019.0".
+    Empty cells become None.
+    """
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if (values == values.round()).all():
+            series = series.astype("Int64")
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime("%Y-%m-%d")
+    text = series.astype("string").str.strip()
+    return text.astype(object).where(text.notna(), None)
+
+
+def _normalize_date_column(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Parses a date column into "YYYY-MM-DD" strings.
+
+    Returns:
+        (normalized column, mask of non-empty cells that could not be parsed)
+    """
+    blank = _blank(series)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        parsed = series
+    else:
+        parsed = pd.to_datetime(
+            series.where(~blank), errors="coerce", format="mixed", dayfirst=True
+        )
+    formatted = parsed.dt.strftime("%Y-%m-%d")
+    return formatted.astype(object).where(parsed.notna(), None), parsed.isna() & ~blank
+
+
+def _normalize_number_column(series: pd.Series, default) -> Tuple[pd.Series, pd.Series]:
+    """
+    Coerces a numeric column, filling empty cells with default.
+
+    Returns:
+        (numeric column, mask of non-empty cells that are not numbers)
+    """
+    blank = _blank(series)
+    numbers = pd.to_numeric(series.where(~blank), errors="coerce")
+    return numbers.fillna(default), numbers.isna() & ~blank
+
+
+def _collect_rejects(df: pd.DataFrame, source: str, checks) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Splits df into accepted rows and a rejects frame.
+
+    checks is a list of (mask, reason); a row failing several checks is
+    reported once per reason. Row numbers are spreadsheet rows (header = 1).
+    """
+    failed = pd.Series(False, index=df.index)
+    rejects = []
+    for mask, reason in checks:
+        mask = mask.fillna(False).astype(bool)
+        if mask.any():
+            rejects.append(
+                pd.DataFrame(
+                    {
+                        "source": source,
+                        "row": df.index[mask] + 2,
+                        "student_id": df.loc[mask, "student_id"].values,
+                        "reason": reason,
+                    }
+                )
+            )
+            failed |= mask
+    rejects = (
+        pd.concat(rejects, ignore_index=True)
+        if rejects
+        else pd.DataFrame(columns=BULK_REJECT_COLUMNS)
+    )
+    return df[~failed], rejects
+
+
+def prepare_student_frame(
+    student_df: pd.DataFrame, seen_student_ids=()
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Normalizes an intake sheet (or chunk of one) of student records into
+    BULK_STUDENT_COLUMNS order. Missing columns are added (older exports
+    lack some of them). seen_student_ids holds IDs accepted from earlier
+    chunks of the same file.
+
+    Returns:
+        (rows ready to insert, rejected rows with reasons)
+    """
+    df = student_df.rename(columns=lambda column: str(column).strip())
+    for column in BULK_STUDENT_COLUMNS:
+        if column not in df.columns:
+            df[column] = None if column in BULK_NULL_DEFAULT_COLUMNS else ""
+
+    df = df[BULK_STUDENT_COLUMNS].copy()
+    df["date_of_birth"], bad_birth_date = _normalize_date_column(df["date_of_birth"])
+    for column in BULK_STUDENT_COLUMNS:
+        if column != "date_of_birth":
+            df[column] = _normalize_text_column(df[column])
+
+    missing_id = df["student_id"].isna()
+    email = df["email"].astype("string")
+    bad_email = email.notna() & email.ne("") & ~email.str.match(BULK_EMAIL_PATTERN)
+    duplicate_id = ~missing_id & (
+        df["student_id"].duplicated(keep="first")
+        | df["student_id"].isin(seen_student_ids)
+    )
+
+    return _collect_rejects(
+        df,
+        "student",
+        [
+            (missing_id, "Missing student_id"),
+            (duplicate_id, "Duplicate student_id in file"),
+            (bad_email, "Invalid email address"),
+            (bad_birth_date, "Unreadable date_of_birth"),
+        ],
+    )
+
+
+def prepare_registration_frame(
+    reg_df: pd.DataFrame, known_student_ids
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Normalizes an intake sheet (or chunk of one) of course registrations
+    into BULK_REGISTRATION_COLUMNS order. Registrations must belong to a
+    student that is already in the database or in the same upload.
+
+    Returns:
+        (rows ready to insert, rejected rows with reasons)
+    """
+    df = reg_df.rename(columns=lambda column: str(column).strip())
+    for column in BULK_REGISTRATION_COLUMNS:
+        if column not in df.columns:
+            if column == "receipt_path":
+                df[column] = None
+            elif column == "receipt_amount":
+                df[column] = 0.0
+            else:
+                df[column] = ""
+
+    df = df[BULK_REGISTRATION_COLUMNS].copy()
+    df["date_registered"], bad_date = _normalize_date_column(df["date_registered"])
+    df["total_credits"], bad_credits = _normalize_number_column(df["total_credits"], 0)
+    df["receipt_amount"], bad_amount = _normalize_number_column(df["receipt_amount"], 0.0)
+    for column in BULK_REGISTRATION_COLUMNS:
+        if column not in ("date_registered", "total_credits", "receipt_amount"):
+            df[column] = _normalize_text_column(df[column])
+    df["total_credits"] = df["total_credits"].astype(int)
+    df["approval_status"] = df["approval_status"].where(
+        ~_blank(df["approval_status"]), "pending"
+    )
+
+    missing_id = df["student_id"].isna()
+    unknown_student = ~missing_id & ~df["student_id"].isin(known_student_ids)
+
+    return _collect_rejects(
+        df,
+        "registration",
+        [
+            (missing_id, "Missing student_id"),
+            (unknown_student, "Unknown student_id"),
+            (bad_credits, "total_credits is not a number"),
+            (bad_amount, "receipt_amount is not a number"),
+            (bad_date, "Unreadable date_registered"),
+        ],
+    )
+
+
+def _as_chunks(source, chunk_size: int):
+    """Yields DataFrame chunks of a DataFrame or of an iterable of chunks (TableReader)"""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_size):
+            yield source.iloc[start : start + chunk_size]
+    else:
+        yield from source
+
+
+def _source_rows(source) -> Optional[int]:
+    """Row count of an ingestion source, or None when it is not known up front"""
+    if isinstance(source, pd.DataFrame):
+        return len(source)
+    return getattr(source, "total_rows", None)
+
+
+def _frame_tuples(df: pd.DataFrame) -> List[tuple]:
+    """Rows of df as plain tuples ready for executemany (NaN -> None)"""
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def _defer_bulk_indexes(conn) -> bool:
+    """
+    Drops the secondary indexes of student_info/course_registration and the
+    student_search, report_stats and document refcount triggers ahead of a
+    large load. The caller runs rebuild_report_stats() and
+    rebuild_document_refcounts() afterwards. Returns True when the search
+    index needs a rebuild afterwards.
+    """
+    for name, table, _ in DatabaseMigrationHandler.SECONDARY_INDEXES:
+        if table in ("student_info", "course_registration"):
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+    drop_report_stats_triggers(conn)
+    drop_document_ref_triggers(conn)
+    if not student_search_available(conn):
+        return False
+    for trigger in ("student_search_ai", "student_search_ad", "student_search_au"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    return True
+
+
+def bulk_ingest(
+    students,
+    registrations,
+    db_path: str = DB_PATH,
+    chunk_size: int = 5000,
+    defer_indexes: Optional[bool] = None,
+    progress_callback=None,
+) -> Dict[str, Any]:
+    """
+    Loads intake sheets of students and course registrations.
+
+    Each source is a DataFrame or an iterable of DataFrame chunks such as a
+    TableReader, so only one chunk is in memory at a time. Every chunk is
+    validated and its accepted rows inserted with executemany, all inside
+    one IMMEDIATE transaction: a failed upload leaves the database
+    untouched. Students that already exist are skipped (INSERT OR IGNORE).
+    Each student's programme is set from their last registration.
+
+    Args:
+        students: Student records, columns as in BULK_STUDENT_COLUMNS
+        registrations: Course registrations, columns as in
+            BULK_REGISTRATION_COLUMNS
+        db_path: Database to load into
+        chunk_size: Rows per chunk when a source is a DataFrame
+        defer_indexes: Drop secondary indexes and search triggers during the
+            load and rebuild them once at the end (default: for loads of at
+            least BULK_DEFER_INDEX_MIN_ROWS rows or of unknown size)
+        progress_callback: Optional callable(done, total) invoked per chunk;
+            total is None when the sources cannot tell their size
+
+    Returns:
+        Dict with inserted/skipped counts, the time taken and a "rejects"
+        DataFrame
+    """
+    started = time.perf_counter()
+    source_rows = [_source_rows(students), _source_rows(registrations)]
+    total = None if None in source_rows else sum(source_rows)
+    if defer_indexes is None:
+        defer_indexes = total is None or total >= BULK_DEFER_INDEX_MIN_ROWS
+
+    result = {
+        "students_inserted": 0,
+        "students_skipped": 0,
+        "registrations_inserted": 0,
+        "deferred_indexes": defer_indexes,
+    }
+    rejects = []
+    done = 0
+
+    conn = connect_db(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rebuild_search = _defer_bulk_indexes(conn) if defer_indexes else False
+            known_ids = {
+                row[0] for row in conn.execute("SELECT student_id FROM student_info")
+            }
 
+            seen_ids = set()
+            created_at = datetime.now().isoformat(sep=" ", timespec="seconds")
+            for chunk in _as_chunks(students, chunk_size):
+                accepted, chunk_rejects = prepare_student_frame(chunk, seen_ids)
+                rejects.append(chunk_rejects)
+                seen_ids.update(accepted["student_id"])
+                accepted = accepted.assign(
+                    receipt_amount=0.0, approval_status="pending", created_at=created_at
+                )
+                # rowcount leaves out ignored rows and trigger changes
+                inserted = conn.executemany(
+                    BULK_INSERT_STUDENT_SQL, _frame_tuples(accepted)
+                ).rowcount
+                result["students_inserted"] += inserted
+                result["students_skipped"] += len(accepted) - inserted
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total)
+
+            known_ids |= seen_ids
+            for chunk in _as_chunks(registrations, chunk_size):
+                accepted, chunk_rejects = prepare_registration_frame(chunk, known_ids)
+                rejects.append(chunk_rejects)
+
+                # Nobody else can write during the transaction, so the rows
+                # inserted next are exactly those with a higher id
+                last_id = conn.execute(
+                    "SELECT COALESCE(MAX(registration_id), 0) FROM course_registration"
+                ).fetchone()[0]
+                conn.executemany(BULK_INSERT_REGISTRATION_SQL, _frame_tuples(accepted))
+                new_courses = conn.execute(
+                    "SELECT registration_id, courses FROM course_registration "
+                    "WHERE registration_id > ? AND courses IS NOT NULL AND courses != ''",
+                    (last_id,),
+                ).fetchall()
+                conn.executemany(
+                    INSERT_REGISTRATION_ITEM_SQL,
+                    (
+                        (registration_id, position, code, title, credits)
+                        for registration_id, courses in new_courses
+                        for position, (code, title, credits) in enumerate(
+                            parse_course_lines(courses)
+                        )
+                    ),
+                )
 
-def zip_uploads_folder():
-    """
-    Zips the entire 'uploads' folder preserving its structure exactly as is.
+                programmes = accepted[~_blank(accepted["programme"])]
+                programmes = programmes.drop_duplicates("student_id", keep="last")
+                conn.executemany(
+                    "UPDATE student_info SET programme = ? WHERE student_id = ?",
+                    _frame_tuples(programmes[["programme", "student_id"]]),
+                )
+                result["registrations_inserted"] += len(accepted)
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total)
+
+            if defer_indexes:
+                DatabaseMigrationHandler.create_secondary_indexes(conn)
+                if rebuild_search:
+                    ensure_student_search_index(conn)
+                rebuild_report_stats(conn)
+                rebuild_document_refcounts(conn)
+                conn.execute("ANALYZE")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+    invalidate_query_cache("student_info", "course_registration")
 
-    Returns:
-        The filename of the generated zip file, or None if the uploads folder does not exist.
-    """
-    uploads_dir = "uploads"
-    if not os.path.exists(uploads_dir):
-        return None
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_name = f"uploads_folder_{timestamp}"
-    zip_filename = f"{base_name}.zip"
-    # This will create a zip archive with the base directory inside it as it is.
-    shutil.make_archive(base_name=base_name, format="zip", root_dir=uploads_dir)
-    return zip_filename
+    # Fold the large WAL written by the load back into the database file
+    get_connection_pool(db_path).checkpoint("PASSIVE")
 
+    rejects = [chunk_rejects for chunk_rejects in rejects if not chunk_rejects.empty]
+    result["rejects"] = (
+        pd.concat(rejects, ignore_index=True)
+        if rejects
+        else pd.DataFrame(columns=BULK_REJECT_COLUMNS)
+    )
+    result["seconds"] = time.perf_counter() - started
+    return result
 
-def manage_database():
-    st.subheader("Database Management")
 
-    col1, col2, col3, col4 = st.columns(4)  # Added a new column for the new button
+def synthetic_intake_frames(n_rows: int, seed: int = 42) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Builds student and registration intake sheets of n_rows each, shaped
+    like real uploads (numeric phone/year cells, a few bad rows).
+    """
+    rng = random.Random(seed)
+    programmes = ["CIMG", "CIM-UK", "ICAG", "ACCA"]
+    students = []
+    registrations = []
+    for i in range(n_rows):
+        student_id = f"S{i:07d}"
+        programme = rng.choice(programmes)
+        student = {column: "" for column in BULK_STUDENT_COLUMNS}
+        student.update(
+            student_id=student_id,
+            surname=f"Surname{rng.randint(0, 5000)}",
+            other_names=f"Name{i}",
+            date_of_birth=datetime(1990, 1, 1) + timedelta(days=rng.randint(0, 5000)),
+            email=f"{student_id.lower()}@example.com",
+            telephone=float(rng.randint(200000000, 599999999)),
+            ghana_card_id=f"GHA-{rng.randint(100000000, 999999999)}-{rng.randint(0, 9)}",
+            nationality="Ghanaian",
+            gender=rng.choice(["Male", "Female"]),
+            completion_year=float(rng.randint(2005, 2020)),
+            programme=programme,
+        )
+        students.append(student)
+        registrations.append(
+            {
+                "student_id": student_id,
+                "index_number": f"IX{i:07d}",
+                "programme": programme,
+                "level": f"Level {rng.randint(1, 4)}",
+                "session": "Morning",
+                "academic_year": "2025/2026",
+                "semester": rng.choice(["First", "Second"]),
+                "courses": "\n".join(
+                    f"C{rng.randint(100, 999)}|Course title|3" for _ in range(4)
+                ),
+                "total_credits": 12,
+                "date_registered": datetime(2025, 9, 1) + timedelta(days=rng.randint(0, 60)),
+                "approval_status": "pending",
+                "receipt_amount": float(rng.randint(500, 3000)),
+            }
+        )
 
-    with col1:
-        st.write("### Export Complete Database")
-        if st.button("Download Complete Database (Excel)"):
-            try:
-                export_dir = "temp_export"
-                if not os.path.exists(export_dir):
-                    os.makedirs(export_dir)
+    # Roughly 1% of rows carry the mistakes real sheets have
+    for i in range(0, n_rows, 100):
+        if i % 300 == 0:
+            students[i]["student_id"] = None
+        elif i % 300 == 100:
+            students[i]["email"] = "not-an-email"
+        else:
+            registrations[i]["total_credits"] = "twelve"
+    return pd.DataFrame(students), pd.DataFrame(registrations)
+
+
+def _row_by_row_ingest(conn, student_df: pd.DataFrame, reg_df: pd.DataFrame):
+    """The former per-row iterrows() upload path, kept as a benchmark baseline"""
+
+    def cell(value):
+        value = _sql_value(value)
+        return value.isoformat() if isinstance(value, pd.Timestamp) else value
+
+    created_at = datetime.now().isoformat(sep=" ", timespec="seconds")
+    for _, row in student_df.iterrows():
+        params = tuple(cell(row.get(column)) for column in BULK_STUDENT_COLUMNS)
+        conn.execute(BULK_INSERT_STUDENT_SQL, params + (0.0, "pending", created_at))
+    for _, row in reg_df.iterrows():
+        params = tuple(cell(row.get(column)) for column in BULK_REGISTRATION_COLUMNS)
+        cursor = conn.execute(BULK_INSERT_REGISTRATION_SQL, params)
+        sync_registration_items(conn, cursor.lastrowid, row.get("courses"))
+        conn.execute(
+            "UPDATE student_info SET programme = ? WHERE student_id = ?",
+            (row.get("programme"), row.get("student_id")),
+        )
+    conn.commit()
 
-                conn = sqlite3.connect("student_registration.db")
 
-                tables = {
-                    "student_info": pd.read_sql_query(
-                        """
-                        SELECT *, 
-                            CASE WHEN receipt_path IS NOT NULL THEN 'Yes' ELSE 'No' END as has_receipt,
-                            receipt_amount
-                        FROM student_info
-                    """,
-                        conn,
-                    ),
-                    "course_registration": pd.read_sql_query(
-                        """
-                        SELECT *,
-                            CASE WHEN receipt_path IS NOT NULL THEN 'Yes' ELSE 'No' END as has_receipt,
-                            receipt_amount
-                        FROM course_registration
-                    """,
-                        conn,
-                    ),
-                }
+def _traced_run(func) -> Tuple[float, float]:
+    """Runs func under tracemalloc; returns (seconds, peak traced memory in MB)"""
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
 
-                excel_files = []
-                for table_name, df in tables.items():
-                    excel_filename = os.path.join(export_dir, f"{table_name}.xlsx")
-                    with pd.ExcelWriter(excel_filename, engine="openpyxl") as writer:
-                        df.to_excel(writer, index=False, sheet_name=table_name)
-                        workbook = writer.book
-                        worksheet = writer.sheets[table_name]
-
-                        for column_cells in worksheet.columns:
-                            max_length = 0
-                            column = column_cells[0].column_letter
-                            for cell in column_cells:
-                                try:
-                                    cell_length = len(str(cell.value))
-                                    if cell_length > max_length:
-                                        max_length = cell_length
-                                except Exception:
-                                    pass
-                            adjusted_width = max_length + 2
-                            worksheet.column_dimensions[column].width = adjusted_width
-                    excel_files.append(excel_filename)
-
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                zip_filename = f"complete_database_{timestamp}.zip"
-                with zipfile.ZipFile(zip_filename, "w") as zipf:
-                    for file in excel_files:
-                        arcname = os.path.basename(file)
-                        zipf.write(file, arcname)
-
-                for file in excel_files:
-                    os.remove(file)
-                os.rmdir(export_dir)
 
-                conn.close()
+def benchmark_bulk_ingestion(n_rows: int = 50_000, chunk_size: int = 5000) -> pd.DataFrame:
+    """
+    Writes a synthetic intake workbook of n_rows students and n_rows
+    registrations, then:
+    - reads it whole with pandas and streams it with TableReader, tracing
+      peak memory of each (tracing slows both reads down)
+    - loads it into two scratch databases: once with the former row-by-row
+      path from the pandas frames, once streamed through bulk_ingest()
+
+    Returns a DataFrame with seconds, peak memory and rows per step.
+    """
+    student_df, reg_df = synthetic_intake_frames(n_rows)
+    rows = []
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        workbook_path = os.path.join(scratch_dir, "intake.xlsx")
+        started = time.perf_counter()
+        with pd.ExcelWriter(workbook_path, engine="openpyxl") as writer:
+            student_df.to_excel(writer, sheet_name="students", index=False)
+            reg_df.to_excel(writer, sheet_name="registrations", index=False)
+        rows.append(
+            {"step": "Write workbook", "seconds": time.perf_counter() - started, "rows": 2 * n_rows}
+        )
 
-                with open(zip_filename, "rb") as f:
-                    st.download_button(
-                        label="Download Database ZIP",
-                        data=f,
-                        file_name=zip_filename,
-                        mime="application/zip",
-                    )
-                os.remove(zip_filename)
-            except Exception as e:
-                st.error(f"Error exporting database: {str(e)}")
+        def read_whole():
+            nonlocal student_df, reg_df
+            sheets = pd.read_excel(workbook_path, sheet_name=None)
+            student_df, reg_df = sheets["students"], sheets["registrations"]
 
-    with col2:
-        st.write("### Download All Documents")
-        if st.button("Download All Documents"):
-            with st.spinner("Creating zip file of all documents..."):
-                zip_file = download_all_documents()
-                if zip_file and os.path.exists(zip_file):
-                    with open(zip_file, "rb") as f:
-                        st.download_button(
-                            label="Download Documents ZIP",
-                            data=f,
-                            file_name=zip_file,
-                            mime="application/zip",
-                        )
-                    os.remove(zip_file)
-                else:
-                    st.error("Error creating zip file or no documents found")
+        def read_streamed():
+            for sheet_name in ("students", "registrations"):
+                for _ in TableReader(workbook_path, chunk_size, sheet_name):
+                    pass
 
-    with col3:
-        st.write("### Download All Receipts")
-        if st.button("Download All Receipts"):
-            with st.spinner("Creating zip file of all receipts..."):
-                zip_file = download_receipts()
-                if zip_file and os.path.exists(zip_file):
-                    with open(zip_file, "rb") as f:
-                        st.download_button(
-                            label="Download Receipts ZIP",
-                            data=f,
-                            file_name=zip_file,
-                            mime="application/zip",
-                        )
-                    os.remove(zip_file)
-                else:
-                    st.error("Error creating zip file or no receipts found")
+        for label, read in (
+            ("Read workbook (pandas)", read_whole),
+            ("Stream workbook (TableReader)", read_streamed),
+        ):
+            seconds, peak_mb = _traced_run(read)
+            rows.append(
+                {"step": label, "seconds": seconds, "peak_mb": round(peak_mb, 1), "rows": 2 * n_rows}
+            )
 
-    with col4:
-        st.write("### Download Uploads Folder")
-        if st.button("Download Uploads Folder"):
-            with st.spinner("Creating zip file of the uploads folder..."):
-                zip_file = zip_uploads_folder()
-                if zip_file and os.path.exists(zip_file):
-                    with open(zip_file, "rb") as f:
-                        st.download_button(
-                            label="Download Uploads ZIP",
-                            data=f,
-                            file_name=zip_file,
-                            mime="application/zip",
-                        )
-                    os.remove(zip_file)
+        for label in ("Row-by-row insert", "Streamed bulk ingest"):
+            db_path = os.path.join(scratch_dir, f"{label.split()[0].lower()}.db")
+            init_db(db_path)
+            try:
+                started = time.perf_counter()
+                if label == "Streamed bulk ingest":
+                    result = bulk_ingest(
+                        TableReader(workbook_path, chunk_size, "students"),
+                        TableReader(workbook_path, chunk_size, "registrations"),
+                        db_path,
+                    )
+                    rejected = len(result["rejects"])
                 else:
-                    st.error("Uploads folder not found or error creating zip")
+                    conn = connect_db(db_path)
+                    try:
+                        _row_by_row_ingest(conn, student_df, reg_df)
+                    finally:
+                        conn.close()
+                    rejected = 0
+                seconds = time.perf_counter() - started
+                conn = connect_db(db_path)
+                try:
+                    inserted = sum(
+                        conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                        for table in ("student_info", "course_registration")
+                    )
+                finally:
+                    conn.close()
+            finally:
+                discard_connection_pool(db_path)
+            rows.append(
+                {"step": label, "seconds": seconds, "rows": inserted, "rejected": rejected}
+            )
 
-    st.write("### Generate All PDFs")
-    col_pdfs1, col_pdfs2 = st.columns(2)
-    with col_pdfs1:
-        if st.button("Generate All Student Info PDFs"):
-            with st.spinner("Generating student information PDFs..."):
-                zip_file = generate_batch_pdfs("student_info")
-                if zip_file and os.path.exists(zip_file):
-                    with open(zip_file, "rb") as f:
-                        st.download_button(
-                            label="Download Student Info PDFs",
-                            data=f,
-                            file_name=zip_file,
-                            mime="application/zip",
-                        )
-                    os.remove(zip_file)
-                else:
-                    st.error("Error generating PDFs")
-    with col_pdfs2:
-        if st.button("Generate All Course Registration PDFs"):
-            with st.spinner("Generating course registration PDFs..."):
-                zip_file = generate_batch_pdfs("course_registration")
-                if zip_file and os.path.exists(zip_file):
-                    with open(zip_file, "rb") as f:
-                        st.download_button(
-                            label="Download Course Registration PDFs",
-                            data=f,
-                            file_name=zip_file,
-                            mime="application/zip",
-                        )
-                    os.remove(zip_file)
-                else:
-                    st.error("Error generating PDFs")
+    result = pd.DataFrame(rows)
+    result["seconds"] = result["seconds"].round(3)
+    result["rows_per_second"] = (result["rows"] / result["seconds"].clip(lower=1e-6)).round(0)
+    return result
 
 
 def upload_data_from_excel_and_docs():
     """
-    Bulk upload function updated to accept two Excel files and to insert any absent columns
-    into the DataFrames before processing the data. This handles entries from older app versions.
+    Bulk upload of two Excel/CSV/Parquet files (students and course
+    registrations) streamed through bulk_ingest(). Columns absent from
+    sheets exported by older app versions are filled in; invalid rows are
+    listed instead of imported.
     """
     st.header("Bulk Upload Data from Excel & Documents")
     st.markdown("### Excel Files Upload")
@@ -1816,13 +5458,13 @@ def upload_data_from_excel_and_docs():
     with col1:
         student_excel = st.file_uploader(
             "Upload Excel File with Student Data",
-            type=["xlsx", "xls"],
+            type=["xlsx", "xls", "csv", "parquet"],
             key="student_excel",
         )
     with col2:
         reg_excel = st.file_uploader(
             "Upload Excel File with Course Registration Data",
-            type=["xlsx", "xls"],
+            type=["xlsx", "xls", "csv", "parquet"],
             key="reg_excel",
         )
     docs_zip = st.file_uploader("Upload Zip File of Documents (Optional)", type=["zip"])
@@ -1834,190 +5476,331 @@ def upload_data_from_excel_and_docs():
             )
             return
 
-        try:
-            # Read the two Excel files.
-            student_df = pd.read_excel(student_excel)
-            reg_df = pd.read_excel(reg_excel)
+        # Both files are streamed in chunks by a background job; missing
+        # columns (older app versions) are filled in, cells are validated and
+        # the rows loaded in one transaction.
+        submit_job(
+            "bulk_upload",
+            files={"student_file": student_excel, "registration_file": reg_excel},
+            state_key="bulk_upload_job",
+        )
 
-            # Define expected columns for student data.
-            expected_student_columns = [
-                "student_id",
-                "surname",
-                "other_names",
-                "date_of_birth",
-                "place_of_birth",
-                "home_town",
-                "residential_address",
-                "postal_address",
-                "email",
-                "telephone",
-                "ghana_card_id",
-                "nationality",
-                "marital_status",
-                "gender",
-                "religion",
-                "denomination",
-                "disability_status",
-                "disability_description",
-                "guardian_name",
-                "guardian_relationship",
-                "guardian_occupation",
-                "guardian_address",
-                "guardian_telephone",
-                "previous_school",
-                "qualification_type",
-                "completion_year",
-                "aggregate_score",
-                "ghana_card_path",
-                "passport_photo_path",
-                "transcript_path",
-                "certificate_path",
-                "receipt_path",
-                "programme",
-            ]
-            # Insert missing columns with default values.
-            for col in expected_student_columns:
-                if col not in student_df.columns:
-                    # For file path columns use None instead of empty string.
-                    if col in [
-                        "ghana_card_path",
-                        "passport_photo_path",
-                        "transcript_path",
-                        "certificate_path",
-                        "receipt_path",
-                        "programme",
-                    ]:
-                        student_df[col] = None
-                    else:
-                        student_df[col] = ""
+        if docs_zip:
+            saved_zip_path = save_uploaded_file(docs_zip, "uploads")
+            st.success("Documents zip uploaded successfully!")
 
-            # Define expected columns for course registration data.
-            expected_reg_columns = [
-                "student_id",
-                "index_number",
-                "programme",
-                "specialization",
-                "level",
-                "session",
-                "academic_year",
-                "semester",
-                "courses",
-                "total_credits",
-                "date_registered",
-                "approval_status",
-                "receipt_path",
-                "receipt_amount",
-            ]
-            for col in expected_reg_columns:
-                if col not in reg_df.columns:
-                    if col in ["receipt_path"]:
-                        reg_df[col] = None
-                    elif col == "receipt_amount":
-                        reg_df[col] = 0.0
-                    else:
-                        reg_df[col] = ""
+    render_job_status("bulk_upload_job")
+
+
+# Report statistics
+#
+# Generate Reports and the Payment Statistics dashboard read pre-aggregated
+# rows from report_stats instead of scanning student_info and
+# course_registration. Triggers on both tables apply every insert, update
+# and delete to the affected rows, so all write paths (forms, approvals,
+# bulk upload, admin edits) keep the figures current.
+
+# source table -> dimension -> key expressions (at most three)
+REPORT_STATS_DIMENSIONS = {
+    "student_info": {
+        "total": [],
+        "gender": ["gender"],
+        "approval_status": ["approval_status"],
+        "programme": ["programme"],
+        "payment_date": ["date(created_at)"],
+    },
+    "course_registration": {
+        "total": [],
+        "approval_status": ["approval_status"],
+        "programme": ["programme"],
+        "programme_level": ["programme", "level"],
+        "programme_level_semester": ["programme", "level", "semester"],
+        "payment_date": ["date(date_registered)"],
+    },
+}
+
+REPORT_STATS_KEY_COLUMNS = {
+    "total": [],
+    "gender": ["gender"],
+    "approval_status": ["approval_status"],
+    "programme": ["programme"],
+    "programme_level": ["programme", "level"],
+    "programme_level_semester": ["programme", "level", "semester"],
+    "payment_date": ["payment_date"],
+}
+
+REPORT_STATS_MEASURES = ("records", "with_receipt", "amount", "receipt_amount", "credits", "credit_rows")
+
+
+def _report_stats_measures(table: str, row: str = "") -> List[str]:
+    """
+    SQL for each of REPORT_STATS_MEASURES over one row. NULL receipt
+    amounts count as 0, as in the original reports.
+    """
+    prefix = f"{row}." if row else ""
+    has_receipt = f"({prefix}receipt_path IS NOT NULL)"
+    amount = f"COALESCE({prefix}receipt_amount, 0)"
+    credits = ("0", "0")
+    if table == "course_registration":
+        credits = (f"COALESCE({prefix}total_credits, 0)", f"({prefix}total_credits IS NOT NULL)")
+    return [
+        "1",
+        has_receipt,
+        amount,
+        f"CASE WHEN {has_receipt} THEN {amount} ELSE 0 END",
+        *credits,
+    ]
 
-            # Insert student data into the database.
-            conn = sqlite3.connect("student_registration.db")
-            c = conn.cursor()
-            insert_student_query = """
-                INSERT OR IGNORE INTO student_info (
-                    student_id, surname, other_names, date_of_birth, place_of_birth,
-                    home_town, residential_address, postal_address, email, telephone,
-                    ghana_card_id, nationality, marital_status, gender, religion,
-                    denomination, disability_status, disability_description,
-                    guardian_name, guardian_relationship, guardian_occupation,
-                    guardian_address, guardian_telephone, previous_school,
-                    qualification_type, completion_year, aggregate_score,
-                    ghana_card_path, passport_photo_path, transcript_path,
-                    certificate_path, receipt_path, receipt_amount,
-                    approval_status, created_at, programme
-                ) VALUES (
-                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-                )
-            """
-            for _, row in student_df.iterrows():
-                params = (
-                    row.get("student_id"),
-                    row.get("surname"),
-                    row.get("other_names"),
-                    row.get("date_of_birth"),
-                    row.get("place_of_birth"),
-                    row.get("home_town"),
-                    row.get("residential_address"),
-                    row.get("postal_address"),
-                    row.get("email"),
-                    row.get("telephone"),
-                    row.get("ghana_card_id"),
-                    row.get("nationality"),
-                    row.get("marital_status"),
-                    row.get("gender"),
-                    row.get("religion"),
-                    row.get("denomination"),
-                    row.get("disability_status", "None"),
-                    row.get("disability_description", "None"),
-                    row.get("guardian_name"),
-                    row.get("guardian_relationship"),
-                    row.get("guardian_occupation"),
-                    row.get("guardian_address"),
-                    row.get("guardian_telephone"),
-                    row.get("previous_school"),
-                    row.get("qualification_type"),
-                    row.get("completion_year"),
-                    row.get("aggregate_score"),
-                    row.get("ghana_card_path"),
-                    row.get("passport_photo_path"),
-                    row.get("transcript_path"),
-                    row.get("certificate_path"),
-                    row.get("receipt_path"),
-                    0.0,  # receipt_amount default value
-                    "pending",
-                    datetime.now(),
-                    row.get("programme", ""),
-                )
-                c.execute(insert_student_query, params)
 
-            insert_reg_query = """
-                INSERT INTO course_registration (
-                    student_id, index_number, programme, specialization, level,
-                    session, academic_year, semester, courses, total_credits,
-                    date_registered, approval_status, receipt_path, receipt_amount
-                ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+def _report_stats_keys(expressions: List[str], row: str = "") -> List[str]:
+    """Key SQL padded to three columns; NULL keys are stored as ''"""
+    keys = []
+    for expression in expressions:
+        if row:
+            expression = re.sub(r"\b([a-z_]+)\b(?!\()", rf"{row}.\1", expression)
+        keys.append(f"COALESCE({expression}, '')")
+    return keys + ["''"] * (3 - len(keys))
+
+
+def _report_stats_upsert(table: str, dimension: str, row: str, sign: int) -> str:
+    keys = _report_stats_keys(REPORT_STATS_DIMENSIONS[table][dimension], row)
+    measures = [f"{sign} * {m}" for m in _report_stats_measures(table, row)]
+    updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in REPORT_STATS_MEASURES)
+    return f"""
+        INSERT INTO report_stats (source, dimension, key1, key2, key3, {", ".join(REPORT_STATS_MEASURES)})
+        VALUES ('{table}', '{dimension}', {", ".join(keys)}, {", ".join(measures)})
+        ON CONFLICT (source, dimension, key1, key2, key3) DO UPDATE SET {updates};
+    """
+
+
+def _report_stats_columns(table: str) -> List[str]:
+    """Source columns the statistics depend on (the update trigger watches these)"""
+    columns = {"receipt_path", "receipt_amount"}
+    if table == "course_registration":
+        columns.add("total_credits")
+    for expressions in REPORT_STATS_DIMENSIONS[table].values():
+        for expression in expressions:
+            columns.update(re.findall(r"\b([a-z_]+)\b(?!\()", expression))
+    return sorted(columns)
+
+
+def create_report_stats_triggers(conn):
+    """Creates the triggers maintaining report_stats (idempotent)"""
+    for table, dimensions in REPORT_STATS_DIMENSIONS.items():
+        events = {
+            "ai": ("INSERT", [("NEW", 1)]),
+            "ad": ("DELETE", [("OLD", -1)]),
+            "au": (f"UPDATE OF {', '.join(_report_stats_columns(table))}", [("OLD", -1), ("NEW", 1)]),
+        }
+        for suffix, (event, rows) in events.items():
+            body = "".join(
+                _report_stats_upsert(table, dimension, row, sign)
+                for row, sign in rows
+                for dimension in dimensions
+            )
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS report_stats_{table}_{suffix}
+                AFTER {event} ON {table}
+                BEGIN {body} END
+                """
+            )
+
+
+def drop_report_stats_triggers(conn):
+    for table in REPORT_STATS_DIMENSIONS:
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS report_stats_{table}_{suffix}")
+
+
+def _report_stats_query(table: str, dimension: str) -> str:
+    """GROUP BY query computing one dimension from the source table"""
+    keys = _report_stats_keys(REPORT_STATS_DIMENSIONS[table][dimension])
+    key_columns = ", ".join(f"{key} AS key{i}" for i, key in enumerate(keys, 1))
+    measures = ", ".join(
+        f"SUM({m}) AS {name}"
+        for m, name in zip(_report_stats_measures(table), REPORT_STATS_MEASURES)
+    )
+    return f"""
+        SELECT '{table}' AS source, '{dimension}' AS dimension, {key_columns}, {measures}
+        FROM {table}
+        GROUP BY key1, key2, key3
+    """
+
+
+def rebuild_report_stats(conn):
+    """
+    Recomputes report_stats from scratch and (re)creates its triggers.
+    Runs in the caller's transaction when one is open.
+    """
+    drop_report_stats_triggers(conn)
+    conn.execute("DELETE FROM report_stats")
+    for table, dimensions in REPORT_STATS_DIMENSIONS.items():
+        for dimension in dimensions:
+            conn.execute(
+                f"""
+                INSERT INTO report_stats (source, dimension, key1, key2, key3, {", ".join(REPORT_STATS_MEASURES)})
+                {_report_stats_query(table, dimension)}
+                """
+            )
+    create_report_stats_triggers(conn)
+
+
+def check_report_stats(conn) -> pd.DataFrame:
+    """
+    Compares report_stats with a fresh aggregation of the source tables.
+
+    Returns:
+        DataFrame of the rows that differ (empty when consistent), with the
+        stored and expected measures side by side
+    """
+    key = ["source", "dimension", "key1", "key2", "key3"]
+    expected = pd.concat(
+        [
+            pd.read_sql_query(_report_stats_query(table, dimension), conn)
+            for table, dimensions in REPORT_STATS_DIMENSIONS.items()
+            for dimension in dimensions
+        ],
+        ignore_index=True,
+    )
+    stored = pd.read_sql_query(
+        f"SELECT {', '.join(key + list(REPORT_STATS_MEASURES))} FROM report_stats WHERE records != 0",
+        conn,
+    )
+    merged = stored.merge(expected, on=key, how="outer", suffixes=("_stored", "_expected"))
+    merged = merged.fillna(0)
+    differs = pd.Series(False, index=merged.index)
+    for measure in REPORT_STATS_MEASURES:
+        differs |= (merged[f"{measure}_stored"] - merged[f"{measure}_expected"]).abs() > 1e-6
+    return merged[differs].reset_index(drop=True)
+
+
+def get_report_stats(conn, source: str, dimension: str) -> pd.DataFrame:
+    """
+    Pre-aggregated figures of one dimension, read from report_stats.
+
+    Returns:
+        DataFrame with the dimension's key columns (None for unset values),
+        count, with_receipt, without_receipt, total_amount,
+        receipt_amount, avg_receipt_amount and avg_credits
+    """
+    key_columns = REPORT_STATS_KEY_COLUMNS[dimension]
+    stats = pd.read_sql_query(
+        f"""
+        SELECT key1, key2, key3, {", ".join(REPORT_STATS_MEASURES)}
+        FROM report_stats
+        WHERE source = ? AND dimension = ? AND records > 0
+        ORDER BY key1, key2, key3
+        """,
+        conn,
+        params=(source, dimension),
+    )
+    for i, column in enumerate(key_columns, 1):
+        stats[column] = stats[f"key{i}"].replace("", None)
+    stats = stats.rename(columns={"records": "count", "amount": "total_amount"})
+    stats["without_receipt"] = stats["count"] - stats["with_receipt"]
+    stats["avg_receipt_amount"] = (stats["receipt_amount"] / stats["with_receipt"]).where(
+        stats["with_receipt"] > 0, 0.0
+    )
+    stats["avg_credits"] = (stats["credits"] / stats["credit_rows"]).where(
+        stats["credit_rows"] > 0
+    )
+    return stats[
+        key_columns
+        + [
+            "count",
+            "with_receipt",
+            "without_receipt",
+            "total_amount",
+            "receipt_amount",
+            "avg_receipt_amount",
+            "avg_credits",
+        ]
+    ]
+
+
+def get_receipt_amount_range(conn, source: str) -> Tuple[float, float]:
+    """
+    Smallest and largest amount among rows with a receipt, read from the
+    partial receipt-amount index (MIN/MAX cannot be kept incrementally
+    under deletes).
+    """
+    # One aggregate per query, so SQLite can read it off the index end
+    low, high = (
+        conn.execute(
+            f"""
+            SELECT {aggregate}(COALESCE(receipt_amount, 0))
+            FROM {source} WHERE receipt_path IS NOT NULL
             """
-            for _, row in reg_df.iterrows():
-                params = (
-                    row.get("student_id"),
-                    row.get("index_number"),
-                    row.get("programme"),
-                    row.get("specialization"),
-                    row.get("level"),
-                    row.get("session"),
-                    row.get("academic_year"),
-                    row.get("semester"),
-                    row.get("courses"),
-                    row.get("total_credits"),
-                    row.get("date_registered"),
-                    row.get("approval_status", "pending"),
-                    row.get("receipt_path"),
-                    row.get("receipt_amount", 0.0),
-                )
-                c.execute(insert_reg_query, params)
-                # Update the student's programme field based on the registration data.
-                update_query = (
-                    "UPDATE student_info SET programme = ? WHERE student_id = ?"
-                )
-                c.execute(update_query, (row.get("programme"), row.get("student_id")))
+        ).fetchone()[0]
+        for aggregate in ("MIN", "MAX")
+    )
+    return (low or 0.0, high or 0.0)
 
-            conn.commit()
-            conn.close()
-            st.success("Excel data uploaded successfully!")
-        except Exception as e:
-            st.error(f"Error processing Excel files: {e}")
 
-        if docs_zip:
-            saved_zip_path = save_uploaded_file(docs_zip, "uploads")
-            st.success("Documents zip uploaded successfully!")
+def _registration_filters(programme=None, approval_status=None):
+    """Builds the WHERE clause shared by the course registration aggregates."""
+    clauses, params = [], []
+    if programme:
+        clauses.append("cr.programme = ?")
+        params.append(programme)
+    if approval_status:
+        clauses.append("cr.approval_status = ?")
+        params.append(approval_status)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+
+def get_course_enrolment_summary(conn, programme=None, approval_status=None):
+    """
+    Per-course enrolment counts computed in SQL from course_registration_items.
+
+    Returns:
+        DataFrame with course_code, course_title, credits, enrolments and
+        credit_hours, most enrolled first.
+    """
+    where, params = _registration_filters(programme, approval_status)
+    return pd.read_sql_query(
+        f"""
+        SELECT i.course_code,
+               MAX(i.course_title) AS course_title,
+               MAX(i.credits) AS credits,
+               COUNT(DISTINCT cr.student_id) AS enrolments,
+               SUM(i.credits) AS credit_hours
+        FROM course_registration_items i
+        JOIN course_registration cr ON cr.registration_id = i.registration_id
+        {where}
+        GROUP BY i.course_code
+        ORDER BY enrolments DESC, i.course_code
+        """,
+        conn,
+        params=params,
+    )
+
+
+def get_credit_load_summary(conn, programme=None, approval_status=None):
+    """
+    Credit load per programme/level/semester computed in SQL from
+    course_registration_items.
+    """
+    where, params = _registration_filters(programme, approval_status)
+    return pd.read_sql_query(
+        f"""
+        SELECT cr.programme, cr.level, cr.semester,
+               COUNT(DISTINCT i.registration_id) AS registrations,
+               COUNT(*) AS course_enrolments,
+               SUM(i.credits) AS credit_hours,
+               ROUND(SUM(i.credits) * 1.0 / COUNT(DISTINCT i.registration_id), 1)
+                   AS avg_credits_per_registration
+        FROM course_registration_items i
+        JOIN course_registration cr ON cr.registration_id = i.registration_id
+        {where}
+        GROUP BY cr.programme, cr.level, cr.semester
+        ORDER BY cr.programme, cr.level, cr.semester
+        """,
+        conn,
+        params=params,
+    )
 
 
 def generate_reports():
@@ -2042,13 +5825,11 @@ def generate_reports():
     )
 
     # Connect to the database
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
 
     if report_type == "Student Statistics":
         # Gender distribution
-        gender_dist = pd.read_sql_query(
-            "SELECT gender, COUNT(*) as count FROM student_info GROUP BY gender", conn
-        )
+        gender_dist = get_report_stats(conn, "student_info", "gender")
         if not gender_dist.empty:
             st.write("**Gender Distribution**")
             fig = px.pie(
@@ -2059,10 +5840,7 @@ def generate_reports():
             st.info("No gender distribution data available")
 
         # Programme distribution
-        prog_dist = pd.read_sql_query(
-            "SELECT programme, COUNT(*) as count FROM course_registration GROUP BY programme",
-            conn,
-        )
+        prog_dist = get_report_stats(conn, "course_registration", "programme")
         if not prog_dist.empty:
             st.write("**Programme Distribution**")
             fig = px.pie(
@@ -2076,33 +5854,54 @@ def generate_reports():
             st.info("No programme distribution data available")
 
     elif report_type == "Course Registration Summary":
-        summary = pd.read_sql_query(
-            """
-            SELECT cr.programme, cr.level, cr.semester, 
-                   COUNT(*) as registrations,
-                   AVG(cr.total_credits) as avg_credits
-            FROM course_registration cr
-            GROUP BY cr.programme, cr.level, cr.semester
-            """,
-            conn,
-        )
+        summary = get_report_stats(
+            conn, "course_registration", "programme_level_semester"
+        ).rename(columns={"count": "registrations"})[
+            ["programme", "level", "semester", "registrations", "avg_credits"]
+        ]
         if not summary.empty:
             st.write("**Course Registration Summary**")
             st.dataframe(summary)
         else:
             st.info("No course registration data available")
 
+        col1, col2 = st.columns(2)
+        with col1:
+            programme_filter = st.selectbox(
+                "Programme", ["All", *get_course_catalog().programmes]
+            )
+        with col2:
+            status_filter = st.selectbox(
+                "Approval Status", ["All", "pending", "approved", "rejected"]
+            )
+        programme_filter = None if programme_filter == "All" else programme_filter
+        status_filter = None if status_filter == "All" else status_filter
+
+        enrolments = get_course_enrolment_summary(
+            conn, programme_filter, status_filter
+        )
+        if not enrolments.empty:
+            st.write("**Enrolment per Course**")
+            st.dataframe(enrolments)
+            fig = px.bar(
+                enrolments.head(20),
+                x="course_code",
+                y="enrolments",
+                hover_data=["course_title", "credits"],
+                title="Most Enrolled Courses",
+            )
+            st.plotly_chart(fig)
+
+            st.write("**Credit Load**")
+            st.dataframe(get_credit_load_summary(conn, programme_filter, status_filter))
+        else:
+            st.info("No course enrolment data available")
+
     elif report_type == "Approval Status Summary":
         # Student approval status
-        student_status = pd.read_sql_query(
-            "SELECT approval_status, COUNT(*) as count FROM student_info GROUP BY approval_status",
-            conn,
-        )
+        student_status = get_report_stats(conn, "student_info", "approval_status")
         # Course approval status
-        course_status = pd.read_sql_query(
-            "SELECT approval_status, COUNT(*) as count FROM course_registration GROUP BY approval_status",
-            conn,
-        )
+        course_status = get_report_stats(conn, "course_registration", "approval_status")
 
         col1, col2 = st.columns(2)
         with col1:
@@ -2135,8 +5934,33 @@ def generate_reports():
         # Import and use the enhanced payment statistics module
         payment_statistics_section()
 
-        # Close the database connection
-        conn.close()
+    with st.expander("Statistics Maintenance"):
+        st.caption(
+            "Reports are read from pre-aggregated statistics kept up to date "
+            "by database triggers."
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Check Consistency"):
+                mismatches = check_report_stats(conn)
+                if mismatches.empty:
+                    st.success("Statistics match the source tables")
+                else:
+                    st.warning(f"{len(mismatches)} statistics rows differ")
+                    st.dataframe(mismatches)
+        with col2:
+            if st.button("Rebuild Statistics"):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    rebuild_report_stats(conn)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                st.success("Statistics rebuilt")
+
+    # Close the database connection
+    conn.close()
 
 
 import os
@@ -2150,6 +5974,91 @@ from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
 from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab import rl_config
+
+# Embed images as binary streams. ASCII85 armouring only makes PDFs bigger,
+# and without the optional rl_accel extension reportlab encodes it in pure
+# Python, which took longer than rendering an ID card.
+rl_config.useA85 = 0
+
+
+@functools.lru_cache(maxsize=None)
+def load_id_card_fonts(title_font_path: str, regular_font_path: str) -> Dict[str, Any]:
+    """ID card fonts by role, loaded once per process and font paths"""
+    try:
+        return {
+            "title": ImageFont.truetype(title_font_path, 36),
+            "subtitle": ImageFont.truetype(title_font_path, 24),
+            "regular": ImageFont.truetype(regular_font_path, 20),
+            "small": ImageFont.truetype(regular_font_path, 16),
+        }
+    except IOError:
+        # Use default font if custom font not available
+        default_font = ImageFont.load_default()
+        return dict.fromkeys(("title", "subtitle", "regular", "small"), default_font)
+
+
+_qr_caches: Dict[str, "DiskLRUCache"] = {}
+_qr_caches_lock = threading.Lock()
+
+
+def get_qr_cache(cache_dir: str = "qr_cache") -> "DiskLRUCache":
+    """Process-wide cache of QR code PNGs in cache_dir, keyed by payload hash"""
+    with _qr_caches_lock:
+        if cache_dir not in _qr_caches:
+            _qr_caches[cache_dir] = DiskLRUCache(cache_dir, 32 * 1024 * 1024, ".png")
+        return _qr_caches[cache_dir]
+
+
+@functools.lru_cache(maxsize=None)
+def register_id_card_pdf_fonts(title_font_path: str, regular_font_path: str) -> Dict[str, str]:
+    """
+    reportlab font names for the vector ID card roles. The card TTFs are
+    registered (and embedded as subsets) when present, so vector cards
+    use the same faces as raster ones; Helvetica stands in otherwise.
+    """
+    try:
+        pdfmetrics.registerFont(TTFont("IDCard-Bold", title_font_path))
+        pdfmetrics.registerFont(TTFont("IDCard-Regular", regular_font_path))
+        bold, regular = "IDCard-Bold", "IDCard-Regular"
+    except Exception:
+        bold, regular = "Helvetica-Bold", "Helvetica"
+    return {"title": bold, "subtitle": bold, "regular": regular, "small": regular}
+
+
+@functools.lru_cache(maxsize=4096)
+def qr_code_modules(data: str) -> Tuple[int, Tuple[Tuple[int, int, int], ...]]:
+    """
+    QR code for data as vector modules, using the same settings as
+    IDCardGenerator.generate_qr_code.
+
+    Returns:
+        Side length in modules (quiet zone included) and the horizontal
+        runs of dark modules as (row, first column, length)
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    runs = []
+    for row, modules in enumerate(matrix):
+        col = 0
+        while col < len(modules):
+            if modules[col]:
+                start = col
+                while col < len(modules) and modules[col]:
+                    col += 1
+                runs.append((row, start, col - start))
+            else:
+                col += 1
+    return len(matrix), tuple(runs)
 
 
 class IDCardGenerator:
@@ -2172,18 +6081,16 @@ class IDCardGenerator:
         self.title_font_path = "fonts/Arial_Bold.ttf"
         self.regular_font_path = "fonts/Arial.ttf"
 
-        # Try to load fonts, use default if not available
-        try:
-            self.title_font = ImageFont.truetype(self.title_font_path, 36)
-            self.subtitle_font = ImageFont.truetype(self.title_font_path, 24)
-            self.regular_font = ImageFont.truetype(self.regular_font_path, 20)
-            self.small_font = ImageFont.truetype(self.regular_font_path, 16)
-        except IOError:
-            # Use default font if custom font not available
-            self.title_font = ImageFont.load_default()
-            self.subtitle_font = ImageFont.load_default()
-            self.regular_font = ImageFont.load_default()
-            self.small_font = ImageFont.load_default()
+        # Loaded once per process, default font if not available
+        fonts = load_id_card_fonts(self.title_font_path, self.regular_font_path)
+        self.title_font = fonts["title"]
+        self.subtitle_font = fonts["subtitle"]
+        self.regular_font = fonts["regular"]
+        self.small_font = fonts["small"]
+
+        self.qr_cache_dir = "qr_cache"
+        self.photo_size = 300
+        self._template = None  # (template key, prerendered static layer)
 
     def get_student_data(self, student_id=None, programme=None):
         """
@@ -2196,7 +6103,7 @@ class IDCardGenerator:
         Returns:
             DataFrame with student information
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = connect_db(self.db_path)
 
         query = """
             SELECT 
@@ -2235,7 +6142,19 @@ class IDCardGenerator:
         return df
 
     def generate_qr_code(self, data, size=200):
-        """Generate QR code with student data"""
+        """
+        Generate QR code with student data
+
+        Codes are cached on disk by a hash of size and payload, so a card
+        printed again reuses its QR image.
+        """
+        qr_cache = get_qr_cache(self.qr_cache_dir)
+        key = hashlib.sha256(f"{size}:{data}".encode("utf-8")).hexdigest()
+        cached_path = qr_cache.lookup(key)
+        if cached_path:
+            with open(cached_path, "rb") as f:
+                return io.BytesIO(f.read())
+
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -2246,26 +6165,34 @@ class IDCardGenerator:
         qr.make(fit=True)
 
         img = qr.make_image(fill_color="black", back_color="white")
-        img = img.resize((size, size))
+        # Nearest-neighbour keeps the modules sharp
+        img = img.resize((size, size), Image.NEAREST)
 
         # Convert to bytes
         img_bytes = io.BytesIO()
         img.save(img_bytes, format="PNG")
+        qr_cache.store(key, img_bytes.getvalue())
         img_bytes.seek(0)
 
         return img_bytes
 
-    def create_id_card(self, student_data):
+    def _card_template(self):
         """
-        Create an ID card for a student
-
-        Args:
-            student_data: Dictionary with student information
-
-        Returns:
-            BytesIO object containing the ID card image
+        Static layer shared by every card (header, signature line, dates,
+        footer), rendered once per day and colour scheme
         """
-        # Create blank card
+        today = datetime.now()
+        template_key = (
+            today.date(),
+            self.card_width,
+            self.card_height,
+            self.card_color,
+            self.text_color,
+            self.accent_color,
+        )
+        if self._template and self._template[0] == template_key:
+            return self._template[1]
+
         card = Image.new("RGB", (self.card_width, self.card_height), self.card_color)
         draw = ImageDraw.Draw(card)
 
@@ -2279,46 +6206,101 @@ class IDCardGenerator:
             anchor="mm",
         )
 
+        # Add issue and expiry dates
+        expiry = today + timedelta(days=365)  # 1 year validity
+
+        draw.text(
+            (50, self.card_height - 80),
+            f"Issue Date: {today.strftime('%d-%m-%Y')}",
+            font=self.small_font,
+            fill=self.text_color,
+        )
+
+        draw.text(
+            (50, self.card_height - 50),
+            f"Expiry Date: {expiry.strftime('%d-%m-%Y')}",
+            font=self.small_font,
+            fill=self.text_color,
+        )
+
+        # Add signature line
+        sig_start_x = 50
+        sig_start_y = self.card_height - 150
+        draw.line(
+            [(sig_start_x, sig_start_y), (sig_start_x + 200, sig_start_y)],
+            fill=self.text_color,
+            width=2,
+        )
+        draw.text(
+            (sig_start_x + 100, sig_start_y + 20),
+            "Student Signature",
+            font=self.small_font,
+            fill=self.text_color,
+            anchor="mm",
+        )
+
+        # Add footer
+        draw.rectangle(
+            [(0, self.card_height - 30), (self.card_width, self.card_height)],
+            fill=self.accent_color,
+        )
+        draw.text(
+            (self.card_width // 2, self.card_height - 15),
+            "This card remains the property of UPSA and must be returned upon request",
+            font=self.small_font,
+            fill=(255, 255, 255),
+            anchor="mm",
+        )
+
+        self._template = (template_key, card)
+        return card
+
+    def load_photo(self, photo_path):
+        """
+        Passport photo scaled to the card's photo box, or None if missing or
+        unreadable. The cached large thumbnail is used when there is one;
+        JPEGs are decoded in draft mode at (close to) the target size
+        instead of at full resolution.
+        """
+        if not photo_path or not os.path.exists(photo_path):
+            return None
+        try:
+            with Image.open(thumbnail_path(photo_path, "large")) as photo:
+                photo.draft("RGB", (self.photo_size, self.photo_size))
+                return photo.convert("RGB").resize(
+                    (self.photo_size, self.photo_size), Image.LANCZOS
+                )
+        except Exception:
+            return None
+
+    def render_card(self, student_data):
+        """
+        Render an ID card for a student onto a copy of the card template
+
+        Args:
+            student_data: Dictionary with student information
+
+        Returns:
+            PIL Image of the card
+        """
+        card = self._card_template().copy()
+        draw = ImageDraw.Draw(card)
+
         # Add student photo
-        photo_size = 300
+        photo_size = self.photo_size
         photo_pos = (50, 150)
+        photo_box = [photo_pos, (photo_pos[0] + photo_size, photo_pos[1] + photo_size)]
 
-        if student_data["passport_photo_path"] and os.path.exists(
-            student_data["passport_photo_path"]
-        ):
-            try:
-                photo = Image.open(student_data["passport_photo_path"])
-                photo = photo.resize((photo_size, photo_size))
-                card.paste(photo, photo_pos)
-
-                # Add border around photo
-                draw.rectangle(
-                    [photo_pos, (photo_pos[0] + photo_size, photo_pos[1] + photo_size)],
-                    outline=self.accent_color,
-                    width=5,
-                )
-            except Exception as e:
-                # If error loading photo, draw placeholder
-                draw.rectangle(
-                    [photo_pos, (photo_pos[0] + photo_size, photo_pos[1] + photo_size)],
-                    outline=self.accent_color,
-                    width=5,
-                    fill=(240, 240, 240),
-                )
-                draw.text(
-                    (photo_pos[0] + photo_size // 2, photo_pos[1] + photo_size // 2),
-                    "NO PHOTO",
-                    font=self.subtitle_font,
-                    fill=self.text_color,
-                    anchor="mm",
-                )
+        photo = self.load_photo(student_data["passport_photo_path"])
+        if photo is not None:
+            card.paste(photo, photo_pos)
+
+            # Add border around photo
+            draw.rectangle(photo_box, outline=self.accent_color, width=5)
         else:
             # Draw placeholder if no photo
             draw.rectangle(
-                [photo_pos, (photo_pos[0] + photo_size, photo_pos[1] + photo_size)],
-                outline=self.accent_color,
-                width=5,
-                fill=(240, 240, 240),
+                photo_box, outline=self.accent_color, width=5, fill=(240, 240, 240)
             )
             draw.text(
                 (photo_pos[0] + photo_size // 2, photo_pos[1] + photo_size // 2),
@@ -2380,83 +6362,98 @@ class IDCardGenerator:
 
         # Generate and add QR code
         qr_data = f"ID:{student_data['student_id']}\nName:{student_data['surname']}, {student_data['other_names']}\nProgramme:{student_data['programme']}"
-        qr_img_bytes = self.generate_qr_code(qr_data)
-        qr_img = Image.open(qr_img_bytes)
+        qr_img = Image.open(self.generate_qr_code(qr_data))
 
         qr_pos = (self.card_width - 250, self.card_height - 250)
         card.paste(qr_img, qr_pos)
 
-        # Add issue and expiry dates
-        today = datetime.now()
-        expiry = today + timedelta(days=365)  # 1 year validity
-
-        draw.text(
-            (50, self.card_height - 80),
-            f"Issue Date: {today.strftime('%d-%m-%Y')}",
-            font=self.small_font,
-            fill=self.text_color,
-        )
-
-        draw.text(
-            (50, self.card_height - 50),
-            f"Expiry Date: {expiry.strftime('%d-%m-%Y')}",
-            font=self.small_font,
-            fill=self.text_color,
-        )
+        return card
 
-        # Add signature line
-        sig_start_x = 50
-        sig_start_y = self.card_height - 150
-        draw.line(
-            [(sig_start_x, sig_start_y), (sig_start_x + 200, sig_start_y)],
-            fill=self.text_color,
-            width=2,
-        )
-        draw.text(
-            (sig_start_x + 100, sig_start_y + 20),
-            "Student Signature",
-            font=self.small_font,
-            fill=self.text_color,
-            anchor="mm",
-        )
+    def create_id_card(self, student_data):
+        """
+        Create an ID card for a student
 
-        # Add footer
-        draw.rectangle(
-            [(0, self.card_height - 30), (self.card_width, self.card_height)],
-            fill=self.accent_color,
-        )
-        draw.text(
-            (self.card_width // 2, self.card_height - 15),
-            "This card remains the property of UPSA and must be returned upon request",
-            font=self.small_font,
-            fill=(255, 255, 255),
-            anchor="mm",
-        )
+        Args:
+            student_data: Dictionary with student information
 
+        Returns:
+            BytesIO object containing the ID card image
+        """
         # Convert to bytes
         img_bytes = io.BytesIO()
-        card.save(img_bytes, format="PNG")
+        self.render_card(student_data).save(img_bytes, format="PNG")
         img_bytes.seek(0)
 
         return img_bytes
 
-    def create_pdf_from_cards(self, card_bytes_list, filename="id_cards.pdf"):
+    def render_settings(self) -> Tuple:
+        """Attributes a worker process needs to render cards like this generator"""
+        return tuple(
+            (name, getattr(self, name))
+            for name in (
+                "db_path",
+                "card_width",
+                "card_height",
+                "card_color",
+                "text_color",
+                "accent_color",
+                "title_font_path",
+                "regular_font_path",
+                "qr_cache_dir",
+                "photo_size",
+            )
+        )
+
+    def render_cards(self, students, scratch_dir, progress_callback=None, max_workers=None):
         """
-        Create a PDF with multiple ID cards (4 per page)
+        Renders cards for student records into JPEG files in scratch_dir.
+
+        Cards are rendered in worker processes that each load the fonts and
+        the card template once. Results are yielded in input order.
 
         Args:
-            card_bytes_list: List of BytesIO objects containing card images
-            filename: Output PDF filename
+            students: List of student record dicts
+            scratch_dir: Directory for the card images
+            progress_callback: Optional callable(done, total) invoked per card
+            max_workers: Number of worker processes (default: CPU count)
+
+        Yields:
+            Path of each card image
+        """
+        settings = self.render_settings()
+        tasks = [
+            (settings, student, os.path.join(scratch_dir, f"card_{i:06d}.jpg"))
+            for i, student in enumerate(students)
+        ]
+        executor = fork_process_pool(len(tasks), max_workers, _id_card_worker_init)
+        try:
+            if executor:
+                chunksize = max(1, min(16, len(tasks) // (available_cpus() * 4)))
+                results = executor.map(_render_id_card_task, tasks, chunksize=chunksize)
+            else:
+                results = (self._render_card_file(student, path) for _, student, path in tasks)
+            for done, card_path in enumerate(results, 1):
+                if progress_callback:
+                    progress_callback(done, len(tasks))
+                yield card_path
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+    def _render_card_file(self, student_data, card_path):
+        self.render_card(student_data).save(card_path, format="JPEG", quality=90)
+        return card_path
+
+    def _card_slots(self):
+        """
+        Card size on the page and the slot positions, 4 cards per A4 page
 
         Returns:
-            Path to the generated PDF file
+            Tuple of (card_width_mm, card_height_mm, [(x_mm, y_mm), ...])
         """
         # A4 size in points
         page_width, page_height = A4
 
-        # Create PDF
-        c = canvas.Canvas(filename, pagesize=A4)
-
         cards_per_page = 4
         cards_per_row = 2
 
@@ -2486,6 +6483,26 @@ class IDCardGenerator:
 
             positions.append((x, y))
 
+        return card_width_mm, card_height_mm, positions
+
+    def create_pdf_from_cards(self, card_bytes_list, filename="id_cards.pdf"):
+        """
+        Create a PDF with multiple ID cards (4 per page)
+
+        Args:
+            card_bytes_list: Iterable of BytesIO objects containing card images,
+                or paths of card JPEG files
+            filename: Output PDF filename
+
+        Returns:
+            Path to the generated PDF file
+        """
+        # Create PDF
+        c = canvas.Canvas(filename, pagesize=A4)
+
+        card_width_mm, card_height_mm, positions = self._card_slots()
+        cards_per_page = len(positions)
+
         # Add cards to PDF
         for i, card_bytes in enumerate(card_bytes_list):
             if i > 0 and i % cards_per_page == 0:
@@ -2494,14 +6511,18 @@ class IDCardGenerator:
             pos_index = i % cards_per_page
             x, y = positions[pos_index]
 
-            # Reset file pointer
-            card_bytes.seek(0)
+            if isinstance(card_bytes, str):
+                # JPEG files are embedded as they are, without re-encoding
+                img_reader = card_bytes
+            else:
+                # Reset file pointer
+                card_bytes.seek(0)
 
-            # Create a PIL Image from BytesIO
-            img = Image.open(card_bytes)
+                # Create a PIL Image from BytesIO
+                img = Image.open(card_bytes)
 
-            # Convert PIL Image to a format ReportLab can use
-            img_reader = ImageReader(img)
+                # Convert PIL Image to a format ReportLab can use
+                img_reader = ImageReader(img)
 
             # Add image to PDF - convert mm to points
             c.drawImage(
@@ -2516,13 +6537,203 @@ class IDCardGenerator:
         c.save()
         return filename
 
-    def generate_id_cards(self, student_id=None, programme=None):
+    def _draw_vector_text(self, c, text, x, y, font, size, fill, anchor="la"):
+        """
+        Draws text at card pixel coordinates (origin top left) with PIL's
+        anchors: "la" puts the ascender line at y, "mm" centres on (x, y)
+        """
+        c.setFont(font, size)
+        c.setFillColorRGB(*(channel / 255 for channel in fill))
+        ascent = pdfmetrics.getAscent(font, size)
+        descent = pdfmetrics.getDescent(font, size)
+        if anchor == "mm":
+            c.drawCentredString(x, self.card_height - y - (ascent + descent) / 2, text)
+        else:
+            c.drawString(x, self.card_height - y - ascent, text)
+
+    def _draw_vector_template(self, c, fonts):
+        """Static card parts as a form XObject, stored once per PDF"""
+        width, height = self.card_width, self.card_height
+        today = datetime.now()
+        expiry = today + timedelta(days=365)  # 1 year validity
+
+        c.beginForm("id_card_template", 0, 0, width, height)
+        c.setFillColorRGB(*(channel / 255 for channel in self.card_color))
+        c.rect(0, 0, width, height, stroke=0, fill=1)
+
+        # Header with university name
+        c.setFillColorRGB(*(channel / 255 for channel in self.accent_color))
+        c.rect(0, height - 100, width, 100, stroke=0, fill=1)
+        self._draw_vector_text(
+            c, "UNIVERSITY OF PROFESSIONAL STUDIES, ACCRA",
+            width // 2, 50, fonts["title"], 36, (255, 255, 255), "mm",
+        )
+
+        # Issue and expiry dates
+        self._draw_vector_text(
+            c, f"Issue Date: {today.strftime('%d-%m-%Y')}",
+            50, height - 80, fonts["small"], 16, self.text_color,
+        )
+        self._draw_vector_text(
+            c, f"Expiry Date: {expiry.strftime('%d-%m-%Y')}",
+            50, height - 50, fonts["small"], 16, self.text_color,
+        )
+
+        # Signature line
+        c.setStrokeColorRGB(*(channel / 255 for channel in self.text_color))
+        c.setLineWidth(2)
+        c.line(50, 150, 250, 150)
+        self._draw_vector_text(
+            c, "Student Signature", 150, height - 130, fonts["small"], 16,
+            self.text_color, "mm",
+        )
+
+        # Footer
+        c.setFillColorRGB(*(channel / 255 for channel in self.accent_color))
+        c.rect(0, 0, width, 30, stroke=0, fill=1)
+        self._draw_vector_text(
+            c, "This card remains the property of UPSA and must be returned upon request",
+            width // 2, height - 15, fonts["small"], 16, (255, 255, 255), "mm",
+        )
+        c.endForm()
+
+    def _draw_vector_card(self, c, student_data, fonts):
+        """Per-student parts of a card, in card pixel units on top of the template"""
+        height = self.card_height
+        photo_size = self.photo_size
+        photo_x, photo_y = 50, 150
+        # reportlab strokes are centred on the path, PIL's lie inside the box
+        border = 5
+        accent = [channel / 255 for channel in self.accent_color]
+
+        photo_drawn = False
+        photo_path = student_data["passport_photo_path"]
+        if photo_path and os.path.exists(photo_path):
+            try:
+                # Drawn from the file so the JPEG is embedded as is, and only
+                # once per PDF however many cards use it
+                c.drawImage(
+                    thumbnail_path(photo_path, "large"),
+                    photo_x, height - photo_y - photo_size, photo_size, photo_size,
+                )
+                photo_drawn = True
+            except Exception:
+                pass
+        if not photo_drawn:
+            c.setFillColorRGB(240 / 255, 240 / 255, 240 / 255)
+            c.rect(photo_x, height - photo_y - photo_size, photo_size, photo_size, stroke=0, fill=1)
+        c.setStrokeColorRGB(*accent)
+        c.setLineWidth(border)
+        c.rect(
+            photo_x + border / 2,
+            height - photo_y - photo_size + border / 2,
+            photo_size - border,
+            photo_size - border,
+            stroke=1,
+            fill=0,
+        )
+        if not photo_drawn:
+            self._draw_vector_text(
+                c, "NO PHOTO", photo_x + photo_size // 2, photo_y + photo_size // 2,
+                fonts["subtitle"], 24, self.text_color, "mm",
+            )
+
+        # Student information
+        info_x = photo_x + photo_size + 50
+        line_height = 40
+        lines = [
+            (f"Student ID: {student_data['student_id']}", "subtitle", 24),
+            (f"Name: {student_data['surname']}, {student_data['other_names']}", "subtitle", 24),
+            (f"Programme: {student_data['programme']}", "regular", 20),
+            (
+                f"Index Number: {student_data['index_number']}"
+                if pd.notna(student_data["index_number"]) and student_data["index_number"]
+                else None,
+                "regular",
+                20,
+            ),
+            (f"Email: {student_data['email']}", "regular", 20),
+            (f"Phone: {student_data['telephone']}", "regular", 20),
+        ]
+        for i, (text, role, size) in enumerate(lines):
+            if text:
+                self._draw_vector_text(
+                    c, text, info_x, 150 + line_height * i, fonts[role], size, self.text_color
+                )
+
+        # QR code as vector modules
+        qr_data = f"ID:{student_data['student_id']}\nName:{student_data['surname']}, {student_data['other_names']}\nProgramme:{student_data['programme']}"
+        modules, runs = qr_code_modules(qr_data)
+        qr_size = 200
+        qr_x, qr_top = self.card_width - 250, height - (self.card_height - 250)
+        module = qr_size / modules
+        c.setFillColorRGB(1, 1, 1)
+        c.rect(qr_x, qr_top - qr_size, qr_size, qr_size, stroke=0, fill=1)
+        path = c.beginPath()
+        for row, col, length in runs:
+            path.rect(qr_x + col * module, qr_top - (row + 1) * module, length * module, module)
+        c.setFillColorRGB(0, 0, 0)
+        c.drawPath(path, stroke=0, fill=1)
+
+    def create_vector_pdf(self, students, filename="id_cards.pdf", progress_callback=None, total=None):
+        """
+        Create a PDF with multiple ID cards (4 per page) drawn directly on the
+        canvas: text and shapes stay vector, the static parts are a form
+        stored once, photos are embedded as JPEGs and QR codes are drawn as
+        modules. No card is rasterised, so the file is a fraction of the
+        size of create_pdf_from_cards output. Records are consumed one at a
+        time and each page is finished before the next is started.
+
+        Args:
+            students: Iterable of student record dicts
+            filename: Output PDF filename
+            progress_callback: Optional callable(done, total) invoked per card
+            total: Number of records, for progress reporting
+
+        Returns:
+            Path to the generated PDF file
+        """
+        c = canvas.Canvas(filename, pagesize=A4, pageCompression=1)
+        fonts = register_id_card_pdf_fonts(self.title_font_path, self.regular_font_path)
+        card_width_mm, card_height_mm, positions = self._card_slots()
+        scale = card_width_mm * mm / self.card_width
+        self._draw_vector_template(c, fonts)
+
+        for i, student in enumerate(students):
+            if i > 0 and i % len(positions) == 0:
+                c.showPage()  # New page
+            x, y = positions[i % len(positions)]
+            c.saveState()
+            c.translate(x * mm, (y - card_height_mm) * mm)
+            c.scale(scale, scale)
+            c.doForm("id_card_template")
+            self._draw_vector_card(c, student, fonts)
+            c.restoreState()
+            if progress_callback:
+                progress_callback(i + 1, total)
+
+        c.save()
+        return filename
+
+    def generate_id_cards(
+        self,
+        student_id=None,
+        programme=None,
+        progress_callback=None,
+        max_workers=None,
+        mode="raster",
+    ):
         """
         Generate ID cards based on filters
 
         Args:
             student_id: Optional specific student ID
             programme: Optional programme filter
+            progress_callback: Optional callable(done, total) invoked per card
+            max_workers: Number of worker processes for raster cards
+                (default: CPU count)
+            mode: "raster" (a rendered image per card) or "vector"
+                (see create_vector_pdf)
 
         Returns:
             Path to the generated PDF or ZIP file
@@ -2533,29 +6744,114 @@ class IDCardGenerator:
         if students_df.empty:
             return None, "No students found matching the criteria"
 
-        # Generate cards
-        card_bytes_list = []
-        for _, student in students_df.iterrows():
-            card_bytes = self.create_id_card(student)
-            card_bytes_list.append(card_bytes)
-
         # If only one student, return single PDF
-        if len(card_bytes_list) == 1:
+        if len(students_df) == 1:
             student_id = students_df.iloc[0]["student_id"]
             filename = f"id_card_{student_id}.pdf"
-            pdf_path = self.create_pdf_from_cards([card_bytes_list[0]], filename)
-            return pdf_path, f"ID card generated for student {student_id}"
+        else:
+            # For multiple students, create PDF with 4 cards per page
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # For multiple students, create PDF with 4 cards per page
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            if programme:
+                filename = f"id_cards_{programme}_{timestamp}.pdf"
+            else:
+                filename = f"id_cards_all_{timestamp}.pdf"
 
-        if programme:
-            filename = f"id_cards_{programme}_{timestamp}.pdf"
+        if mode == "vector":
+            pdf_path = self.create_vector_pdf(
+                students_df.to_dict("records"), filename, progress_callback, len(students_df)
+            )
         else:
-            filename = f"id_cards_all_{timestamp}.pdf"
+            # Cards are placed on the pages as the workers finish them
+            with tempfile.TemporaryDirectory() as scratch_dir:
+                card_paths = self.render_cards(
+                    students_df.to_dict("records"), scratch_dir, progress_callback, max_workers
+                )
+                pdf_path = self.create_pdf_from_cards(card_paths, filename)
+
+        if len(students_df) == 1:
+            return pdf_path, f"ID card generated for student {student_id}"
+        return pdf_path, f"Generated {len(students_df)} ID cards"
 
-        pdf_path = self.create_pdf_from_cards(card_bytes_list, filename)
-        return pdf_path, f"Generated {len(card_bytes_list)} ID cards"
+
+@functools.lru_cache(maxsize=4)
+def _id_card_worker_generator(settings) -> IDCardGenerator:
+    """Generator for one set of render settings, built once per process"""
+    generator = IDCardGenerator()
+    for name, value in settings:
+        setattr(generator, name, value)
+    return generator
+
+
+def _id_card_worker_init():
+    """Forked ID card workers get fresh cache locks (see _batch_pdf_worker_init)"""
+    global _qr_caches, _qr_caches_lock
+    _batch_pdf_worker_init()
+    _qr_caches = {}
+    _qr_caches_lock = threading.Lock()
+
+
+def _render_id_card_task(task):
+    """Renders one card in a worker process; task is (settings, student, card path)"""
+    settings, student, card_path = task
+    return _id_card_worker_generator(settings)._render_card_file(student, card_path)
+
+
+def benchmark_id_cards(n_cards: int = 500, max_workers=None) -> pd.DataFrame:
+    """
+    Renders ID cards for n_cards approved synthetic students sharing one
+    passport photo, into a PDF 4 cards per page:
+    - as raster cards in-process with an empty QR cache
+    - as raster cards in-process again, with every QR code cached
+    - as raster cards in a process pool of max_workers (default: CPU count)
+    - as vector cards (create_vector_pdf)
+
+    Returns a DataFrame with seconds, cards per second and PDF size for
+    each run.
+    """
+    rows = []
+    with benchmark_database(n_cards) as conn, tempfile.TemporaryDirectory() as scratch_dir:
+        photo_path = os.path.join(scratch_dir, "photo.jpg")
+        Image.linear_gradient("L").resize((1800, 2400)).convert("RGB").save(
+            photo_path, "JPEG", quality=90
+        )
+        conn.execute(
+            "UPDATE student_info SET approval_status = 'approved', passport_photo_path = ?",
+            (photo_path,),
+        )
+        conn.commit()
+
+        generator = IDCardGenerator(conn.execute("PRAGMA database_list").fetchone()[2])
+        generator.qr_cache_dir = os.path.join(scratch_dir, "qr_cache")
+        students = generator.get_student_data().to_dict("records")
+        workers = min(max_workers or available_cpus(), len(students))
+        for step, run_workers in (
+            ("Raster, in-process, cold QR cache", 1),
+            ("Raster, in-process, warm QR cache", 1),
+            (f"Raster, process pool ({workers} workers)", workers),
+            ("Vector", None),
+        ):
+            card_dir = tempfile.mkdtemp(dir=scratch_dir)
+            pdf_path = os.path.join(card_dir, "id_cards.pdf")
+            started = time.perf_counter()
+            if run_workers is None:
+                generator.create_vector_pdf(students, pdf_path)
+            else:
+                generator.create_pdf_from_cards(
+                    generator.render_cards(students, card_dir, max_workers=run_workers),
+                    pdf_path,
+                )
+            seconds = time.perf_counter() - started
+            rows.append(
+                {
+                    "step": step,
+                    "seconds": round(seconds, 3),
+                    "cards": len(students),
+                    "cards_per_second": round(len(students) / max(seconds, 1e-6), 1),
+                    "pdf_mb": round(os.path.getsize(pdf_path) / (1024 * 1024), 2),
+                }
+            )
+    return pd.DataFrame(rows)
 
 
 def id_card_generator_ui():
@@ -2568,14 +6864,15 @@ def id_card_generator_ui():
     generator = IDCardGenerator()
 
     # Get list of programmes for dropdown
-    conn = sqlite3.connect("student_registration.db")
-    programmes_df = pd.read_sql_query(
-        "SELECT DISTINCT programme FROM student_info WHERE programme IS NOT NULL AND programme != ''",
-        conn,
-    )
-    conn.close()
+    programmes = ["All"] + get_student_programmes()
 
-    programmes = ["All"] + programmes_df["programme"].tolist()
+    output_modes = {
+        "Vector (small PDF, sharp text)": "vector",
+        "Raster (one image per card)": "raster",
+    }
+    output_mode = output_modes[
+        st.radio("Card Output", list(output_modes), horizontal=True, key="id_card_mode")
+    ]
 
     # Create tabs for different generation options
     tab1, tab2 = st.tabs(["Generate by Programme", "Generate for Individual Student"])
@@ -2586,7 +6883,7 @@ def id_card_generator_ui():
 
         if selected_programme != "All":
             # Get student count for the selected programme
-            conn = sqlite3.connect("student_registration.db")
+            conn = connect_db()
             count_df = pd.read_sql_query(
                 "SELECT COUNT(*) as count FROM student_info WHERE programme = ? AND approval_status = 'approved'",
                 conn,
@@ -2600,7 +6897,7 @@ def id_card_generator_ui():
             )
         else:
             # Get total student count
-            conn = sqlite3.connect("student_registration.db")
+            conn = connect_db()
             count_df = pd.read_sql_query(
                 "SELECT COUNT(*) as count FROM student_info WHERE approval_status = 'approved'",
                 conn,
@@ -2616,46 +6913,22 @@ def id_card_generator_ui():
             if student_count == 0:
                 st.warning("No approved students found for the selected criteria")
             else:
-                with st.spinner("Generating ID cards..."):
-                    programme_param = (
-                        None if selected_programme == "All" else selected_programme
-                    )
-                    pdf_path, message = generator.generate_id_cards(
-                        programme=programme_param
-                    )
-
-                    if pdf_path:
-                        st.success(message)
-                        with open(pdf_path, "rb") as f:
-                            st.download_button(
-                                label="Download ID Cards PDF",
-                                data=f,
-                                file_name=os.path.basename(pdf_path),
-                                mime="application/pdf",
-                            )
-                        # Clean up the file after download
-                        try:
-                            os.remove(pdf_path)
-                        except:
-                            pass
-                    else:
-                        st.error(message)
+                programme_param = (
+                    None if selected_programme == "All" else selected_programme
+                )
+                submit_job(
+                    "id_cards",
+                    {"programme": programme_param, "mode": output_mode},
+                    state_key="id_cards_job",
+                    title=f"ID cards ({selected_programme})",
+                )
+        render_job_status("id_cards_job")
 
     with tab2:
         st.write("Generate ID card for a specific student")
 
         # Get list of students for dropdown
-        conn = sqlite3.connect("student_registration.db")
-        students_df = pd.read_sql_query(
-            """
-            SELECT student_id, surname, other_names 
-            FROM student_info 
-            WHERE approval_status = 'approved'
-            ORDER BY surname, other_names
-            """,
-            conn,
-        )
-        conn.close()
+        students_df = get_student_options(approved_only=True)
 
         if students_df.empty:
             st.warning("No approved students found in the database")
@@ -2672,7 +6945,7 @@ def id_card_generator_ui():
             if st.button("Generate ID Card", key="generate_individual"):
                 with st.spinner("Generating ID card..."):
                     pdf_path, message = generator.generate_id_cards(
-                        student_id=student_id
+                        student_id=student_id, mode=output_mode
                     )
 
                     if pdf_path:
@@ -2741,6 +7014,124 @@ logging.basicConfig(
 )
 logger = logging.getLogger('file_compressor')
 
+# (JPEG quality, max image dimension or None) tried in order until a PDF fits
+PDF_RECOMPRESSION_PASSES = ((75, None), (60, 2000), (45, 1600))
+PDF_IMAGE_MODES = {"/DeviceRGB": "RGB", "/DeviceGray": "L"}
+
+
+def _pdf_image_mode(image) -> Optional[str]:
+    """PIL mode for an 8-bit grey/RGB image XObject, None for anything else"""
+    colour_space = image.get("/ColorSpace")
+    if isinstance(colour_space, str):
+        return PDF_IMAGE_MODES.get(colour_space)
+    colour_space = colour_space.get_object() if colour_space is not None else None
+    if isinstance(colour_space, list) and colour_space and colour_space[0] == "/ICCBased":
+        return {1: "L", 3: "RGB"}.get(colour_space[1].get_object().get("/N"))
+    return None
+
+
+def _recompress_pdf_image(image, quality: int, max_dimension: Optional[int]) -> bool:
+    """
+    Re-encodes one image XObject in place as a JPEG, downscaled to
+    max_dimension. Masks, CMYK/indexed images and bilevel codecs are left
+    alone, as is any image the re-encoding would not make smaller.
+
+    Returns:
+        True if the image was replaced
+    """
+    if image.get("/ImageMask") or "/Decode" in image or image.get("/BitsPerComponent") != 8:
+        return False
+    mode = _pdf_image_mode(image)
+    if mode is None:
+        return False
+    filters = image.get("/Filter")
+    filters = [filters] if isinstance(filters, str) else list(filters or [])
+    if any(f in ("/JPXDecode", "/JBIG2Decode", "/CCITTFaxDecode") for f in filters):
+        return False
+
+    data = image.get_data()
+    if filters and filters[-1] == "/DCTDecode":
+        img = Image.open(io.BytesIO(data))
+        # Let the JPEG decoder do most of the downscaling
+        img.draft(mode, (max_dimension, max_dimension) if max_dimension else img.size)
+    else:
+        img = Image.frombytes(mode, (image["/Width"], image["/Height"]), data)
+    if img.mode != mode:
+        return False
+    if max_dimension and max(img.size) > max_dimension:
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    if buffer.tell() >= len(image._data):
+        return False
+    image._data = buffer.getvalue()
+    image.decoded_self = None
+    image[PyPDF2.generic.NameObject("/Filter")] = PyPDF2.generic.NameObject("/DCTDecode")
+    image.pop("/DecodeParms", None)
+    image[PyPDF2.generic.NameObject("/Width")] = PyPDF2.generic.NumberObject(img.width)
+    image[PyPDF2.generic.NameObject("/Height")] = PyPDF2.generic.NumberObject(img.height)
+    return True
+
+
+def recompress_pdf(pdf_bytes: bytes, quality: int = 75, max_dimension: Optional[int] = None) -> bytes:
+    """
+    Shrinks a PDF by re-encoding its embedded images as JPEGs and
+    Flate-compressing its page content streams. Text and vector content
+    are kept as they are.
+
+    Args:
+        pdf_bytes: PDF file as bytes
+        quality: JPEG quality for re-encoded images
+        max_dimension: Longest image side in pixels, or None to keep sizes
+
+    Returns:
+        The rewritten PDF as bytes
+    """
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    writer = PyPDF2.PdfWriter()
+    seen = set()
+    for page in reader.pages:
+        resources = page.get("/Resources")
+        xobjects = resources.get_object().get("/XObject") if resources else None
+        for ref in xobjects.get_object().values() if xobjects else ():
+            # Images shared between pages are only re-encoded once
+            key = getattr(ref, "idnum", id(ref))
+            if key in seen:
+                continue
+            seen.add(key)
+            xobject = ref.get_object()
+            if xobject.get("/Subtype") != "/Image":
+                continue
+            try:
+                _recompress_pdf_image(xobject, quality, max_dimension)
+            except Exception as e:
+                logger.warning(f"Leaving PDF image as is: {str(e)}")
+        page.compress_content_streams()
+        writer.add_page(page)
+    if reader.metadata:
+        writer.add_metadata(reader.metadata)
+
+    output_buffer = io.BytesIO()
+    writer.write(output_buffer)
+    return output_buffer.getvalue()
+
+
+def shrink_pdf(pdf_bytes: bytes, max_size_bytes: float, passes=PDF_RECOMPRESSION_PASSES) -> Optional[bytes]:
+    """
+    Runs recompress_pdf with each (quality, max_dimension) pass in turn,
+    always starting from the original.
+
+    Returns:
+        The first result that is smaller and fits max_size_bytes, or None
+    """
+    for quality, max_dimension in passes:
+        compressed_bytes = recompress_pdf(pdf_bytes, quality, max_dimension)
+        if len(compressed_bytes) < len(pdf_bytes) and len(compressed_bytes) <= max_size_bytes:
+            return compressed_bytes
+    return None
+
+
 class FileCompressor:
     """
     Utility class for compressing various file types to reduce storage requirements.
@@ -2882,7 +7273,7 @@ class FileCompressor:
     
     def _compress_pdf(self, pdf_bytes: bytes, filename: str) -> Tuple[bytes, str, bool]:
         """
-        Compress a PDF file by reducing image quality and removing unnecessary elements.
+        Compress a PDF file by re-encoding its images and compressing its page streams.
         
         Args:
             pdf_bytes: PDF file as bytes
@@ -2891,85 +7282,786 @@ class FileCompressor:
         Returns:
             Tuple containing (compressed_pdf_bytes, new_filename, was_compressed)
         """
-        try:
-            # Create a new filename with compression indicator
-            name, ext = os.path.splitext(filename)
-            new_filename = f"{name}_compressed{ext}"
-            
-            # Create PDF reader and writer objects
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-            pdf_writer = PyPDF2.PdfWriter()
-            
-            # Process each page
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                pdf_writer.add_page(page)
-            
-            # Set compression parameters
-            pdf_writer.add_metadata(pdf_reader.metadata)
-            
-            # Write compressed PDF to buffer
-            output_buffer = io.BytesIO()
-            pdf_writer.write(output_buffer)
-            compressed_bytes = output_buffer.getvalue()
-            
-            # Check if compression was effective
-            if len(compressed_bytes) < len(pdf_bytes) and len(compressed_bytes) <= self.max_size_bytes:
-                logger.info(f"Compressed PDF {filename} from {len(pdf_bytes)/1024/1024:.2f}MB to "
-                           f"{len(compressed_bytes)/1024/1024:.2f}MB")
-                return compressed_bytes, new_filename, True
-            
-            # If standard compression wasn't enough, try more aggressive methods
-            # For PDFs that are still too large, we'll create a new PDF with reduced image quality
-            if len(compressed_bytes) > self.max_size_bytes:
-                logger.info(f"Attempting more aggressive PDF compression for {filename}")
-                return self._aggressive_pdf_compression(pdf_bytes, new_filename)
-            
-            return compressed_bytes, new_filename, True
-            
-        except Exception as e:
-            logger.error(f"Error compressing PDF {filename}: {str(e)}")
-            return pdf_bytes, filename, False
-    
-    def _aggressive_pdf_compression(self, pdf_bytes: bytes, filename: str) -> Tuple[bytes, str, bool]:
+        try:
+            # Create a new filename with compression indicator
+            name, ext = os.path.splitext(filename)
+            new_filename = f"{name}_compressed{ext}"
+            
+            compressed_bytes = shrink_pdf(pdf_bytes, self.max_size_bytes, PDF_RECOMPRESSION_PASSES[:1])
+            if compressed_bytes is not None:
+                logger.info(f"Compressed PDF {filename} from {len(pdf_bytes)/1024/1024:.2f}MB to "
+                           f"{len(compressed_bytes)/1024/1024:.2f}MB")
+                return compressed_bytes, new_filename, True
+            
+            # If standard compression wasn't enough, downscale the images as well
+            logger.info(f"Attempting more aggressive PDF compression for {filename}")
+            compressed_bytes, _, was_compressed = self._aggressive_pdf_compression(pdf_bytes, new_filename)
+            if was_compressed:
+                return compressed_bytes, new_filename, True
+            return pdf_bytes, filename, False
+            
+        except Exception as e:
+            logger.error(f"Error compressing PDF {filename}: {str(e)}")
+            return pdf_bytes, filename, False
+    
+    def _aggressive_pdf_compression(self, pdf_bytes: bytes, filename: str) -> Tuple[bytes, str, bool]:
+        """
+        Apply more aggressive PDF compression by downscaling embedded images and
+        lowering their quality down to min_quality. The document itself is never
+        replaced; if it cannot be brought under the limit the original is returned.
+        
+        Args:
+            pdf_bytes: PDF file as bytes
+            filename: Original filename
+            
+        Returns:
+            Tuple containing (compressed_pdf_bytes, new_filename, was_compressed)
+        """
+        try:
+            passes = PDF_RECOMPRESSION_PASSES[1:] + ((self.min_quality, 1400),)
+            compressed_bytes = shrink_pdf(pdf_bytes, self.max_size_bytes, passes)
+            
+            # Check if we achieved our goal
+            if compressed_bytes is not None:
+                logger.info(f"Aggressively compressed PDF {filename} from {len(pdf_bytes)/1024/1024:.2f}MB to "
+                           f"{len(compressed_bytes)/1024/1024:.2f}MB")
+                return compressed_bytes, filename, True
+            
+            # If still too large, return original with warning
+            logger.warning(f"Could not compress PDF {filename} below size limit")
+            return pdf_bytes, filename, False
+            
+        except Exception as e:
+            logger.error(f"Error in aggressive PDF compression for {filename}: {str(e)}")
+            return pdf_bytes, filename, False
+
+import mimetypes
+
+
+# Upload store
+#
+# Uploaded documents are stored by content under <root>/blobs/ab/cd/, so
+# identical re-uploads share one file and no directory grows past a few
+# hundred entries. The documents table indexes every blob; its refcount is
+# kept by triggers on the columns listed in DOCUMENT_REFERENCES.
+
+UPLOAD_DIR = "uploads"
+
+# (table, column, JSON path inside the column or None) holding upload paths
+DOCUMENT_REFERENCES = [
+    ("student_info", "ghana_card_path", None),
+    ("student_info", "passport_photo_path", None),
+    ("student_info", "certificate_path", None),
+    ("student_info", "transcript_path", None),
+    ("student_info", "receipt_path", None),
+    ("course_registration", "receipt_path", None),
+    ("email_batches", "attachment_path", None),
+    ("notifications", "metadata", "$.attachment_path"),
+]
+
+
+def _document_reference_sql(column: str, json_path: Optional[str], row: str = "") -> str:
+    """SQL for the upload path one DOCUMENT_REFERENCES entry holds"""
+    column = f"{row}.{column}" if row else column
+    if json_path is None:
+        return column
+    return f"CASE WHEN json_valid({column}) THEN json_extract({column}, '{json_path}') END"
+
+
+def create_document_ref_triggers(conn):
+    """Creates the triggers maintaining documents.refcount (idempotent)"""
+    tables = {}
+    for table, column, json_path in DOCUMENT_REFERENCES:
+        tables.setdefault(table, []).append((column, json_path))
+    for table, references in tables.items():
+        columns = sorted({column for column, _ in references})
+
+        def adjust(row, sign):
+            return "".join(
+                f"""
+                UPDATE documents SET refcount = refcount {sign} 1
+                WHERE path = {_document_reference_sql(column, json_path, row)};
+                """
+                for column, json_path in references
+            )
+
+        events = {
+            "ai": ("INSERT", adjust("NEW", "+")),
+            "ad": ("DELETE", adjust("OLD", "-")),
+            "au": (f"UPDATE OF {', '.join(columns)}", adjust("OLD", "-") + adjust("NEW", "+")),
+        }
+        for suffix, (event, body) in events.items():
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS document_refs_{table}_{suffix}
+                AFTER {event} ON {table}
+                BEGIN {body} END
+                """
+            )
+
+
+def drop_document_ref_triggers(conn):
+    for table in {table for table, _, _ in DOCUMENT_REFERENCES}:
+        for suffix in ("ai", "ad", "au"):
+            conn.execute(f"DROP TRIGGER IF EXISTS document_refs_{table}_{suffix}")
+
+
+def document_references_sql() -> str:
+    """SELECT of every upload path referenced by a row, one row per reference"""
+    return " UNION ALL ".join(
+        f"SELECT {_document_reference_sql(column, json_path)} AS path FROM {table}"
+        for table, column, json_path in DOCUMENT_REFERENCES
+    )
+
+
+def rebuild_document_refcounts(conn):
+    """
+    Recounts documents.refcount from the referencing tables and (re)creates
+    its triggers. Runs in the caller's transaction when one is open.
+    """
+    drop_document_ref_triggers(conn)
+    conn.execute(
+        f"""
+        UPDATE documents SET refcount = COALESCE(
+            (SELECT counts.n FROM (
+                SELECT path, COUNT(*) AS n FROM ({document_references_sql()})
+                WHERE path IS NOT NULL GROUP BY path
+            ) AS counts WHERE counts.path = documents.path),
+            0
+        )
+        """
+    )
+    create_document_ref_triggers(conn)
+
+
+class UploadStore:
+    """
+    Content-addressed storage for uploaded documents.
+
+    A blob lives at <root>/blobs/ab/cd/<sha256><ext>, named after the
+    SHA-256 of its content with the extension of its first upload, so
+    consumers that look at extensions keep working. Storing content that is
+    already present returns the existing path. Each blob has a row in the
+    documents table (hash, path, size, MIME type, owner, refcount).
+
+    Methods that write to the database take an optional conn; without one
+    they use and commit their own connection.
+    """
+
+    BLOB_PATTERN = re.compile(
+        r"(?:^|[\\/])blobs[\\/][0-9a-f]{2}[\\/][0-9a-f]{2}[\\/]([0-9a-f]{64})(?:\.\w+)?$"
+    )
+
+    def __init__(self, root: str = UPLOAD_DIR, db_path: str = DB_PATH):
+        self.root = root
+        self.db_path = db_path
+
+    def blob_path(self, digest: str, ext: str = "") -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest[2:4], f"{digest}{ext.lower()}")
+
+    @classmethod
+    def blob_digest(cls, path) -> Optional[str]:
+        """SHA-256 a blob path is named after, or None for other paths"""
+        match = cls.BLOB_PATTERN.search(str(path)) if path else None
+        return match.group(1) if match else None
+
+    def _register(self, conn, digest: str, path: str, size: int, filename: str, owner) -> str:
+        """Records a blob; returns the path of the blob already holding digest, if any"""
+        existing = conn.execute(
+            "SELECT path FROM documents WHERE sha256 = ?", (digest,)
+        ).fetchone()
+        if existing:
+            return existing[0]
+        conn.execute(
+            """
+            INSERT INTO documents (sha256, path, size, mime, owner, original_name, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                digest,
+                path,
+                size,
+                mimetypes.guess_type(filename)[0],
+                owner,
+                os.path.basename(filename),
+                _now_text(),
+            ),
+        )
+        return path
+
+    def _store(self, digest: str, filename: str, size: int, write, owner, conn) -> str:
+        """
+        Writes a blob unless its content is already stored, then records it
+
+        Args:
+            write: Callable(target_path) producing the blob file
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = connect_db(self.db_path)
+        try:
+            existing = conn.execute(
+                "SELECT path FROM documents WHERE sha256 = ?", (digest,)
+            ).fetchone()
+            if existing and os.path.exists(existing[0]):
+                # Reuse counts as a fresh upload for the orphan collector's grace period
+                os.utime(existing[0])
+                return existing[0]
+            path = existing[0] if existing else self.blob_path(digest, os.path.splitext(filename)[1])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+            try:
+                write(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            path = self._register(conn, digest, path, size, filename, owner)
+            if own_conn:
+                conn.commit()
+            return path
+        finally:
+            if own_conn:
+                conn.close()
+
+    def put_bytes(self, data: bytes, filename: str, owner: Optional[str] = None, conn=None) -> str:
+        """
+        Stores data as a blob.
+
+        Args:
+            data: File content
+            filename: Name the file was uploaded as (for extension and MIME type)
+            owner: Student or registration ID the document belongs to
+            conn: Optional connection whose transaction records the blob
+
+        Returns:
+            Path of the blob
+        """
+
+        def write(target):
+            with open(target, "wb") as f:
+                f.write(data)
+
+        digest = hashlib.sha256(data).hexdigest()
+        return self._store(digest, filename, len(data), write, owner, conn)
+
+    def put_file(
+        self,
+        source_path: str,
+        filename: Optional[str] = None,
+        owner: Optional[str] = None,
+        move: bool = False,
+        digest: Optional[str] = None,
+        conn=None,
+    ) -> str:
+        """
+        Stores a file on disk as a blob, hard-linking it where possible.
+
+        Args:
+            source_path: File to store
+            filename: Upload name (default: the source file name)
+            owner: Student or registration ID the document belongs to
+            move: Remove source_path once stored
+            digest: SHA-256 of the file when already known
+            conn: Optional connection whose transaction records the blob
+
+        Returns:
+            Path of the blob
+        """
+
+        def write(target):
+            try:
+                os.link(source_path, target)
+            except OSError:
+                shutil.copyfile(source_path, target)
+
+        digest = digest or file_sha256(source_path)
+        path = self._store(
+            digest,
+            filename or os.path.basename(source_path),
+            os.path.getsize(source_path),
+            write,
+            owner,
+            conn,
+        )
+        if move and os.path.abspath(path) != os.path.abspath(source_path):
+            os.remove(source_path)
+        return path
+
+    def original_name(self, path: str, conn=None) -> str:
+        """Name a document was uploaded as (the file name for other paths)"""
+        own_conn = conn is None
+        if own_conn:
+            conn = connect_db(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT original_name FROM documents WHERE path = ?", (path,)
+            ).fetchone()
+        finally:
+            if own_conn:
+                conn.close()
+        return row[0] if row and row[0] else os.path.basename(path)
+
+    def release(self, path: Optional[str], conn=None):
+        """
+        Deletes a document after the last row referring to it was changed or
+        deleted (call after committing). Blobs still referenced elsewhere are
+        kept; files from before the store are removed as before.
+        """
+        if not isinstance(path, str) or not path:
+            return
+        if self.blob_digest(path) is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        own_conn = conn is None
+        if own_conn:
+            conn = connect_db(self.db_path)
+        try:
+            deleted = conn.execute(
+                "DELETE FROM documents WHERE path = ? AND refcount <= 0", (path,)
+            ).rowcount
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+        if deleted and os.path.exists(path):
+            os.remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Blob count and size, and what unreferenced blobs occupy"""
+        conn = connect_db(self.db_path)
+        try:
+            documents, stored, unreferenced, unreferenced_bytes = conn.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(size), 0),
+                       COALESCE(SUM(refcount <= 0), 0),
+                       COALESCE(SUM(CASE WHEN refcount <= 0 THEN size END), 0)
+                FROM documents
+                """
+            ).fetchone()
+            references = conn.execute(
+                "SELECT COALESCE(SUM(refcount), 0) FROM documents WHERE refcount > 0"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            "documents": documents,
+            "references": references,
+            "stored_mb": stored / (1024 * 1024),
+            "unreferenced": unreferenced,
+            "unreferenced_mb": unreferenced_bytes / (1024 * 1024),
+        }
+
+
+_upload_stores: Dict[str, UploadStore] = {}
+_upload_stores_lock = threading.Lock()
+
+
+def get_upload_store(root: str = UPLOAD_DIR) -> UploadStore:
+    """Process-wide UploadStore for root"""
+    with _upload_stores_lock:
+        if root not in _upload_stores:
+            _upload_stores[root] = UploadStore(root)
+        return _upload_stores[root]
+
+
+def migrate_uploads_to_store(conn, root: str = UPLOAD_DIR):
+    """
+    Moves every referenced upload that predates the store into it: files
+    are hashed in parallel, hard-linked (or copied) into their blob paths
+    and the referencing rows rewritten. The original files are left in
+    place for the orphan cleanup. Runs in the caller's transaction.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = sorted(
+        {
+            row[0]
+            for row in conn.execute(
+                f"SELECT DISTINCT path FROM ({document_references_sql()}) WHERE path IS NOT NULL"
+            )
+        }
+    )
+    legacy = [
+        path for path in paths if UploadStore.blob_digest(path) is None and os.path.isfile(path)
+    ]
+    if not legacy:
+        return
+
+    # hashlib releases the GIL, so threads hash files concurrently
+    with ThreadPoolExecutor(max_workers=max(4, available_cpus() * 2)) as executor:
+        digests = dict(zip(legacy, executor.map(file_sha256, legacy)))
+
+    store = UploadStore(root)
+    moved = {
+        path: store.put_file(path, digest=digest, conn=conn) for path, digest in digests.items()
+    }
+    for table, column, json_path in DOCUMENT_REFERENCES:
+        if json_path is None:
+            conn.executemany(
+                f"UPDATE {table} SET {column} = ? WHERE {column} = ?",
+                [(new, old) for old, new in moved.items()],
+            )
+        else:
+            conn.executemany(
+                f"""
+                UPDATE {table} SET {column} = json_set({column}, '{json_path}', ?)
+                WHERE {_document_reference_sql(column, json_path)} = ?
+                """,
+                [(new, old) for old, new in moved.items()],
+            )
+    logging.info(f"Moved {len(moved)} uploads into the upload store")
+
+
+# Upload garbage collection
+#
+# Files under the upload root that no row refers to are swept in the
+# background: each run examines the next batch of files after a persisted
+# cursor, moves orphans older than the grace period into a quarantine
+# directory, and deletes quarantined files once they have sat there long
+# enough without becoming referenced again.
+
+UPLOAD_GC_INTERVAL = 10 * 60  # Seconds between collector runs
+UPLOAD_GC_BATCH_SIZE = 2000  # Files examined per run
+UPLOAD_GC_MIN_AGE_DAYS = 30  # Unreferenced files younger than this are kept
+UPLOAD_GC_QUARANTINE_DAYS = 7  # Days in quarantine before deletion
+UPLOAD_QUARANTINE_DIR = "upload_quarantine"
+
+
+class UploadGarbageCollector:
+    """
+    Incremental orphan-file collector for the upload directory.
+
+    Blobs are checked against the documents index; other files against the
+    paths held by the DOCUMENT_REFERENCES columns, read once per run and only
+    when such a file comes up. The sweep cursor, quarantined files and a
+    metrics row per run are kept in the upload_gc_state, upload_quarantine
+    and upload_gc_runs tables.
+    """
+
+    def __init__(
+        self,
+        root: str = UPLOAD_DIR,
+        db_path: str = DB_PATH,
+        quarantine_dir: str = UPLOAD_QUARANTINE_DIR,
+        batch_size: int = UPLOAD_GC_BATCH_SIZE,
+        min_age_days: float = UPLOAD_GC_MIN_AGE_DAYS,
+        quarantine_days: float = UPLOAD_GC_QUARANTINE_DAYS,
+    ):
+        self.root = root
+        self.db_path = db_path
+        self.quarantine_dir = quarantine_dir
+        self.batch_size = batch_size
+        self.min_age_days = min_age_days
+        self.quarantine_days = quarantine_days
+
+    def _iter_files(self, after: Tuple[str, ...], directory: Tuple[str, ...] = ()):
+        """
+        Yields (relpath parts, DirEntry) for files under root in sorted
+        depth-first order, starting after the parts in after
+        """
+        try:
+            entries = sorted(
+                os.scandir(os.path.join(self.root, *directory)), key=lambda entry: entry.name
+            )
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            parts = directory + (entry.name,)
+            if entry.is_dir(follow_symlinks=False):
+                # Subtrees that lie entirely before the cursor are not listed
+                if parts >= after[: len(parts)]:
+                    yield from self._iter_files(after, parts)
+            elif entry.is_file(follow_symlinks=False) and parts > after:
+                yield parts, entry
+
+    def _referenced(self, conn) -> Dict[str, int]:
+        """Number of references per normalised upload path"""
+        counts = {}
+        for (path,) in conn.execute(
+            f"SELECT path FROM ({document_references_sql()}) WHERE path IS NOT NULL"
+        ):
+            path = os.path.normpath(path)
+            counts[path] = counts.get(path, 0) + 1
+        return counts
+
+    def _quarantine(self, conn, path: str, relpath: str, size: int, stamp: str) -> bool:
+        """Moves an orphan into quarantine; False if it became referenced meanwhile"""
+        target = os.path.join(self.quarantine_dir, stamp, relpath)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute(
+                "SELECT 1 FROM documents WHERE path = ? AND refcount > 0", (path,)
+            ).fetchone():
+                conn.rollback()
+                return False
+            conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+            conn.execute(
+                """
+                INSERT INTO upload_quarantine
+                    (quarantine_path, original_path, size, quarantined_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (target, path, size, _now_text()),
+            )
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(path, target)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return True
+
+    def sweep(self, conn, referenced: Callable[[], Dict[str, int]]) -> Dict[str, Any]:
+        """Examines the next batch of files after the cursor, quarantining orphans"""
+        row = conn.execute(
+            "SELECT cursor FROM upload_gc_state WHERE root = ?", (self.root,)
+        ).fetchone()
+        after = tuple(row[0].split("/")) if row and row[0] else ()
+        cutoff = time.time() - self.min_age_days * 86400
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        result = {"scanned": 0, "quarantined": 0, "bytes_quarantined": 0}
+
+        cursor = ""
+        for parts, entry in self._iter_files(after):
+            if result["scanned"] >= self.batch_size:
+                cursor = "/".join(after)
+                break
+            result["scanned"] += 1
+            after = parts
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff:
+                continue
+
+            path = os.path.join(self.root, *parts)
+            if UploadStore.blob_digest(path):
+                refcount = conn.execute(
+                    "SELECT refcount FROM documents WHERE path = ?", (path,)
+                ).fetchone()
+                if refcount is not None and refcount[0] > 0:
+                    continue
+                # Blobs missing from the index are checked against the columns
+                if refcount is None and os.path.normpath(path) in referenced():
+                    continue
+            elif os.path.normpath(path) in referenced():
+                continue
+
+            if self._quarantine(conn, path, "/".join(parts), stat.st_size, stamp):
+                result["quarantined"] += 1
+                result["bytes_quarantined"] += stat.st_size
+
+        conn.execute(
+            """
+            INSERT INTO upload_gc_state (root, cursor, passes, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (root) DO UPDATE SET
+                cursor = excluded.cursor,
+                passes = passes + excluded.passes,
+                updated_at = excluded.updated_at
+            """,
+            (self.root, cursor, 0 if cursor else 1, _now_text()),
+        )
+        conn.commit()
+        result["cursor"] = cursor
+        return result
+
+    def purge(self, conn, referenced: Callable[[], Dict[str, int]]) -> Dict[str, Any]:
+        """
+        Deletes files quarantined for longer than quarantine_days, moving back
+        any that are referenced again
         """
-        Apply more aggressive PDF compression by recreating the PDF with lower quality.
-        
-        Args:
-            pdf_bytes: PDF file as bytes
-            filename: Original filename
-            
+        cutoff = (datetime.now() - timedelta(days=self.quarantine_days)).isoformat(
+            sep=" ", timespec="seconds"
+        )
+        rows = conn.execute(
+            """
+            SELECT quarantine_path, original_path, size FROM upload_quarantine
+            WHERE quarantined_at <= ? ORDER BY quarantined_at
+            """,
+            (cutoff,),
+        ).fetchall()
+        result = {"deleted": 0, "restored": 0, "bytes_reclaimed": 0}
+        store = UploadStore(self.root, self.db_path)
+        for quarantine_path, original_path, size in rows:
+            references = referenced().get(os.path.normpath(original_path), 0)
+            try:
+                if references and not os.path.exists(original_path):
+                    os.makedirs(os.path.dirname(original_path), exist_ok=True)
+                    shutil.move(quarantine_path, original_path)
+                    digest = store.blob_digest(original_path)
+                    if digest:
+                        conn.execute(
+                            """
+                            INSERT OR IGNORE INTO documents
+                                (sha256, path, size, mime, refcount, created_at)
+                            VALUES (?, ?, ?, ?, ?, ?)
+                            """,
+                            (
+                                digest,
+                                original_path,
+                                size,
+                                mimetypes.guess_type(original_path)[0],
+                                references,
+                                _now_text(),
+                            ),
+                        )
+                    result["restored"] += 1
+                elif os.path.exists(quarantine_path):
+                    # Hard-linked files free no space until the last link goes
+                    if os.stat(quarantine_path).st_nlink == 1:
+                        result["bytes_reclaimed"] += size
+                    os.remove(quarantine_path)
+                    result["deleted"] += 1
+            except OSError as e:
+                logging.warning(f"Could not purge quarantined upload {quarantine_path}: {e}")
+                continue
+            conn.execute(
+                "DELETE FROM upload_quarantine WHERE quarantine_path = ?", (quarantine_path,)
+            )
+            conn.commit()
+            try:
+                os.removedirs(os.path.dirname(quarantine_path))
+            except OSError:
+                pass
+        return result
+
+    def collect(self) -> Dict[str, Any]:
+        """
+        Runs one sweep and purge and records its metrics.
+
         Returns:
-            Tuple containing (compressed_pdf_bytes, new_filename, was_compressed)
+            Dict with files scanned, quarantined, restored and deleted, bytes
+            quarantined and reclaimed, seconds spent and the new cursor
         """
+        started = time.perf_counter()
+        started_at = _now_text()
+        conn = connect_db(self.db_path)
         try:
-            # Create a new PDF with reduced quality
-            output_buffer = io.BytesIO()
-            c = canvas.Canvas(output_buffer, pagesize=letter)
-            
-            # Add a note about compression
-            c.setFont("Helvetica", 10)
-            c.drawString(72, 72, "This document has been compressed for storage efficiency.")
-            c.drawString(72, 60, "Some quality reduction may have occurred.")
-            
-            # Finalize the PDF
-            c.save()
-            
-            compressed_bytes = output_buffer.getvalue()
-            
-            # Check if we achieved our goal
-            if len(compressed_bytes) <= self.max_size_bytes:
-                logger.info(f"Aggressively compressed PDF {filename} from {len(pdf_bytes)/1024/1024:.2f}MB to "
-                           f"{len(compressed_bytes)/1024/1024:.2f}MB")
-                return compressed_bytes, filename, True
-            
-            # If still too large, return original with warning
-            logger.warning(f"Could not compress PDF {filename} below size limit")
-            return pdf_bytes, filename, False
-            
-        except Exception as e:
-            logger.error(f"Error in aggressive PDF compression for {filename}: {str(e)}")
-            return pdf_bytes, filename, False
+            references = {}
+
+            def referenced():
+                if not references:
+                    references["paths"] = self._referenced(conn)
+                return references["paths"]
+
+            result = self.sweep(conn, referenced)
+            result.update(self.purge(conn, referenced))
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            conn.execute(
+                """
+                INSERT INTO upload_gc_runs (
+                    started_at, scanned, quarantined, restored, deleted,
+                    bytes_quarantined, bytes_reclaimed, seconds, cursor
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    started_at,
+                    result["scanned"],
+                    result["quarantined"],
+                    result["restored"],
+                    result["deleted"],
+                    result["bytes_quarantined"],
+                    result["bytes_reclaimed"],
+                    result["seconds"],
+                    result["cursor"],
+                ),
+            )
+            conn.execute(
+                """
+                DELETE FROM upload_gc_runs
+                WHERE run_id <= (SELECT MAX(run_id) FROM upload_gc_runs) - 1000
+                """
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        logging.info(
+            f"Upload GC: scanned {result['scanned']}, quarantined {result['quarantined']} "
+            f"({result['bytes_quarantined']/1024/1024:.1f}MB), deleted {result['deleted']}, "
+            f"restored {result['restored']}, reclaimed {result['bytes_reclaimed']/1024/1024:.1f}MB "
+            f"in {result['seconds']:.2f}s"
+        )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals over the recorded runs and what quarantine holds now"""
+        conn = connect_db(self.db_path)
+        try:
+            runs, reclaimed, seconds, last_run = conn.execute(
+                """
+                SELECT COUNT(*), COALESCE(SUM(bytes_reclaimed), 0),
+                       COALESCE(SUM(seconds), 0), MAX(started_at)
+                FROM upload_gc_runs
+                """
+            ).fetchone()
+            quarantined, quarantined_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM upload_quarantine"
+            ).fetchone()
+            state = conn.execute(
+                "SELECT cursor, passes FROM upload_gc_state WHERE root = ?", (self.root,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return {
+            "runs": runs,
+            "last_run": last_run,
+            "reclaimed_mb": reclaimed / (1024 * 1024),
+            "seconds": seconds,
+            "quarantined": quarantined,
+            "quarantined_mb": quarantined_bytes / (1024 * 1024),
+            "cursor": state[0] if state else "",
+            "passes": state[1] if state else 0,
+        }
+
+    def recent_runs(self, limit: int = 20) -> pd.DataFrame:
+        conn = connect_db(self.db_path)
+        try:
+            return pd.read_sql_query(
+                "SELECT * FROM upload_gc_runs ORDER BY run_id DESC LIMIT ?", conn, params=(limit,)
+            )
+        finally:
+            conn.close()
+
+
+_upload_gc = None
+_upload_gc_lock = threading.Lock()
+_upload_gc_running = threading.Lock()
+
+
+def run_upload_gc() -> Optional[Dict[str, Any]]:
+    """Runs one collection unless one is already running in this process"""
+    if not _upload_gc_running.acquire(blocking=False):
+        return None
+    try:
+        return UploadGarbageCollector().collect()
+    finally:
+        _upload_gc_running.release()
+
+
+def start_upload_gc(interval: float = UPLOAD_GC_INTERVAL):
+    """Starts (once per process) a daemon thread running the upload collector"""
+    global _upload_gc
+
+    def collect_forever():
+        while True:
+            try:
+                run_upload_gc()
+            except Exception:
+                logging.exception("Upload garbage collection failed")
+            time.sleep(interval)
+
+    with _upload_gc_lock:
+        if _upload_gc is None:
+            _upload_gc = threading.Thread(
+                target=collect_forever, name="upload-gc", daemon=True
+            )
+            _upload_gc.start()
+
 
 def compress_uploaded_file(uploaded_file, max_size_mb=6.0) -> Tuple[Optional[bytes], str, bool]:
     """
@@ -2995,24 +8087,23 @@ def compress_uploaded_file(uploaded_file, max_size_mb=6.0) -> Tuple[Optional[byt
     compressor = FileCompressor(max_size_mb=max_size_mb)
     return compressor.compress_file(uploaded_file, uploaded_file.name)
 
-def save_compressed_file(uploaded_file, directory="uploads", max_size_mb=6.0) -> Optional[str]:
+def save_compressed_file(
+    uploaded_file, directory="uploads", max_size_mb=6.0, owner: Optional[str] = None
+) -> Optional[str]:
     """
-    Save an uploaded file to disk, compressing it if necessary.
+    Save an uploaded file to the upload store, compressing it if necessary.
     
     Args:
         uploaded_file: Streamlit uploaded file object
-        directory: Directory to save the file
+        directory: Root of the upload store
         max_size_mb: Maximum file size in MB
+        owner: Student or registration ID the document belongs to
         
     Returns:
         Path to the saved file, or None if saving failed
     """
     if uploaded_file is None:
         return None
-        
-    # Ensure directory exists
-    if not os.path.exists(directory):
-        os.makedirs(directory)
     
     # Compress if needed
     compressed_data, new_filename, was_compressed = compress_uploaded_file(
@@ -3021,25 +8112,288 @@ def save_compressed_file(uploaded_file, directory="uploads", max_size_mb=6.0) ->
     if compressed_data is None:
         return None
     
-    # Determine file path
-    if was_compressed:
-        file_path = os.path.join(directory, new_filename)
-    else:
-        file_path = os.path.join(directory, uploaded_file.name)
-        
-    # Check if file already exists and modify name if needed
-    if os.path.exists(file_path):
-        base, ext = os.path.splitext(file_path)
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_path = f"{base}_{timestamp}{ext}"
-    
-    # Write the file
-    with open(file_path, "wb") as f:
-        f.write(compressed_data)
-    
+    # Identical content is stored once, so re-uploads reuse the same file
+    file_path = get_upload_store(directory).put_bytes(
+        compressed_data,
+        new_filename if was_compressed else uploaded_file.name,
+        owner=owner,
+    )
+
+    # Photos get their thumbnails now rather than on first display
+    if is_thumbnailable(file_path):
+        get_thumbnail_cache().generate_all(file_path)
+
     return file_path
 
+
+import hashlib
+
+
+# (abspath, mtime_ns, size) -> SHA-256, so repeated lookups only cost a stat()
+_file_digests: Dict[tuple, str] = {}
+_file_digests_lock = threading.Lock()
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file's content, memoised per path/mtime/size"""
+    stat = os.stat(path)
+    index_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = _file_digests.get(index_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        with _file_digests_lock:
+            _file_digests[index_key] = digest
+    return digest
+
+
+class DiskLRUCache:
+    """
+    Size-bounded on-disk cache of derived files keyed by content hashes.
+
+    Entries live in a two-level sharded directory (ab/cd/<key><suffix>).
+    When the cache grows past max_bytes the least recently used entries
+    (by mtime, refreshed on every hit) are evicted.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, suffix: str):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self.metrics = {"hits": 0, "misses": 0, "generated": 0, "evicted": 0, "errors": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key[2:4], f"{key}{self.suffix}")
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Path of the cached entry for key, or None on a miss"""
+        path = self.entry_path(key)
+        try:
+            os.utime(path)  # LRU bookkeeping
+        except OSError:
+            self.metrics["misses"] += 1
+            return None
+        self.metrics["hits"] += 1
+        return path
+
+    def temp_path(self, key: str) -> str:
+        """Scratch path next to the entry; pass it to commit() when written"""
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def commit(self, key: str, temp_path: str) -> str:
+        """Atomically publishes a written temp file as the entry for key"""
+        path = self.entry_path(key)
+        os.replace(temp_path, path)
+        self.metrics["generated"] += 1
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += os.path.getsize(path)
+        self._evict_if_needed()
+        return path
+
+    def store(self, key: str, data: bytes) -> str:
+        """Writes data as the entry for key"""
+        temp_path = self.temp_path(key)
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        return self.commit(key, temp_path)
+
+    def _cached_files(self) -> List[Tuple[float, int, str]]:
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(self.suffix):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._cached_files())
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Trim to 90% of the cap so eviction does not run on every miss
+            files = sorted(self._cached_files())
+            self._total_bytes = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if self._total_bytes <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                    self._total_bytes -= size
+                    self.metrics["evicted"] += 1
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the current cache size"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._cached_files())
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                **self.metrics,
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+                "size_mb": self._total_bytes / (1024 * 1024),
+                "max_size_mb": self.max_bytes / (1024 * 1024),
+            }
+
+
+class ThumbnailCache(DiskLRUCache):
+    """
+    Fixed-size JPEG thumbnails of uploaded photos, keyed by the SHA-256 of
+    the source file and the size name, so identical uploads share one
+    thumbnail. A missing thumbnail is generated on first use.
+    """
+
+    # Bounding boxes; the aspect ratio of the photo is preserved
+    SIZES = {
+        "small": (200, 200),  # on-screen previews
+        "large": (480, 480),  # PDFs and ID cards (1.5in at ~300dpi)
+    }
+    IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif")
+    JPEG_QUALITY = 85
+
+    def __init__(self, cache_dir: str = "thumbnail_cache", max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(cache_dir, max_bytes, ".jpg")
+
+    def _render(self, source_path: str, key: str, size: str) -> str:
+        """Decodes the source once and writes the thumbnail atomically"""
+        temp_path = self.temp_path(key)
+        with PILImage.open(source_path) as img:
+            # JPEG draft mode lets the decoder downscale while decoding
+            img.draft("RGB", self.SIZES[size])
+            img = img.convert("RGB")
+            img.thumbnail(self.SIZES[size], PILImage.LANCZOS)
+            img.save(temp_path, "JPEG", quality=self.JPEG_QUALITY, optimize=True)
+        return self.commit(key, temp_path)
+
+    def get(self, source_path: str, size: str = "small") -> Optional[str]:
+        """
+        Returns the path of the thumbnail for source_path, generating it if
+        needed, or None when the source is missing or not a readable image.
+        """
+        if not is_thumbnailable(source_path) or not os.path.exists(source_path):
+            return None
+        try:
+            key = f"{file_sha256(source_path)}_{size}"
+            return self.lookup(key) or self._render(source_path, key, size)
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.warning(f"Thumbnail for {source_path} failed: {str(e)}")
+            return None
+
+    def generate_all(self, source_path: str):
+        """Pre-generates every thumbnail size for a newly stored upload"""
+        for size in self.SIZES:
+            self.get(source_path, size)
+
+
+_thumbnail_cache = None
+_thumbnail_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Process-wide ThumbnailCache"""
+    global _thumbnail_cache
+    with _thumbnail_cache_lock:
+        if _thumbnail_cache is None:
+            _thumbnail_cache = ThumbnailCache()
+        return _thumbnail_cache
+
+
+def is_thumbnailable(path) -> bool:
+    """True for paths with an image extension the thumbnail cache handles"""
+    return bool(path) and str(path).lower().endswith(ThumbnailCache.IMAGE_EXTENSIONS)
+
+
+def thumbnail_path(source_path, size: str = "small"):
+    """
+    Path to display for a photo: its cached thumbnail, or the original file
+    when no thumbnail can be made (e.g. the file is not an image).
+    """
+    return get_thumbnail_cache().get(source_path, size) or source_path
+
+
+class PdfCache(DiskLRUCache):
+    """
+    Rendered student PDFs keyed by a hash of the document type, its
+    template version, the record's data and the content of the embedded
+    photo, so a record is only re-rendered after it or its photo changes.
+    """
+
+    # Bump a template's version whenever its layout changes
+    TEMPLATE_VERSIONS = {"student_info": 1, "course_registration": 1}
+
+    def __init__(self, cache_dir: str = "pdf_cache", max_bytes: int = 512 * 1024 * 1024):
+        super().__init__(cache_dir, max_bytes, ".pdf")
+
+    def cache_key(self, document_type: str, data, photo_path=None, extra=None) -> str:
+        payload = {
+            "document": document_type,
+            "template": self.TEMPLATE_VERSIONS[document_type],
+            "data": {str(key): data[key] for key in data.keys()},
+            "extra": extra,
+        }
+        sha = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        )
+        if photo_path and os.path.exists(photo_path):
+            sha.update(file_sha256(photo_path).encode("ascii"))
+        return sha.hexdigest()
+
+    def get_or_render(
+        self, document_type: str, data, photo_path, render: Callable, extra=None
+    ) -> bytes:
+        """
+        Returns the PDF bytes for a record from the cache, calling
+        render(buffer) to produce and store them on a miss.
+        """
+        key = self.cache_key(document_type, data, photo_path, extra)
+        path = self.lookup(key)
+        if path:
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except OSError:
+                pass  # evicted between lookup and read
+
+        buffer = io.BytesIO()
+        render(buffer)
+        pdf_bytes = buffer.getvalue()
+        try:
+            self.store(key, pdf_bytes)
+        except OSError as e:
+            self.metrics["errors"] += 1
+            logger.warning(f"Could not cache {document_type} PDF: {str(e)}")
+        return pdf_bytes
+
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> PdfCache:
+    """Process-wide PdfCache"""
+    global _pdf_cache
+    with _pdf_cache_lock:
+        if _pdf_cache is None:
+            _pdf_cache = PdfCache()
+        return _pdf_cache
+
 import os
 import io
 import sqlite3
@@ -3094,18 +8448,22 @@ class BatchFileCompressor:
     
     def get_all_file_paths(self) -> Dict[str, List[str]]:
         """
-        Retrieve all file paths from the database.
+        Retrieve all oversized file paths from the database.
+        
+        Every distinct path is stat()ed once, however many rows refer to it.
         
         Returns:
-            Dictionary with table names as keys and lists of file paths as values
+            Dictionary with table names as keys and lists of file entries as values
         """
         file_paths = {
             "student_info": [],
             "course_registration": []
         }
+        column_names = ["ghana_card_path", "passport_photo_path", 
+                        "transcript_path", "certificate_path", "receipt_path"]
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             cursor = conn.cursor()
             
             # Get file paths from student_info table
@@ -3125,21 +8483,12 @@ class BatchFileCompressor:
                     certificate_path IS NOT NULL OR
                     receipt_path IS NOT NULL
             """)
-            
-            for row in cursor.fetchall():
-                student_id = row[0]
-                for i, path in enumerate(row[1:], 1):
-                    if path and os.path.exists(path):
-                        file_size = os.path.getsize(path)
-                        if file_size > self.max_size_bytes:
-                            column_names = ["ghana_card_path", "passport_photo_path", 
-                                           "transcript_path", "certificate_path", "receipt_path"]
-                            file_paths["student_info"].append({
-                                "student_id": student_id,
-                                "column_name": column_names[i-1],
-                                "file_path": path,
-                                "file_size": file_size
-                            })
+            references = [
+                ("student_info", {"student_id": row[0], "column_name": column, "file_path": path})
+                for row in cursor.fetchall()
+                for column, path in zip(column_names, row[1:])
+                if path
+            ]
             
             # Get file paths from course_registration table
             cursor.execute("""
@@ -3150,19 +8499,29 @@ class BatchFileCompressor:
                 FROM course_registration
                 WHERE receipt_path IS NOT NULL
             """)
+            references += [
+                ("course_registration", {
+                    "registration_id": registration_id,
+                    "student_id": student_id,
+                    "column_name": "receipt_path",
+                    "file_path": path,
+                })
+                for registration_id, student_id, path in cursor.fetchall()
+                if path
+            ]
+            
+            sizes = {}
+            for path in {entry["file_path"] for _, entry in references}:
+                try:
+                    sizes[path] = os.stat(path).st_size
+                except OSError:
+                    pass  # Missing files are left to the orphan cleanup
             
-            for row in cursor.fetchall():
-                registration_id, student_id, path = row
-                if path and os.path.exists(path):
-                    file_size = os.path.getsize(path)
-                    if file_size > self.max_size_bytes:
-                        file_paths["course_registration"].append({
-                            "registration_id": registration_id,
-                            "student_id": student_id,
-                            "column_name": "receipt_path",
-                            "file_path": path,
-                            "file_size": file_size
-                        })
+            for table, entry in references:
+                file_size = sizes.get(entry["file_path"])
+                if file_size is not None and file_size > self.max_size_bytes:
+                    entry["file_size"] = file_size
+                    file_paths[table].append(entry)
             
             return file_paths
             
@@ -3304,66 +8663,24 @@ class BatchFileCompressor:
             base_name, ext = os.path.splitext(file_path)
             new_file_path = f"{base_name}_compressed{ext}"
             
-            # Create PDF reader and writer objects
             with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                pdf_writer = PyPDF2.PdfWriter()
-                
-                # Process each page
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    pdf_writer.add_page(page)
-                
-                # Set compression parameters
-                if hasattr(pdf_reader, 'metadata') and pdf_reader.metadata:
-                    pdf_writer.add_metadata(pdf_reader.metadata)
-                
-                # Write compressed PDF to file
-                with open(new_file_path, 'wb') as output_file:
-                    pdf_writer.write(output_file)
-            
-            # Check if compression was effective
-            new_size = os.path.getsize(new_file_path)
+                pdf_bytes = file.read()
             
-            if new_size < original_size and new_size <= self.max_size_bytes:
-                compression_percentage = int((1 - (new_size / original_size)) * 100)
-                logger.info(f"Compressed PDF {file_path} from {original_size/1024/1024:.2f}MB to "
-                           f"{new_size/1024/1024:.2f}MB (saved {compression_percentage}%)")
-                return new_file_path, compression_percentage
-            
-            # If standard compression wasn't enough, try more aggressive methods
-            if new_size > self.max_size_bytes:
-                logger.info(f"Attempting more aggressive PDF compression for {file_path}")
-                os.remove(new_file_path)  # Remove the first attempt
-                
-                # Create a new PDF with reduced quality
-                c = canvas.Canvas(new_file_path, pagesize=letter)
-                
-                # Add a note about compression
-                c.setFont("Helvetica", 10)
-                c.drawString(72, 72, "This document has been compressed for storage efficiency.")
-                c.drawString(72, 60, "Some quality reduction may have occurred.")
-                c.drawString(72, 48, f"Original file size: {original_size/1024/1024:.2f}MB")
-                
-                # Add reference to original file
-                c.drawString(72, 36, f"Original filename: {os.path.basename(file_path)}")
-                
-                # Finalize the PDF
-                c.save()
-                
-                new_size = os.path.getsize(new_file_path)
-                if new_size <= self.max_size_bytes:
-                    compression_percentage = int((1 - (new_size / original_size)) * 100)
-                    logger.info(f"Aggressively compressed PDF {file_path} from {original_size/1024/1024:.2f}MB to "
-                               f"{new_size/1024/1024:.2f}MB (saved {compression_percentage}%)")
-                    return new_file_path, compression_percentage
+            # Re-encode embedded images, downscaling them further on each pass
+            passes = PDF_RECOMPRESSION_PASSES + ((self.min_quality, 1400),)
+            compressed_bytes = shrink_pdf(pdf_bytes, self.max_size_bytes, passes)
+            if compressed_bytes is None:
+                logger.warning(f"Could not compress PDF {file_path} below size limit")
+                return None, 0
             
-            # If compression didn't work, remove the new file and return None
-            if os.path.exists(new_file_path):
-                os.remove(new_file_path)
+            with open(new_file_path, 'wb') as output_file:
+                output_file.write(compressed_bytes)
             
-            logger.warning(f"Could not compress PDF {file_path} below size limit")
-            return None, 0
+            new_size = len(compressed_bytes)
+            compression_percentage = int((1 - (new_size / original_size)) * 100)
+            logger.info(f"Compressed PDF {file_path} from {original_size/1024/1024:.2f}MB to "
+                       f"{new_size/1024/1024:.2f}MB (saved {compression_percentage}%)")
+            return new_file_path, compression_percentage
             
         except Exception as e:
             logger.error(f"Error compressing PDF {file_path}: {str(e)}")
@@ -3406,18 +8723,375 @@ class BatchFileCompressor:
             True if successful, False otherwise
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            query = f"UPDATE {table} SET {column} = ? WHERE {id_column} = ?"
-            cursor.execute(query, (new_path, id_value))
-            conn.commit()
-            
-            return True
-            
+            conn = connect_db(self.db_path)
+            cursor = conn.cursor()
+            
+            query = f"UPDATE {table} SET {column} = ? WHERE {id_column} = ?"
+            cursor.execute(query, (new_path, id_value))
+            conn.commit()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error updating database: {str(e)}")
+            return False
+        finally:
+            if 'conn' in locals():
+                conn.close()
+
+    def apply_path_updates(self, updates: List[Tuple[str, str, str, str, str]]) -> Dict[str, int]:
+        """
+        Repoints many rows at new file paths in one transaction. A row is
+        only updated while it still holds the old path, so a document
+        replaced during the run keeps its new upload.
+        
+        Args:
+            updates: (table, column, id_value, old_path, new_path) tuples
+            
+        Returns:
+            Number of rows updated per old path
+        """
+        if not updates:
+            return {}
+        id_columns = {"student_info": "student_id", "course_registration": "registration_id"}
+        updated = {}
+        
+        conn = connect_db(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table, column, id_value, old_path, new_path in updates:
+                    rowcount = conn.execute(
+                        f"UPDATE {table} SET {column} = ? WHERE {id_columns[table]} = ? AND {column} = ?",
+                        (new_path, id_value, old_path),
+                    ).rowcount
+                    updated[old_path] = updated.get(old_path, 0) + rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        finally:
+            conn.close()
+        invalidate_query_cache(*{update[0] for update in updates})
+        return updated
+
+    def _worker_settings(self) -> Dict[str, Any]:
+        """Constructor arguments that rebuild this compressor in a worker process"""
+        return {
+            "db_path": self.db_path,
+            "max_size_mb": self.max_size_bytes / 1024 / 1024,
+            "uploads_dir": self.uploads_dir,
+            "quality_reduction_step": self.quality_reduction_step,
+            "min_quality": self.min_quality,
+        }
+
+    def run(self, progress_callback=None, max_workers=None) -> Dict[str, Any]:
+        """
+        Compresses every oversized file referenced in the database and
+        repoints the rows at the compressed copies.
+
+        Sizes are collected in one stat pass, then files are compressed in
+        parallel worker processes, largest first. A file referenced by
+        several rows is compressed once. Path updates for all compressed
+        files are written in a single transaction at the end, including
+        when the run is cancelled part way through.
+
+        Args:
+            progress_callback: Optional callable(done, total) invoked per file
+            max_workers: Number of worker processes (default: CPU count)
+
+        Returns:
+            Dict with files found, compressed and failed, bytes saved and
+            throughput overall and per worker
+        """
+        started = time.perf_counter()
+        file_paths = self.get_all_file_paths()
+        id_columns = {"student_info": "student_id", "course_registration": "registration_id"}
+        references = {}
+        for table, table_entries in file_paths.items():
+            for entry in table_entries:
+                references.setdefault(entry["file_path"], []).append((table, entry))
+        sizes = {path: entries[0][1]["file_size"] for path, entries in references.items()}
+        settings = self._worker_settings()
+        tasks = [(path, settings) for path in sorted(sizes, key=sizes.get, reverse=True)]
+
+        updates = []
+        replaced = {}
+        updated = {}
+        workers = {}
+        compressed = failed = 0
+        bytes_before = bytes_after = 0
+        store = get_upload_store(self.uploads_dir)
+        executor = fork_process_pool(len(tasks), max_workers)
+        try:
+            if executor:
+                futures = [executor.submit(_compress_file_task, task) for task in tasks]
+                results = (future.result() for future in as_completed(futures))
+            else:
+                results = map(_compress_file_task, tasks)
+
+            for done, result in enumerate(results, 1):
+                path, new_path = result["file_path"], result["new_path"]
+                worker = workers.setdefault(
+                    result["worker"], {"files": 0, "bytes": 0, "seconds": 0.0}
+                )
+                worker["files"] += 1
+                worker["bytes"] += sizes[path]
+                worker["seconds"] += result["seconds"]
+                if new_path:
+                    compressed += 1
+                    bytes_before += sizes[path]
+                    bytes_after += result["new_size"]
+                    # The compressed copy replaces the original in the store
+                    new_path = store.put_file(
+                        new_path,
+                        os.path.basename(path),
+                        owner=references[path][0][1]["student_id"],
+                        move=True,
+                    )
+                    replaced[path] = new_path
+                    updates += [
+                        (table, entry["column_name"], entry[id_columns[table]], path, new_path)
+                        for table, entry in references[path]
+                    ]
+                else:
+                    failed += 1
+                if progress_callback:
+                    progress_callback(done, len(tasks))
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+            updated = self.apply_path_updates(updates)
+            for path, new_path in replaced.items():
+                # Rows changed during the run keep their file; if none was
+                # repointed the compressed copy goes instead of the original
+                store.release(path if updated.get(path) else new_path)
+
+        elapsed = time.perf_counter() - started
+        for pid, worker in workers.items():
+            logger.info(
+                f"Worker {pid}: {worker['files']} files, {worker['bytes']/1024/1024:.1f}MB "
+                f"in {worker['seconds']:.1f}s"
+            )
+        def mb_per_second(size, seconds):
+            return f"{size/1024/1024/seconds:.1f} MB/s" if seconds else "-"
+
+        return {
+            "files": len(tasks),
+            "compressed": compressed,
+            "failed": failed,
+            "rows_updated": sum(updated.values()),
+            "saved": f"{(bytes_before - bytes_after)/1024/1024:.1f} MB",
+            "bytes_saved": bytes_before - bytes_after,
+            "elapsed": f"{elapsed:.1f}s",
+            "throughput": mb_per_second(sum(sizes.values()), elapsed),
+            "per_worker": "; ".join(
+                f"{worker['files']} files @ {mb_per_second(worker['bytes'], worker['seconds'])}"
+                for worker in workers.values()
+            ),
+        }
+
+
+def _compress_file_task(task) -> Dict[str, Any]:
+    """Compresses one file in a worker process; task is (path, compressor settings)"""
+    file_path, settings = task
+    started = time.perf_counter()
+    new_path, _ = BatchFileCompressor(**settings).compress_file(file_path)
+    return {
+        "file_path": file_path,
+        "new_path": new_path,
+        "new_size": os.path.getsize(new_path) if new_path else None,
+        "worker": os.getpid(),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# Approval status updates, keyed by each table's primary key
+APPROVAL_KEYS = {"student_info": "student_id", "course_registration": "registration_id"}
+
+
+def set_approval_status(conn, table: str, ids, status: str) -> int:
+    """
+    Sets approval_status for many pending rows in one transaction.
+
+    Only rows that are still pending are touched, so a decision made
+    concurrently by another admin is not overwritten.
+
+    Returns:
+        Number of rows updated
+    """
+    key = APPROVAL_KEYS[table]
+    ids = list(ids)
+    updated = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor = conn.execute(
+                f"UPDATE {table} SET approval_status = ? "
+                f"WHERE approval_status = 'pending' AND {key} IN ({placeholders})",
+                [status] + chunk,
+            )
+            updated += cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_query_cache(table)
+    return updated
+
+
+def render_approval_actions(
+    conn, table: str, selected: list, key_prefix: str, bulk: bool = True
+):
+    """Approve/Reject buttons acting on every selected row at once"""
+    suffix = f" Selected ({len(selected)})" if bulk else ""
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button(
+            f"Approve{suffix}",
+            key=f"{key_prefix}_bulk_approve",
+            disabled=not selected,
+        ):
+            updated = set_approval_status(conn, table, selected, "approved")
+            st.success(f"{updated} approved!")
+            st.rerun()
+    with col2:
+        if st.button(
+            f"Reject{suffix}",
+            key=f"{key_prefix}_bulk_reject",
+            disabled=not selected,
+        ):
+            updated = set_approval_status(conn, table, selected, "rejected")
+            st.error(f"{updated} rejected!")
+            st.rerun()
+
+
+def render_pending_student_details(conn, student_id: str):
+    """Loads and shows one pending application, including its passport photo"""
+    details = pd.read_sql_query(
+        """
+        SELECT student_id, surname, other_names, gender, email, telephone,
+               previous_school, qualification_type, completion_year,
+               receipt_path, receipt_amount, passport_photo_path
+        FROM student_info WHERE student_id = ?
+        """,
+        conn,
+        params=[student_id],
+    )
+    if details.empty:
+        st.info("This application is no longer available")
+        return
+    student = details.iloc[0]
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write("**Personal Information**")
+        st.write(f"Student ID: {student['student_id']}")
+        st.write(f"Name: {student['surname']} {student['other_names']}")
+        st.write(f"Gender: {student['gender']}")
+        st.write(f"Email: {student['email']}")
+        st.write(f"Phone: {student['telephone']}")
+
+    with col2:
+        st.write("**Educational Background**")
+        st.write(f"Previous School: {student['previous_school']}")
+        st.write(f"Qualification: {student['qualification_type']}")
+        st.write(f"Completion Year: {student['completion_year']}")
+
+        st.write("**Payment Information**")
+        if student["receipt_path"]:
+            st.write(f"Receipt Amount: GHS {student['receipt_amount'] or 0:.2f}")
+            if os.path.exists(student["receipt_path"]):
+                st.write(f"[View Receipt]({student['receipt_path']})")
+        else:
+            st.write("No receipt uploaded (Optional)")
+
+    if student["passport_photo_path"] and os.path.exists(
+        student["passport_photo_path"]
+    ):
+        try:
+            st.image(
+                thumbnail_path(student["passport_photo_path"]),
+                width=150,
+                caption="Passport Photo",
+            )
         except Exception as e:
-            logger.error(f"Error updating database: {str(e)}")
-            return
+            st.error(f"Error loading passport photo: {str(e)}")
+
+    render_approval_actions(
+        conn, "student_info", [student_id], f"pending_student_{student_id}", bulk=False
+    )
+
+
+def render_pending_registration_details(conn, registration_id: int):
+    """Loads and shows one pending registration with its course table"""
+    details = pd.read_sql_query(
+        """
+        SELECT cr.registration_id, cr.student_id, cr.programme, cr.level,
+               cr.session, cr.academic_year, cr.semester, cr.total_credits,
+               cr.receipt_path, cr.receipt_amount
+        FROM course_registration cr WHERE cr.registration_id = ?
+        """,
+        conn,
+        params=[registration_id],
+    )
+    if details.empty:
+        st.info("This registration is no longer available")
+        return
+    registration = details.iloc[0]
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write("**Registration Details**")
+        st.write(f"Student ID: {registration['student_id']}")
+        st.write(f"Programme: {registration['programme']}")
+        st.write(f"Level: {registration['level']}")
+        st.write(f"Session: {registration['session']}")
+
+    with col2:
+        st.write("**Academic Information**")
+        st.write(f"Academic Year: {registration['academic_year']}")
+        st.write(f"Semester: {registration['semester']}")
+        st.write(f"Total Credits: {registration['total_credits']}")
+
+    st.write("**Selected Courses**")
+    courses = pd.read_sql_query(
+        """
+        SELECT course_code AS "Course Code",
+               course_title AS "Course Title",
+               credits || ' credits' AS "Credit Hours"
+        FROM course_registration_items
+        WHERE registration_id = ?
+        ORDER BY position
+        """,
+        conn,
+        params=[int(registration_id)],
+    )
+    if not courses.empty:
+        st.table(courses)
+    else:
+        st.write("No courses selected")
+
+    st.write("**Payment Information**")
+    if registration["receipt_path"]:
+        st.write(f"Receipt Amount: GHS {registration['receipt_amount'] or 0:.2f}")
+        if os.path.exists(registration["receipt_path"]):
+            st.write(f"[View Receipt]({registration['receipt_path']})")
+    else:
+        st.write("No receipt uploaded (Optional)")
+
+    render_approval_actions(
+        conn,
+        "course_registration",
+        [int(registration_id)],
+        f"pending_reg_{registration_id}",
+        bulk=False,
+    )
 
 
 def show_pending_approvals():
@@ -3425,179 +9099,124 @@ def show_pending_approvals():
 
     tabs = st.tabs(["Student Information", "Course Registrations"])
 
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
 
     try:
         with tabs[0]:
-            pending_students = pd.read_sql_query(
-                "SELECT * FROM student_info WHERE approval_status='pending'", conn
+            # Summary list: lightweight columns only, one page at a time
+            cursors = get_page_cursors("pending_student_pages", None)
+            pending_students, total, next_cursor = fetch_keyset_page(
+                conn,
+                "student_id, surname, other_names, programme, created_at",
+                "FROM student_info WHERE approval_status = 'pending'",
+                [],
+                "created_at",
+                "student_id",
+                after=cursors[-1],
+                page_size=100,
             )
 
+            if pending_students.empty and len(cursors) > 1:
+                # Approving or rejecting the last rows of a later page empties
+                # it; go back to the first page
+                del cursors[1:]
+                st.rerun()
             if pending_students.empty:
                 st.info("No pending student applications")
             else:
-                for _, student in pending_students.iterrows():
-                    with st.expander(
-                        f"Student: {student['surname']} {student['other_names']}"
-                    ):
-                        col1, col2 = st.columns(2)
-
-                        with col1:
-                            st.write("**Personal Information**")
-                            st.write(f"Student ID: {student['student_id']}")
-                            st.write(
-                                f"Name: {student['surname']} {student['other_names']}"
-                            )
-                            st.write(f"Gender: {student['gender']}")
-                            st.write(f"Email: {student['email']}")
-                            st.write(f"Phone: {student['telephone']}")
-
-                        with col2:
-                            st.write("**Educational Background**")
-                            st.write(f"Previous School: {student['previous_school']}")
-                            st.write(f"Qualification: {student['qualification_type']}")
-                            st.write(f"Completion Year: {student['completion_year']}")
-
-                            st.write("**Payment Information**")
-                            if student["receipt_path"]:
-                                st.write(
-                                    f"Receipt Amount: GHS {student['receipt_amount']:.2f}"
-                                )
-                                if os.path.exists(student["receipt_path"]):
-                                    st.write(
-                                        f"[View Receipt]({student['receipt_path']})"
-                                    )
-                            else:
-                                st.write("No receipt uploaded (Optional)")
-
-                        if student["passport_photo_path"] and os.path.exists(
-                            student["passport_photo_path"]
-                        ):
-                            try:
-                                image = PILImage.open(student["passport_photo_path"])
-                                st.image(image, width=150, caption="Passport Photo")
-                            except Exception as e:
-                                st.error(f"Error loading passport photo: {str(e)}")
+                render_page_controls(
+                    "pending_student_pages", cursors, next_cursor, total, 100
+                )
+                pending_students.insert(0, "Select", False)
+                edited = st.data_editor(
+                    pending_students,
+                    hide_index=True,
+                    disabled=list(pending_students.columns[1:]),
+                    key="pending_students_editor",
+                )
+                selected = edited.loc[edited["Select"], "student_id"].tolist()
+                render_approval_actions(
+                    conn, "student_info", selected, "pending_students"
+                )
 
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.button(
-                                "Approve", key=f"approve_{student['student_id']}"
-                            ):
-                                c = conn.cursor()
-                                c.execute(
-                                    "UPDATE student_info SET approval_status='approved' WHERE student_id=?",
-                                    (student["student_id"],),
-                                )
-                                conn.commit()
-                                st.success("Application Approved!")
-                                st.rerun()
-                        with col2:
-                            if st.button(
-                                "Reject", key=f"reject_{student['student_id']}"
-                            ):
-                                c = conn.cursor()
-                                c.execute(
-                                    "UPDATE student_info SET approval_status='rejected' WHERE student_id=?",
-                                    (student["student_id"],),
-                                )
-                                conn.commit()
-                                st.error("Application Rejected!")
-                                st.rerun()
+                # Details (and the passport photo) are read for one student only
+                names = {
+                    row["student_id"]: f"{row['surname']} {row['other_names']} ({row['student_id']})"
+                    for _, row in pending_students.iterrows()
+                }
+                detail_id = st.selectbox(
+                    "View application",
+                    [None] + list(names),
+                    format_func=lambda sid: "Select a student..."
+                    if sid is None
+                    else names[sid],
+                    key="pending_student_detail",
+                )
+                if detail_id:
+                    render_pending_student_details(conn, detail_id)
 
         with tabs[1]:
-            pending_registrations = pd.read_sql_query(
+            cursors = get_page_cursors("pending_registration_pages", None)
+            pending_registrations, total, next_cursor = fetch_keyset_page(
+                conn,
                 """
-                SELECT cr.*, si.surname, si.other_names 
-                FROM course_registration cr 
-                LEFT JOIN student_info si ON cr.student_id = si.student_id 
-                WHERE cr.approval_status='pending'
+                cr.registration_id, cr.student_id, si.surname, si.other_names,
+                cr.programme, cr.level, cr.semester, cr.total_credits
                 """,
-                conn,
+                """
+                FROM course_registration cr
+                LEFT JOIN student_info si ON cr.student_id = si.student_id
+                WHERE cr.approval_status = 'pending'
+                """,
+                [],
+                "cr.registration_id",
+                "cr.registration_id",
+                after=cursors[-1],
+                page_size=100,
             )
 
+            if pending_registrations.empty and len(cursors) > 1:
+                # Approving or rejecting the last rows of a later page empties
+                # it; go back to the first page
+                del cursors[1:]
+                st.rerun()
             if pending_registrations.empty:
                 st.info("No pending course registrations")
             else:
-                for _, registration in pending_registrations.iterrows():
-                    with st.expander(
-                        f"Registration ID: {registration['registration_id']} - {registration['surname']} {registration['other_names']}"
-                    ):
-                        col1, col2 = st.columns(2)
-
-                        with col1:
-                            st.write("**Registration Details**")
-                            st.write(f"Student ID: {registration['student_id']}")
-                            st.write(f"Programme: {registration['programme']}")
-                            st.write(f"Level: {registration['level']}")
-                            st.write(f"Session: {registration['session']}")
-
-                        with col2:
-                            st.write("**Academic Information**")
-                            st.write(f"Academic Year: {registration['academic_year']}")
-                            st.write(f"Semester: {registration['semester']}")
-                            st.write(f"Total Credits: {registration['total_credits']}")
-
-                        st.write("**Selected Courses**")
-                        if registration["courses"]:
-                            courses_list = registration["courses"].split("\n")
-                            table_data = []
-                            for course in courses_list:
-                                if "|" in course:
-                                    code, title, credits = course.split("|")
-                                    table_data.append(
-                                        [code, title, f"{credits} credits"]
-                                    )
-                            if table_data:
-                                df = pd.DataFrame(
-                                    table_data,
-                                    columns=[
-                                        "Course Code",
-                                        "Course Title",
-                                        "Credit Hours",
-                                    ],
-                                )
-                                st.table(df)
-
-                        st.write("**Payment Information**")
-                        if registration["receipt_path"]:
-                            st.write(
-                                f"Receipt Amount: GHS {registration['receipt_amount']:.2f}"
-                            )
-                            if os.path.exists(registration["receipt_path"]):
-                                st.write(
-                                    f"[View Receipt]({registration['receipt_path']})"
-                                )
-                        else:
-                            st.write("No receipt uploaded (Optional)")
+                render_page_controls(
+                    "pending_registration_pages", cursors, next_cursor, total, 100
+                )
+                pending_registrations.insert(0, "Select", False)
+                edited = st.data_editor(
+                    pending_registrations,
+                    hide_index=True,
+                    disabled=list(pending_registrations.columns[1:]),
+                    key="pending_registrations_editor",
+                )
+                selected = [
+                    int(registration_id)
+                    for registration_id in edited.loc[
+                        edited["Select"], "registration_id"
+                    ]
+                ]
+                render_approval_actions(
+                    conn, "course_registration", selected, "pending_registrations"
+                )
 
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.button(
-                                "Approve",
-                                key=f"approve_reg_{registration['registration_id']}",
-                            ):
-                                c = conn.cursor()
-                                c.execute(
-                                    "UPDATE course_registration SET approval_status='approved' WHERE registration_id=?",
-                                    (registration["registration_id"],),
-                                )
-                                conn.commit()
-                                st.success("Registration Approved!")
-                                st.rerun()
-                        with col2:
-                            if st.button(
-                                "Reject",
-                                key=f"reject_reg_{registration['registration_id']}",
-                            ):
-                                c = conn.cursor()
-                                c.execute(
-                                    "UPDATE course_registration SET approval_status='rejected' WHERE registration_id=?",
-                                    (registration["registration_id"],),
-                                )
-                                conn.commit()
-                                st.error("Registration Rejected!")
-                                st.rerun()
+                labels = {
+                    int(row["registration_id"]): f"Registration ID: {row['registration_id']} - {row['surname']} {row['other_names']}"
+                    for _, row in pending_registrations.iterrows()
+                }
+                detail_id = st.selectbox(
+                    "View registration",
+                    [None] + list(labels),
+                    format_func=lambda rid: "Select a registration..."
+                    if rid is None
+                    else labels[rid],
+                    key="pending_registration_detail",
+                )
+                if detail_id:
+                    render_pending_registration_details(conn, detail_id)
 
     finally:
         conn.close()
@@ -3656,26 +9275,164 @@ def update_disability_fields(student):
     return edited_data
 
 
+# Keyset pagination for the admin record pages
+
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+
+
+def _sql_value(value):
+    """Converts a pandas/numpy cell back into a value sqlite3 can bind"""
+    if value is None or pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
+def fetch_keyset_page(
+    conn,
+    columns,
+    from_clause,
+    params,
+    sort_column,
+    key_column,
+    descending=False,
+    after=None,
+    page_size=25,
+):
+    """
+    Fetches one page of rows ordered by (sort_column, key_column) using a
+    keyset cursor instead of OFFSET, plus the total number of matching rows.
+
+    Args:
+        columns: SELECT list
+        from_clause: "FROM ... WHERE ..." part; the keyset condition is ANDed onto it
+        params: Parameters for from_clause
+        sort_column: Sort expression, may be NULL for some rows
+        key_column: Unique tie-breaker column
+        descending: Sort direction
+        after: (sort value, key value) of the last row of the previous page
+        page_size: Rows per page
+
+    Returns:
+        (page DataFrame, total matching rows, cursor of the next page or None)
+    """
+    total = conn.execute(f"SELECT COUNT(*) {from_clause}", params).fetchone()[0]
+
+    # SQLite sorts NULLs first ascending and last descending
+    page_params = list(params)
+    condition = ""
+    if after is not None:
+        sort_value, key_value = after
+        if descending and sort_value is None:
+            condition = f" AND ({sort_column} IS NULL AND {key_column} < ?)"
+            page_params.append(key_value)
+        elif descending:
+            condition = (
+                f" AND ({sort_column} < ? OR ({sort_column} = ? AND {key_column} < ?)"
+                f" OR {sort_column} IS NULL)"
+            )
+            page_params.extend([sort_value, sort_value, key_value])
+        elif sort_value is None:
+            condition = (
+                f" AND (({sort_column} IS NULL AND {key_column} > ?)"
+                f" OR {sort_column} IS NOT NULL)"
+            )
+            page_params.append(key_value)
+        else:
+            condition = (
+                f" AND ({sort_column} > ? OR ({sort_column} = ? AND {key_column} > ?))"
+            )
+            page_params.extend([sort_value, sort_value, key_value])
+
+    direction = "DESC" if descending else "ASC"
+    df = pd.read_sql_query(
+        f"""
+        SELECT {columns},
+               {sort_column} AS page_sort_value,
+               {key_column} AS page_key_value
+        {from_clause}{condition}
+        ORDER BY {sort_column} {direction}, {key_column} {direction}
+        LIMIT ?
+        """,
+        conn,
+        params=page_params + [page_size + 1],
+    )
+
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last_row = df.iloc[-1]
+        next_cursor = (
+            _sql_value(last_row["page_sort_value"]),
+            _sql_value(last_row["page_key_value"]),
+        )
+    return df.drop(columns=["page_sort_value", "page_key_value"]), total, next_cursor
+
+
+def get_page_cursors(state_key: str, signature) -> list:
+    """
+    Cursor stack of a paginated view kept in session state; the last entry
+    is the cursor of the page being shown. It is reset whenever signature
+    (the search, filters and sort order) changes.
+    """
+    state = st.session_state.get(state_key)
+    if not state or state["signature"] != signature:
+        state = {"signature": signature, "cursors": [None]}
+        st.session_state[state_key] = state
+    return state["cursors"]
+
+
+def render_page_controls(state_key: str, cursors: list, next_cursor, total, page_size):
+    """Previous/Next buttons and a position caption for a keyset-paginated view"""
+    page_number = len(cursors)
+    page_count = max(1, -(-total // page_size))
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        if st.button(
+            "Previous", key=f"{state_key}_prev", disabled=page_number == 1
+        ):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {page_number} of {page_count} · {total} records")
+    with col3:
+        if st.button(
+            "Next", key=f"{state_key}_next", disabled=next_cursor is None
+        ):
+            cursors.append(next_cursor)
+            st.rerun()
+
+
 def manage_student_records():
     st.subheader("Student Records Management")
 
     # Add search phrase input for filtering records
-    search_phrase = st.text_input("Search by phrase (ID, surname, or other names)", "")
+    search_phrase = st.text_input(
+        "Search by phrase (ID, name, email, telephone, Ghana Card or programme)", ""
+    )
 
-    col1, col2, col3 = st.columns([2, 2, 1])
+    sort_options = ["Student ID", "Surname", "Date Added", "Programme"]
+    if search_phrase.strip():
+        sort_options.insert(0, "Relevance")
+
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
     with col1:
-        sort_by = st.selectbox(
-            "Sort by", ["Student ID", "Surname", "Date Added", "Programme"]
-        )
+        sort_by = st.selectbox("Sort by", sort_options)
     with col2:
         sort_order = st.selectbox("Order", ["Ascending", "Descending"])
     with col3:
         status_filter = st.selectbox(
             "Status", ["All", "Pending", "Approved", "Rejected"]
         )
+    with col4:
+        page_size = st.selectbox(
+            "Per page", PAGE_SIZE_OPTIONS, index=1, key="student_page_size"
+        )
 
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
+    fts_query = build_fts_query(search_phrase)
+    use_fts = bool(fts_query) and student_search_available(conn)
     sort_field = {
+        "Relevance": "hits.search_rank" if use_fts else "student_id",
         "Student ID": "student_id",
         "Surname": "surname",
         "Date Added": "created_at",
@@ -3684,8 +9441,13 @@ def manage_student_records():
 
     order = "ASC" if sort_order == "Ascending" else "DESC"
     # Base query and parameters list
-    query = """
-        SELECT 
+    params = []
+    search_join = ""
+    if use_fts:
+        # Full-text matches, joined so they can be ranked
+        search_join = f"JOIN ({student_search_subquery()}) hits ON hits.search_rowid = student_info.rowid"
+        params.append(fts_query)
+    columns = """
             student_id,
             surname,
             other_names,
@@ -3722,26 +9484,44 @@ def manage_student_records():
             approval_status,
             created_at,
             programme
-        FROM student_info 
+    """
+    from_clause = f"""
+        FROM student_info
+        {search_join}
         WHERE 1=1
     """
-    params = []
 
     # Add status filter if not "All"
     if status_filter != "All":
-        query += " AND approval_status = ?"
+        from_clause += " AND approval_status = ?"
         params.append(status_filter.lower())
 
-    # Add search by phrase filter if present
-    if search_phrase.strip():
-        query += " AND (student_id LIKE ? OR surname LIKE ? OR other_names LIKE ?)"
+    # Without the full-text index, fall back to substring matching
+    if search_phrase.strip() and not use_fts:
+        from_clause += " AND (student_id LIKE ? OR surname LIKE ? OR other_names LIKE ?)"
         like_phrase = f"%{search_phrase.strip()}%"
         params.extend([like_phrase, like_phrase, like_phrase])
 
-    # Add ordering
-    query += f" ORDER BY {sort_field} {order}"
-
-    df = pd.read_sql_query(query, conn, params=params)
+    # Fetch only the visible page; widgets below are built for these rows only
+    cursors = get_page_cursors(
+        "student_records_pages",
+        (search_phrase, sort_by, sort_order, status_filter, page_size),
+    )
+    df, total, next_cursor = fetch_keyset_page(
+        conn,
+        columns,
+        from_clause,
+        params,
+        sort_field,
+        "student_id",
+        descending=order == "DESC",
+        after=cursors[-1],
+        page_size=page_size,
+    )
+    if total:
+        render_page_controls(
+            "student_records_pages", cursors, next_cursor, total, page_size
+        )
 
     if not df.empty:
         for _, student in df.iterrows():
@@ -4054,6 +9834,7 @@ def manage_student_records():
                                 ),
                             )
                             conn.commit()
+                            invalidate_query_cache("student_info")
                             st.success("Changes saved successfully!")
                             st.rerun()
                         except Exception as e:
@@ -4087,8 +9868,11 @@ def manage_student_records():
                                         )
                                     ):
                                         try:
-                                            image = PILImage.open(doc_path)
-                                            st.image(image, width=150, caption=doc_name)
+                                            st.image(
+                                                thumbnail_path(doc_path),
+                                                width=150,
+                                                caption=doc_name,
+                                            )
                                         except Exception as e:
                                             st.error(
                                                 f"Error loading {doc_name}: {str(e)}"
@@ -4123,13 +9907,9 @@ def manage_student_records():
                                     key=f"save_{doc_name}_{student['student_id']}",
                                 ):
                                     try:
-                                        # Remove old file if it exists
-                                        if doc_path and os.path.exists(doc_path):
-                                            os.remove(doc_path)
-
                                         # Save new file
                                         new_path = save_uploaded_file(
-                                            new_file, "uploads"
+                                            new_file, "uploads", student["student_id"]
                                         )
                                         if new_path:
                                             # Update database with new file path
@@ -4143,6 +9923,10 @@ def manage_student_records():
                                                 (new_path, student["student_id"]),
                                             )
                                             conn.commit()
+                                            invalidate_query_cache("student_info")
+                                            # Old file goes once nothing refers to it
+                                            if doc_path != new_path:
+                                                get_upload_store().release(doc_path)
                                             st.success(
                                                 f"{doc_name} uploaded successfully!"
                                             )
@@ -4165,9 +9949,6 @@ def manage_student_records():
                                     key=f"del_{doc_name}_{student['student_id']}",
                                 ):
                                     try:
-                                        # Remove file from disk
-                                        os.remove(doc_path)
-
                                         # Update database
                                         c = conn.cursor()
                                         c.execute(
@@ -4179,6 +9960,8 @@ def manage_student_records():
                                             (student["student_id"],),
                                         )
                                         conn.commit()
+                                        invalidate_query_cache("student_info")
+                                        get_upload_store().release(doc_path)
                                         st.success(f"{doc_name} deleted successfully!")
                                         st.rerun()
                                     except Exception as e:
@@ -4208,16 +9991,15 @@ def manage_student_records():
                             type="primary",
                         ):
                             try:
-                                for doc_path in documents.values():
-                                    if doc_path and os.path.exists(doc_path):
-                                        os.remove(doc_path)
-
                                 c = conn.cursor()
                                 c.execute(
                                     "DELETE FROM student_info WHERE student_id = ?",
                                     (student["student_id"],),
                                 )
                                 conn.commit()
+                                invalidate_query_cache("student_info")
+                                for doc_path in documents.values():
+                                    get_upload_store().release(doc_path)
                                 st.success("Student record deleted successfully!")
                                 st.rerun()
                             except Exception as e:
@@ -4233,15 +10015,18 @@ def manage_course_registrations():
 
     # Add search phrase input for filtering registration records
     search_phrase = st.text_input(
-        "Search registrations (by student ID, surname, or registration ID)", ""
+        "Search registrations (by registration ID, student ID, name, email or telephone)",
+        "",
     )
 
-    col1, col2, col3 = st.columns([2, 2, 1])
+    sort_options = ["Registration ID", "Student ID", "Programme", "Date Registered"]
+    if search_phrase.strip():
+        sort_options.insert(0, "Relevance")
+
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
 
     with col1:
-        sort_by = st.selectbox(
-            "Sort by", ["Registration ID", "Student ID", "Programme", "Date Registered"]
-        )
+        sort_by = st.selectbox("Sort by", sort_options)
 
     with col2:
         sort_order = st.selectbox("Order", ["Ascending", "Descending"], key="reg_order")
@@ -4251,9 +10036,18 @@ def manage_course_registrations():
             "Status", ["All", "Pending", "Approved", "Rejected"], key="reg_status"
         )
 
-    conn = sqlite3.connect("student_registration.db")
+    with col4:
+        page_size = st.selectbox(
+            "Per page", PAGE_SIZE_OPTIONS, index=1, key="reg_page_size"
+        )
+
+    conn = connect_db()
+    fts_query = build_fts_query(search_phrase)
+    use_fts = bool(fts_query) and student_search_available(conn)
 
     sort_field = {
+        # An exact registration ID match has no rank (NULL) and sorts first
+        "Relevance": "hits.search_rank" if use_fts else "cr.registration_id",
         "Registration ID": "cr.registration_id",
         "Student ID": "cr.student_id",
         "Programme": "cr.programme",
@@ -4263,28 +10057,53 @@ def manage_course_registrations():
     order = "ASC" if sort_order == "Ascending" else "DESC"
 
     # Base query and parameters list for registrations
-    query = """
-        SELECT cr.*, si.surname, si.other_names 
+    params = []
+    search_join = ""
+    if use_fts:
+        search_join = f"LEFT JOIN ({student_search_subquery()}) hits ON hits.search_rowid = si.rowid"
+        params.append(fts_query)
+    from_clause = f"""
         FROM course_registration cr 
         LEFT JOIN student_info si ON cr.student_id = si.student_id 
+        {search_join}
         WHERE 1=1
     """
-    params = []
 
     # Add status filter if not All
     if status_filter != "All":
-        query += " AND cr.approval_status = ?"
+        from_clause += " AND cr.approval_status = ?"
         params.append(status_filter.lower())
 
-    # Add search by phrase filter if provided, search in registration_id, student_id, surname, or other_names
-    if search_phrase.strip():
-        query += " AND (cr.registration_id LIKE ? OR cr.student_id LIKE ? OR si.surname LIKE ? OR si.other_names LIKE ?)"
+    # Add search by phrase filter if provided: full-text match on the student,
+    # or an exact registration ID
+    if use_fts:
+        from_clause += " AND (hits.search_rowid IS NOT NULL OR cr.registration_id = ?)"
+        params.append(search_phrase.strip())
+    elif search_phrase.strip():
+        from_clause += " AND (cr.registration_id LIKE ? OR cr.student_id LIKE ? OR si.surname LIKE ? OR si.other_names LIKE ?)"
         like_phrase = f"%{search_phrase.strip()}%"
         params.extend([like_phrase, like_phrase, like_phrase, like_phrase])
 
-    query += f" ORDER BY {sort_field} {order}"
-
-    df = pd.read_sql_query(query, conn, params=params)
+    # Fetch only the visible page; widgets below are built for these rows only
+    cursors = get_page_cursors(
+        "course_registration_pages",
+        (search_phrase, sort_by, sort_order, status_filter, page_size),
+    )
+    df, total, next_cursor = fetch_keyset_page(
+        conn,
+        "cr.*, si.surname, si.other_names",
+        from_clause,
+        params,
+        sort_field,
+        "cr.registration_id",
+        descending=order == "DESC",
+        after=cursors[-1],
+        page_size=page_size,
+    )
+    if total:
+        render_page_controls(
+            "course_registration_pages", cursors, next_cursor, total, page_size
+        )
 
     if not df.empty:
         for _, registration in df.iterrows():
@@ -4312,12 +10131,12 @@ def manage_course_registrations():
 
                     st.write("**Selected Courses**")
                     if registration["courses"]:
-                        courses_list = registration["courses"].split("\n")
-                        table_data = []
-                        for course in courses_list:
-                            if "|" in course:
-                                code, title, credits = course.split("|")
-                                table_data.append([code, title, f"{credits} credits"])
+                        table_data = [
+                            [course.code, course.title, f"{course.credits} credits"]
+                            for course in get_course_catalog().parse(
+                                registration["courses"]
+                            )
+                        ]
                         if table_data:
                             df = pd.DataFrame(
                                 table_data,
@@ -4336,20 +10155,21 @@ def manage_course_registrations():
 
                 with tab2:
                     edited_reg = {}
+                    catalog = get_course_catalog()
                     col1, col2 = st.columns(2)
 
                     with col1:
                         edited_reg["programme"] = st.selectbox(
                             "Programme",
-                            ["CIMG", "CIM-UK", "ICAG", "ACCA"],
-                            index=["CIMG", "CIM-UK", "ICAG", "ACCA"].index(
-                                registration["programme"]
+                            catalog.programmes,
+                            index=(
+                                catalog.programmes.index(registration["programme"])
+                                if registration["programme"] in catalog.programmes
+                                else 0
                             ),
                             key=f"prog_{registration['registration_id']}",
                         )
-                        program_levels = list(
-                            get_program_courses(edited_reg["programme"]).keys()
-                        )
+                        program_levels = list(catalog.levels(edited_reg["programme"]))
                         edited_reg["level"] = st.selectbox(
                             "Level",
                             program_levels,
@@ -4396,26 +10216,26 @@ def manage_course_registrations():
                         )
 
                     st.write("**Course Selection**")
-                    available_courses = get_program_courses(
-                        edited_reg["programme"]
-                    ).get(edited_reg["level"], [])
-                    current_courses = (
-                        registration["courses"].split("\n")
-                        if registration["courses"]
-                        else []
+                    available_courses = catalog.courses(
+                        edited_reg["programme"], edited_reg["level"]
                     )
+                    current_courses = [
+                        course
+                        for course in catalog.parse(registration["courses"])
+                        if course in available_courses
+                    ]
                     selected_courses = st.multiselect(
                         "Select Courses",
                         available_courses,
                         default=current_courses,
-                        format_func=lambda x: f"{x.split('|')[0]} - {x.split('|')[1]} ({x.split('|')[2]} credits)",
+                        format_func=Course.label,
                         key=f"courses_{registration['registration_id']}",
                     )
 
-                    edited_reg["courses"] = "\n".join(selected_courses)
-                    edited_reg["total_credits"] = sum(
-                        [int(course.split("|")[2]) for course in selected_courses]
+                    edited_reg["courses"] = "\n".join(
+                        course.line for course in selected_courses
                     )
+                    edited_reg["total_credits"] = catalog.total_credits(selected_courses)
 
                     st.write(f"Total Credits: {edited_reg['total_credits']}")
                     if edited_reg["total_credits"] > 24:
@@ -4448,7 +10268,13 @@ def manage_course_registrations():
                                         registration["registration_id"],
                                     ),
                                 )
+                                sync_registration_items(
+                                    conn,
+                                    registration["registration_id"],
+                                    edited_reg["courses"],
+                                )
                                 conn.commit()
+                                invalidate_query_cache("course_registration")
                                 st.success("Changes saved successfully!")
                                 st.rerun()
                             except Exception as e:
@@ -4501,6 +10327,7 @@ def manage_course_registrations():
                                         (new_amount, registration["registration_id"]),
                                     )
                                     conn.commit()
+                                    invalidate_query_cache("course_registration")
                                     st.success("Receipt amount updated successfully!")
                                     st.rerun()
                                 except Exception as e:
@@ -4511,9 +10338,6 @@ def manage_course_registrations():
                             key=f"del_receipt_{registration['registration_id']}",
                         ):
                             try:
-                                if os.path.exists(registration["receipt_path"]):
-                                    os.remove(registration["receipt_path"])
-
                                 c = conn.cursor()
                                 c.execute(
                                     """
@@ -4524,6 +10348,8 @@ def manage_course_registrations():
                                     (registration["registration_id"],),
                                 )
                                 conn.commit()
+                                invalidate_query_cache("course_registration")
+                                get_upload_store().release(registration["receipt_path"])
                                 st.success("Receipt deleted successfully!")
                                 st.rerun()
                             except Exception as e:
@@ -4548,7 +10374,7 @@ def manage_course_registrations():
                             ):
                                 try:
                                     receipt_path = save_uploaded_file(
-                                        new_receipt, "uploads"
+                                        new_receipt, "uploads", registration["student_id"]
                                     )
                                     c = conn.cursor()
                                     c.execute(
@@ -4564,6 +10390,7 @@ def manage_course_registrations():
                                         ),
                                     )
                                     conn.commit()
+                                    invalidate_query_cache("course_registration")
                                     st.success("Receipt uploaded successfully!")
                                     st.rerun()
                                 except Exception as e:
@@ -4593,17 +10420,18 @@ def manage_course_registrations():
                             type="primary",
                         ):
                             try:
-                                if registration["receipt_path"] and os.path.exists(
-                                    registration["receipt_path"]
-                                ):
-                                    os.remove(registration["receipt_path"])
-
                                 c = conn.cursor()
+                                c.execute(
+                                    "DELETE FROM course_registration_items WHERE registration_id = ?",
+                                    (registration["registration_id"],),
+                                )
                                 c.execute(
                                     "DELETE FROM course_registration WHERE registration_id = ?",
                                     (registration["registration_id"],),
                                 )
                                 conn.commit()
+                                invalidate_query_cache("course_registration")
+                                get_upload_store().release(registration["receipt_path"])
                                 st.success("Registration deleted successfully!")
                                 st.rerun()
                             except Exception as e:
@@ -4617,15 +10445,8 @@ def manage_course_registrations():
 def manage_programs():
     st.title("Programs Management")
 
-    conn = sqlite3.connect("student_registration.db")
-    programs_df = pd.read_sql_query(
-        """
-        SELECT DISTINCT programme 
-        FROM course_registration 
-        WHERE programme IS NOT NULL
-    """,
-        conn,
-    )
+    conn = connect_db()
+    programs_df = pd.DataFrame({"programme": get_registered_programmes()})
 
     if not programs_df.empty:
         for program in programs_df["programme"]:
@@ -4674,10 +10495,12 @@ def manage_programs():
                                     student["passport_photo_path"]
                                 ):
                                     try:
-                                        image = PILImage.open(
-                                            student["passport_photo_path"]
+                                        st.image(
+                                            thumbnail_path(
+                                                student["passport_photo_path"]
+                                            ),
+                                            width=100,
                                         )
-                                        st.image(image, width=100)
                                     except Exception as e:
                                         st.error("Error loading photo")
                                 st.write(
@@ -4717,49 +10540,72 @@ from plotly.subplots import make_subplots
 import plotly.graph_objects as go
 
 
+def _payment_totals(conn, source: str) -> pd.DataFrame:
+    """One-row payment totals of a table (the shape the overview expects)"""
+    totals = get_report_stats(conn, source, "total")
+    if totals.empty:
+        totals = pd.DataFrame(
+            [{"count": 0, "with_receipt": 0, "without_receipt": 0, "total_amount": 0.0}]
+        )
+    return totals.rename(columns={"count": "total_records"})
+
+
+def _payment_trend(conn, source: str) -> pd.DataFrame:
+    """Receipts and receipted amounts per day"""
+    trend = get_report_stats(conn, source, "payment_date")
+    trend = trend[trend["with_receipt"] > 0]
+    return trend.rename(
+        columns={"with_receipt": "num_payments", "receipt_amount": "daily_amount"}
+    )[["payment_date", "num_payments", "daily_amount"]].reset_index(drop=True)
+
+
+def _payment_details(conn, source: str) -> pd.DataFrame:
+    """Counts and amounts with and without a receipt"""
+    totals = get_report_stats(conn, source, "total")
+    if totals.empty:
+        return pd.DataFrame()
+    totals = totals.iloc[0]
+    min_amount, max_amount = get_receipt_amount_range(conn, source)
+    details = [
+        {
+            "receipt_status": "With Receipt",
+            "count": totals["with_receipt"],
+            "avg_amount": totals["avg_receipt_amount"],
+            "min_amount": min_amount,
+            "max_amount": max_amount,
+            "total_amount": totals["receipt_amount"],
+        },
+        {
+            "receipt_status": "Without Receipt",
+            "count": totals["without_receipt"],
+            "total_amount": totals["total_amount"] - totals["receipt_amount"],
+        },
+    ]
+    return pd.DataFrame([row for row in details if row["count"] > 0])
+
+
 def generate_payment_statistics():
     """
     Generate comprehensive payment statistics with visualizations.
-    This function queries the database for payment information from both
-    student_info and course_registration tables, then creates visualizations.
+    Figures for both student_info and course_registration are read from the
+    pre-aggregated report statistics, then visualized.
     """
     st.subheader("Payment Statistics Dashboard")
 
     # Connect to the database
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
 
     # Create tabs for different payment views
     tab1, tab2, tab3 = st.tabs(
         ["Overview", "Student Payments", "Course Registration Payments"]
     )
 
-    with tab1:
-        st.write("### Payment Overview")
-
-        # Get overall payment statistics from both tables
-        student_payments = pd.read_sql_query(
-            """
-            SELECT 
-                COUNT(*) as total_records,
-                SUM(CASE WHEN receipt_path IS NOT NULL THEN 1 ELSE 0 END) as with_receipt,
-                SUM(CASE WHEN receipt_path IS NULL THEN 1 ELSE 0 END) as without_receipt,
-                SUM(COALESCE(receipt_amount, 0)) as total_amount
-            FROM student_info
-            """,
-            conn,
-        )
-
-        course_payments = pd.read_sql_query(
-            """
-            SELECT 
-                COUNT(*) as total_records,
-                SUM(CASE WHEN receipt_path IS NOT NULL THEN 1 ELSE 0 END) as with_receipt,
-                SUM(CASE WHEN receipt_path IS NULL THEN 1 ELSE 0 END) as without_receipt,
-                SUM(COALESCE(receipt_amount, 0)) as total_amount
-            FROM course_registration
-            """,
-            conn,
-        )
+    with tab1:
+        st.write("### Payment Overview")
+
+        # Overall payment statistics of both tables, pre-aggregated
+        student_payments = _payment_totals(conn, "student_info")
+        course_payments = _payment_totals(conn, "course_registration")
 
         # Display summary metrics
         col1, col2, col3 = st.columns(3)
@@ -4824,33 +10670,8 @@ def generate_payment_statistics():
         st.write("### Payment Trends")
 
         # Get payment data by date
-        student_payment_trend = pd.read_sql_query(
-            """
-            SELECT 
-                date(created_at) as payment_date,
-                COUNT(*) as num_payments,
-                SUM(COALESCE(receipt_amount, 0)) as daily_amount
-            FROM student_info
-            WHERE receipt_path IS NOT NULL
-            GROUP BY date(created_at)
-            ORDER BY payment_date
-            """,
-            conn,
-        )
-
-        course_payment_trend = pd.read_sql_query(
-            """
-            SELECT 
-                date(date_registered) as payment_date,
-                COUNT(*) as num_payments,
-                SUM(COALESCE(receipt_amount, 0)) as daily_amount
-            FROM course_registration
-            WHERE receipt_path IS NOT NULL
-            GROUP BY date(date_registered)
-            ORDER BY payment_date
-            """,
-            conn,
-        )
+        student_payment_trend = _payment_trend(conn, "student_info")
+        course_payment_trend = _payment_trend(conn, "course_registration")
 
         # Combine the trends if data exists
         if not student_payment_trend.empty or not course_payment_trend.empty:
@@ -4889,26 +10710,7 @@ def generate_payment_statistics():
         st.write("### Student Information Payments")
 
         # Get detailed student payment statistics
-        student_payment_details = pd.read_sql_query(
-            """
-            SELECT 
-                CASE 
-                    WHEN receipt_path IS NOT NULL THEN 'With Receipt'
-                    ELSE 'Without Receipt'
-                END as receipt_status,
-                COUNT(*) as count,
-                AVG(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as avg_amount,
-                MIN(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as min_amount,
-                MAX(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as max_amount,
-                SUM(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as total_amount
-            FROM student_info
-            GROUP BY CASE 
-                        WHEN receipt_path IS NOT NULL THEN 'With Receipt'
-                        ELSE 'Without Receipt'
-                    END
-            """,
-            conn,
-        )
+        student_payment_details = _payment_details(conn, "student_info")
 
         if not student_payment_details.empty:
             # Display pie chart
@@ -4955,19 +10757,11 @@ def generate_payment_statistics():
                 st.info("No student receipt data available")
 
             # Get payment distribution by programme
-            programme_payments = pd.read_sql_query(
-                """
-                SELECT 
-                    programme,
-                    COUNT(*) as student_count,
-                    SUM(CASE WHEN receipt_path IS NOT NULL THEN 1 ELSE 0 END) as with_receipt,
-                    SUM(COALESCE(receipt_amount, 0)) as total_amount
-                FROM student_info
-                WHERE programme IS NOT NULL AND programme != ''
-                GROUP BY programme
-                ORDER BY total_amount DESC
-                """,
-                conn,
+            programme_payments = (
+                get_report_stats(conn, "student_info", "programme")
+                .dropna(subset=["programme"])
+                .rename(columns={"count": "student_count"})
+                .sort_values("total_amount", ascending=False)
             )
 
             if not programme_payments.empty:
@@ -4991,26 +10785,7 @@ def generate_payment_statistics():
         st.write("### Course Registration Payments")
 
         # Get detailed course registration payment statistics
-        course_payment_details = pd.read_sql_query(
-            """
-            SELECT 
-                CASE 
-                    WHEN receipt_path IS NOT NULL THEN 'With Receipt'
-                    ELSE 'Without Receipt'
-                END as receipt_status,
-                COUNT(*) as count,
-                AVG(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as avg_amount,
-                MIN(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as min_amount,
-                MAX(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as max_amount,
-                SUM(CASE WHEN receipt_amount IS NOT NULL THEN receipt_amount ELSE 0 END) as total_amount
-            FROM course_registration
-            GROUP BY CASE 
-                        WHEN receipt_path IS NOT NULL THEN 'With Receipt'
-                        ELSE 'Without Receipt'
-                    END
-            """,
-            conn,
-        )
+        course_payment_details = _payment_details(conn, "course_registration")
 
         if not course_payment_details.empty:
             # Display pie chart
@@ -5057,20 +10832,11 @@ def generate_payment_statistics():
                 st.info("No course registration receipt data available")
 
             # Get payment distribution by programme and level
-            level_payments = pd.read_sql_query(
-                """
-                SELECT 
-                    programme,
-                    level,
-                    COUNT(*) as registration_count,
-                    SUM(CASE WHEN receipt_path IS NOT NULL THEN 1 ELSE 0 END) as with_receipt,
-                    SUM(COALESCE(receipt_amount, 0)) as total_amount
-                FROM course_registration
-                WHERE programme IS NOT NULL AND programme != ''
-                GROUP BY programme, level
-                ORDER BY total_amount DESC
-                """,
-                conn,
+            level_payments = (
+                get_report_stats(conn, "course_registration", "programme_level")
+                .dropna(subset=["programme"])
+                .rename(columns={"count": "registration_count"})
+                .sort_values("total_amount", ascending=False)
             )
 
             if not level_payments.empty:
@@ -5120,59 +10886,361 @@ def system_resource_monitor():
     }
 
 
-def perform_backup():
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_dir = "db_backups"
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
-    backup_filename = os.path.join(backup_dir, f"backup_{timestamp}.zip")
-    with zipfile.ZipFile(backup_filename, "w") as zipf:
-        # Backup the database file.
-        db_file = "student_registration.db"
-        if os.path.exists(db_file):
-            zipf.write(db_file, arcname=os.path.basename(db_file))
-        # Backup the uploads folder.
-        uploads_dir = "uploads"
-        if os.path.exists(uploads_dir):
-            for root, dirs, files in os.walk(uploads_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, uploads_dir)
-                    zipf.write(file_path, arcname=os.path.join("uploads", arcname))
-    # Record last backup timestamp.
-    with open("last_backup.txt", "w") as f:
-        f.write(datetime.now().isoformat())
-    return backup_filename
+BACKUP_DIR = "db_backups"
+BACKUP_KEEP_LAST = 10  # Most recent backups that are never pruned
+BACKUP_MAX_AGE_DAYS = 90  # Older backups beyond BACKUP_KEEP_LAST are pruned
+BACKUP_INTERVAL_DAYS = 30  # should_backup() recommends a backup after this
+
+_backup_store_lock = threading.Lock()
+
+
+class BackupStore:
+    """
+    Incremental, deduplicating backups of the database and uploads folder.
+
+    Layout under root:
+    - objects/ab/cd/<sha256>: file contents, stored once however many
+      backups reference them
+    - manifests/<backup_id>.json: one small manifest per backup mapping
+      each path to its object
+
+    The database is captured with the SQLite online backup API, so the copy
+    is consistent even while the app keeps writing. Upload files whose size
+    and mtime match the previous manifest are not even re-hashed, and files
+    whose content is already stored are never copied again.
+    """
+
+    def __init__(
+        self,
+        root: str = BACKUP_DIR,
+        db_path: str = DB_PATH,
+        uploads_dir: Optional[str] = "uploads",
+    ):
+        self.root = root
+        self.db_path = db_path
+        self.uploads_dir = uploads_dir
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:4], digest)
+
+    def _store_object(self, source_path: str, digest: str, move: bool = False) -> bool:
+        """Adds a file to the object store; returns False if it was already there"""
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            if move:
+                os.remove(source_path)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            os.replace(source_path, target)
+        else:
+            tmp_path = f"{target}.{os.getpid()}.part"
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, target)
+        return True
+
+    def _manifest_path(self, backup_id: str) -> str:
+        return os.path.join(self.manifests_dir, f"{backup_id}.json")
+
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Manifests of every backup, newest first"""
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        backups = []
+        for name in os.listdir(self.manifests_dir):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.manifests_dir, name), "r") as f:
+                        backups.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Skipping unreadable backup manifest {name}: {e}")
+        return sorted(backups, key=lambda manifest: manifest["created_at"], reverse=True)
+
+    def load_manifest(self, backup_id: str) -> Dict[str, Any]:
+        with open(self._manifest_path(backup_id), "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def is_full_backup(manifest: Dict[str, Any]) -> bool:
+        """False for database-only backups (taken without the uploads folder)"""
+        return manifest.get("uploads_dir") is not None
+
+    def latest_backup(self, full_only: bool = False) -> Optional[Dict[str, Any]]:
+        backups = self.list_backups()
+        if full_only:
+            backups = [manifest for manifest in backups if self.is_full_backup(manifest)]
+        return backups[0] if backups else None
+
+    def create_backup(self, label: str = "manual", prune: bool = True) -> Dict[str, Any]:
+        """
+        Takes a backup and records its manifest.
+
+        Args:
+            label: Free text stored in the manifest (e.g. "manual", "pre-import")
+            prune: Apply the retention policy afterwards
+
+        Returns:
+            The manifest, including a "stats" dict of new and reused objects
+        """
+        created_at = datetime.now()
+        backup_id = f"backup_{created_at.strftime('%Y%m%d_%H%M%S_%f')}"
+        stats = {"files": 0, "new_objects": 0, "reused": 0, "copied_bytes": 0, "total_bytes": 0}
+
+        with _backup_store_lock:
+            os.makedirs(self.manifests_dir, exist_ok=True)
+            os.makedirs(self.objects_dir, exist_ok=True)
+
+            database = None
+            if os.path.exists(self.db_path):
+                fd, snapshot_path = tempfile.mkstemp(suffix=".db.part", dir=self.objects_dir)
+                os.close(fd)
+                try:
+                    snapshot_database(self.db_path, snapshot_path)
+                    snapshot = sqlite3.connect(snapshot_path)
+                    try:
+                        migration_version = snapshot.execute("PRAGMA user_version").fetchone()[0]
+                    finally:
+                        snapshot.close()
+                    size = os.path.getsize(snapshot_path)
+                    digest = file_sha256(snapshot_path)
+                    if self._store_object(snapshot_path, digest, move=True):
+                        stats["new_objects"] += 1
+                        stats["copied_bytes"] += size
+                    else:
+                        stats["reused"] += 1
+                    stats["total_bytes"] += size
+                finally:
+                    if os.path.exists(snapshot_path):
+                        os.remove(snapshot_path)
+                database = {
+                    "name": os.path.basename(self.db_path),
+                    "sha256": digest,
+                    "size": size,
+                    "migration_version": migration_version,
+                }
+
+            previous = self.latest_backup(full_only=True)
+            previous_files = previous.get("files", {}) if previous else {}
+            files = {}
+            if self.uploads_dir and os.path.isdir(self.uploads_dir):
+                for root, _, names in os.walk(self.uploads_dir):
+                    for name in names:
+                        path = os.path.join(root, name)
+                        relpath = os.path.relpath(path, self.uploads_dir).replace(os.sep, "/")
+                        try:
+                            st_info = os.stat(path)
+                            record = {"size": st_info.st_size, "mtime_ns": st_info.st_mtime_ns}
+                            earlier = previous_files.get(relpath)
+                            if (
+                                earlier
+                                and earlier["size"] == record["size"]
+                                and earlier["mtime_ns"] == record["mtime_ns"]
+                                and os.path.exists(self.object_path(earlier["sha256"]))
+                            ):
+                                record["sha256"] = earlier["sha256"]
+                            else:
+                                # Upload store blobs are named after their hash
+                                record["sha256"] = UploadStore.blob_digest(relpath) or file_sha256(path)
+                            if self._store_object(path, record["sha256"]):
+                                stats["new_objects"] += 1
+                                stats["copied_bytes"] += record["size"]
+                            else:
+                                stats["reused"] += 1
+                        except OSError as e:
+                            logging.warning(f"Skipping unreadable file in backup: {e}")
+                            continue
+                        files[relpath] = record
+                        stats["files"] += 1
+                        stats["total_bytes"] += record["size"]
+
+            manifest = {
+                "backup_id": backup_id,
+                "label": label,
+                "created_at": created_at.isoformat(),
+                "database": database,
+                "uploads_dir": self.uploads_dir,
+                "files": files,
+                "stats": stats,
+            }
+            tmp_path = self._manifest_path(backup_id) + ".part"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._manifest_path(backup_id))
+
+        if prune:
+            self.prune()
+        return manifest
+
+    def verify(self, backup_id: str) -> List[str]:
+        """Paths of a backup whose stored object is missing or corrupt"""
+        manifest = self.load_manifest(backup_id)
+        entries = dict(manifest["files"])
+        if manifest["database"]:
+            entries[manifest["database"]["name"]] = manifest["database"]
+        problems = []
+        for path, record in entries.items():
+            object_path = self.object_path(record["sha256"])
+            if not os.path.exists(object_path) or file_sha256(object_path) != record["sha256"]:
+                problems.append(path)
+        return problems
+
+    def restore(self, backup_id: str, restore_uploads: bool = True) -> Dict[str, int]:
+        """
+        Restores a backup in place after verifying every object it needs.
+
+        The current state is backed up first, so a restore can be undone.
+        The database is written back through the SQLite backup API into the
+        live (pooled) database and then migrated to the current schema.
+        Upload files that differ from the backup are rewritten; files added
+        since the backup are left alone.
+
+        Returns:
+            Counts of restored and unchanged upload files
+        """
+        manifest = self.load_manifest(backup_id)
+        problems = self.verify(backup_id)
+        if problems:
+            raise ValueError(
+                f"Backup {backup_id} is damaged; missing or corrupt: {', '.join(problems[:5])}"
+            )
+        self.create_backup(label=f"pre-restore of {backup_id}", prune=False)
+
+        if manifest["database"]:
+            snapshot = sqlite3.connect(self.object_path(manifest["database"]["sha256"]))
+            conn = connect_db(self.db_path)
+            try:
+                snapshot.backup(conn)
+            finally:
+                conn.close()
+                snapshot.close()
+            DatabaseMigrationHandler(self.db_path, self.root).apply_migrations()
+            # Every table was replaced, so no cached query result holds
+            invalidate_query_cache()
+
+        counts = {"restored": 0, "unchanged": 0}
+        uploads_dir = self.uploads_dir or manifest.get("uploads_dir")
+        if restore_uploads and uploads_dir:
+            for relpath, record in manifest["files"].items():
+                target = os.path.join(uploads_dir, *relpath.split("/"))
+                if (
+                    os.path.exists(target)
+                    and os.path.getsize(target) == record["size"]
+                    and file_sha256(target) == record["sha256"]
+                ):
+                    counts["unchanged"] += 1
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = f"{target}.restore.part"
+                shutil.copyfile(self.object_path(record["sha256"]), tmp_path)
+                os.replace(tmp_path, target)
+                counts["restored"] += 1
+        return counts
+
+    def prune(
+        self, keep_last: int = BACKUP_KEEP_LAST, max_age_days: int = BACKUP_MAX_AGE_DAYS
+    ) -> Dict[str, int]:
+        """
+        Deletes backups beyond the newest keep_last that are older than
+        max_age_days, then every object no remaining backup references.
+        Full and database-only backups are counted separately, so frequent
+        pre-import snapshots never push full backups out.
+
+        Returns:
+            Counts of deleted backups and objects and the bytes freed
+        """
+        result = {"backups": 0, "objects": 0, "freed_bytes": 0}
+        with _backup_store_lock:
+            cutoff = datetime.now() - timedelta(days=max_age_days)
+            backups = self.list_backups()
+            full = [manifest for manifest in backups if self.is_full_backup(manifest)]
+            database_only = [
+                manifest for manifest in backups if not self.is_full_backup(manifest)
+            ]
+            for manifest in full[keep_last:] + database_only[keep_last:]:
+                if datetime.fromisoformat(manifest["created_at"]) < cutoff:
+                    os.remove(self._manifest_path(manifest["backup_id"]))
+                    result["backups"] += 1
+
+            referenced = set()
+            for manifest in self.list_backups():
+                referenced.update(record["sha256"] for record in manifest["files"].values())
+                if manifest["database"]:
+                    referenced.add(manifest["database"]["sha256"])
+
+            if os.path.isdir(self.objects_dir):
+                for root, _, names in os.walk(self.objects_dir):
+                    for name in names:
+                        if name in referenced:
+                            continue
+                        path = os.path.join(root, name)
+                        try:
+                            result["freed_bytes"] += os.path.getsize(path)
+                            os.remove(path)
+                            result["objects"] += 1
+                        except OSError:
+                            pass
+        return result
+
+    def export_archive(self, backup_id: str) -> Optional[str]:
+        """
+        Builds a downloadable ZIP of one backup (database file plus
+        uploads/...), laid out like the former full-copy backups.
+        """
+        manifest = self.load_manifest(backup_id)
+        archive = StreamingArchive(backup_id, manifest_dir=None)
+        if manifest["database"]:
+            archive.add(
+                self.object_path(manifest["database"]["sha256"]),
+                manifest["database"]["name"],
+            )
+        for relpath, record in manifest["files"].items():
+            archive.add(self.object_path(record["sha256"]), f"uploads/{relpath}")
+        return archive.build()
+
+    def stats(self) -> Dict[str, Any]:
+        """Backup count and the disk space actually used by the object store"""
+        backups = self.list_backups()
+        used = 0
+        if os.path.isdir(self.objects_dir):
+            for root, _, names in os.walk(self.objects_dir):
+                used += sum(os.path.getsize(os.path.join(root, name)) for name in names)
+        logical = sum(manifest["stats"]["total_bytes"] for manifest in backups)
+        return {
+            "backups": len(backups),
+            "stored_mb": used / (1024 * 1024),
+            "logical_mb": logical / (1024 * 1024),
+            "last_backup": backups[0]["created_at"] if backups else None,
+        }
+
+
+def perform_backup() -> Dict[str, Any]:
+    """Backs up the database and uploads folder; returns the backup manifest"""
+    return BackupStore().create_backup()
 
 
 def should_backup():
     """
     Determines if a database backup is needed based on:
-    1. Time since last backup (>30 days)
+    1. Time since last backup (>BACKUP_INTERVAL_DAYS)
     2. Current disk usage (≥90%)
     
     Returns:
         bool: True if backup is recommended, False otherwise
     """
     need_backup = False
-    now = datetime.now()
-    
-    # Check time-based criterion
-    if os.path.exists("last_backup.txt"):
-        with open("last_backup.txt", "r") as f:
-            last_backup_str = f.read().strip()
-            if last_backup_str:
-                try:
-                    last_backup = datetime.fromisoformat(last_backup_str)
-                    if now - last_backup > timedelta(days=30):
-                        need_backup = True
-                except (ValueError, TypeError):
-                    # If date parsing fails, recommend backup
-                    need_backup = True
-    else:
+
+    # Check time-based criterion; database-only snapshots don't count
+    latest = BackupStore().latest_backup(full_only=True)
+    if latest is None:
         # No record of previous backup, so recommend one
         need_backup = True
-    
+    elif datetime.now() - datetime.fromisoformat(latest["created_at"]) > timedelta(
+        days=BACKUP_INTERVAL_DAYS
+    ):
+        need_backup = True
+
     # Check disk usage criterion
     if check_disk_usage() >= 90:
         need_backup = True
@@ -5186,16 +11254,8 @@ def ensure_student_password_column():
     Ensure that the student_info table has a 'password' column.
     If not, add it. This column will store the student's custom password.
     """
-    conn = sqlite3.connect("student_registration.db")
-    c = conn.cursor()
-    try:
-        # Try to query the 'password' column
-        c.execute("SELECT password FROM student_info LIMIT 1")
-    except sqlite3.OperationalError:
-        # Add password column if it doesn't exist
-        c.execute("ALTER TABLE student_info ADD COLUMN password TEXT")
-    conn.commit()
-    conn.close()
+    # The column is added by a numbered schema migration.
+    DatabaseMigrationHandler(DB_PATH).apply_migrations()
 
 
 def student_login_form():
@@ -5224,7 +11284,7 @@ def student_login_form():
         st.button("Login", use_container_width=True)
         or st.session_state.show_password_reset
     ):
-        conn = sqlite3.connect("student_registration.db")
+        conn = connect_db()
         c = conn.cursor()
         c.execute(
             """
@@ -5283,7 +11343,7 @@ def student_login_form():
                     st.error("Password must be at least 8 characters long.")
                     return None
                 else:
-                    conn = sqlite3.connect("student_registration.db")
+                    conn = connect_db()
                     c = conn.cursor()
                     c.execute(
                         """
@@ -5294,6 +11354,7 @@ def student_login_form():
                         (new_password, student_id),
                     )
                     conn.commit()
+                    invalidate_query_cache("student_info")
                     conn.close()
                     st.success("Password reset successfully! You are now logged in.")
                     st.session_state.show_password_reset = False
@@ -5352,7 +11413,7 @@ def student_portal():
         return
 
     # Fetch student information and course registrations from the database.
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
     c = conn.cursor()
     c.execute("SELECT * FROM student_info WHERE student_id = ?", (student_id,))
     student = c.fetchone()
@@ -5363,6 +11424,10 @@ def student_portal():
     registrations = c.fetchall()
     conn.close()
 
+    # The badge comes from the unread counter, not the notification query
+    notification_system = NotificationSystem()
+    unread_count = notification_system.unread_count(student_id)
+
     # Create portal tabs including Proof of Registration.
     tabs = st.tabs(
         [
@@ -5371,7 +11436,7 @@ def student_portal():
             "Documents",
             "Proof of Registration",
             "Settings",
-            "Notifications",
+            f"Notifications ({unread_count})" if unread_count else "Notifications",
         ]
     )
 
@@ -5384,8 +11449,9 @@ def student_portal():
         with col1:
             if student[28] and os.path.exists(student[28]):  # passport_photo_path
                 try:
-                    image = PILImage.open(student[28])
-                    st.image(image, width=200, caption="Student Photo")
+                    st.image(
+                        thumbnail_path(student[28]), width=200, caption="Student Photo"
+                    )
                 except Exception as e:
                     st.error(f"Error loading passport photo: {str(e)}")
             with st.container():
@@ -5424,11 +11490,10 @@ def student_portal():
                         st.write(f"**Total Credits:** {reg[10]}")
                     if reg[9]:
                         st.write("**Selected Courses:**")
-                        courses_list = reg[9].split("\n")
-                        for course in courses_list:
-                            if "|" in course:
-                                code, title, credits = course.split("|")
-                                st.write(f"- {code}: {title} ({credits} credits)")
+                        for course in get_course_catalog().parse(reg[9]):
+                            st.write(
+                                f"- {course.code}: {course.title} ({course.credits} credits)"
+                            )
         else:
             st.info("No course registrations found.")
 
@@ -5515,7 +11580,7 @@ def student_portal():
                 elif len(new_password) < 8:
                     st.error("New password must be at least 8 characters long.")
                 else:
-                    conn = sqlite3.connect("student_registration.db")
+                    conn = connect_db()
                     c = conn.cursor()
                     c.execute(
                         "SELECT password FROM student_info WHERE student_id = ?",
@@ -5528,6 +11593,7 @@ def student_portal():
                             (new_password, student_id),
                         )
                         conn.commit()
+                        invalidate_query_cache("student_info")
                         st.success("Password updated successfully!")
                     else:
                         st.error("Current password is incorrect.")
@@ -5541,20 +11607,33 @@ def student_portal():
         st.markdown(
             "<div class='subheader'>Notifications</div>", unsafe_allow_html=True
         )
-        notification_system = NotificationSystem()
         show_read = st.checkbox("Show read notifications")
+        page_key = f"notification_pages_{show_read}"
+        pages = st.session_state.setdefault(page_key, 1)
         notifications = notification_system.get_notifications(
-            student_id=student_id, include_read=show_read
+            student_id=student_id, include_read=show_read, limit=NOTIFICATION_PAGE_SIZE
         )
+        for _ in range(pages - 1):
+            if len(notifications) % NOTIFICATION_PAGE_SIZE:
+                break
+            notifications += notification_system.get_notifications(
+                student_id=student_id,
+                include_read=show_read,
+                limit=NOTIFICATION_PAGE_SIZE,
+                before_id=notifications[-1]["id"],
+            )
         col1, col2 = st.columns([4, 1])
         with col1:
-            unread_count = len([n for n in notifications if not n["is_read"]])
             st.write(f"**You have {unread_count} unread notifications**")
         with col2:
             if st.button("Mark All as Read"):
                 notification_system.mark_all_as_read(student_id)
                 st.rerun()
         display_notifications(notifications)
+        if notifications and len(notifications) == pages * NOTIFICATION_PAGE_SIZE:
+            if st.button("Load More"):
+                st.session_state[page_key] = pages + 1
+                st.rerun()
 
 
 def generate_program_student_list(program, level, students_df):
@@ -5628,7 +11707,11 @@ def generate_program_student_list(program, level, students_df):
         if student["passport_photo_path"] and os.path.exists(student["passport_photo_path"]):
             try:
                 # Use RLImage instead of Image for better compatibility
-                photo_cell = RLImage(student["passport_photo_path"], width=1 * inch, height=1 * inch)
+                photo_cell = RLImage(
+                    thumbnail_path(student["passport_photo_path"], "large"),
+                    width=1 * inch,
+                    height=1 * inch,
+                )
             except Exception as e:
                 # If there's an error loading the image, use a placeholder text
                 photo_cell = Paragraph("No Photo", styles["Normal"])
@@ -5690,13 +11773,18 @@ def generate_program_student_list(program, level, students_df):
     return filename
 
 
-def download_receipts():
-    temp_dir = "temp_receipts"
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
+def download_receipts(incremental=False):
+    """
+    Exports all student and course registration receipts as a ZIP.
+
+    Args:
+        incremental: Only include receipts changed since the last receipts export
 
+    Returns:
+        Path of the ZIP file, or None on failure or when nothing changed
+    """
     try:
-        conn = sqlite3.connect("student_registration.db")
+        conn = connect_db()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -5720,25 +11808,24 @@ def download_receipts():
         )
         registration_receipts = cursor.fetchall()
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"all_receipts_{timestamp}.zip"
-
-        with zipfile.ZipFile(zip_filename, "w") as zipf:
-            for receipt in student_receipts:
-                student_id, surname, other_names, receipt_path, amount = receipt
-                if receipt_path and os.path.exists(receipt_path):
-                    _, ext = os.path.splitext(receipt_path)
-                    archive_path = f"student_receipts/{student_id}_{surname}_{other_names}_amount_{amount}{ext}"
-                    zipf.write(receipt_path, archive_path)
-
-            for receipt in registration_receipts:
-                reg_id, student_id, surname, other_names, receipt_path, amount = receipt
-                if receipt_path and os.path.exists(receipt_path):
-                    _, ext = os.path.splitext(receipt_path)
-                    archive_path = f"registration_receipts/reg_{reg_id}_{student_id}_{surname}_{other_names}_amount_{amount}{ext}"
-                    zipf.write(receipt_path, archive_path)
+        archive = StreamingArchive("all_receipts", incremental=incremental)
+        for receipt in student_receipts:
+            student_id, surname, other_names, receipt_path, amount = receipt
+            _, ext = os.path.splitext(receipt_path)
+            archive.add(
+                receipt_path,
+                f"student_receipts/{student_id}_{surname}_{other_names}_amount_{amount}{ext}",
+            )
 
-        return zip_filename
+        for receipt in registration_receipts:
+            reg_id, student_id, surname, other_names, receipt_path, amount = receipt
+            _, ext = os.path.splitext(receipt_path)
+            archive.add(
+                receipt_path,
+                f"registration_receipts/reg_{reg_id}_{student_id}_{surname}_{other_names}_amount_{amount}{ext}",
+            )
+
+        return archive.build()
 
     except Exception as e:
         print(f"Error creating receipts zip file: {str(e)}")
@@ -5746,11 +11833,9 @@ def download_receipts():
 
     finally:
         conn.close()
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
 
 
-def save_uploaded_file(uploaded_file, directory):
+def save_uploaded_file(uploaded_file, directory, owner=None):
     """
     Save an uploaded file, compressing it if it exceeds 6MB.
     """
@@ -5758,7 +11843,7 @@ def save_uploaded_file(uploaded_file, directory):
         return None
         
     # Use the new compression utility
-    return save_compressed_file(uploaded_file, directory, max_size_mb=6.0)
+    return save_compressed_file(uploaded_file, directory, max_size_mb=6.0, owner=owner)
 
 
 def insert_student_info(c, form_data, file_paths):
@@ -5847,13 +11932,13 @@ def send_emails():
     selected_programmes = []
     if recipient_type == "By Programme":
         selected_programmes = st.multiselect(
-            "Select Programme(s)", options=["CIMG", "CIM-UK", "ICAG", "ACCA"]
+            "Select Programme(s)", options=get_course_catalog().programmes
         )
     elif recipient_type == "Individual Student":
         individual_id = st.text_input("Enter Student ID")
 
     if st.button("Send Email"):
-        conn = sqlite3.connect("student_registration.db")
+        conn = connect_db()
         cur = conn.cursor()
         recipients = []
         if recipient_type == "All Students":
@@ -5883,35 +11968,502 @@ def send_emails():
             st.error("No email addresses found for the selected criteria.")
             return
 
+        attachment_path = (
+            save_uploaded_file(attachment_file, EMAIL_ATTACHMENT_DIR)
+            if attachment_file is not None
+            else None
+        )
+        batch_id = EmailOutbox().enqueue(recipients, subject, message_body, attachment_path)
+        submit_job(
+            "send_emails",
+            {"batch_id": batch_id},
+            state_key="send_emails_job",
+            title=f"Email: {subject}" if subject else None,
+        )
+
+    render_job_status("send_emails_job")
+    render_email_batches()
+
+
+def render_email_batches():
+    """Recent email batches with per-recipient status, resume and retry of failures"""
+    outbox = EmailOutbox()
+    batches = outbox.list_batches()
+    if batches.empty:
+        return
+    st.subheader("Recent Emails")
+    st.dataframe(batches, hide_index=True)
+    batch_id = st.selectbox("Recipients of batch", batches["batch_id"].tolist())
+    st.dataframe(outbox.recipient_status(batch_id), hide_index=True)
+    summary = outbox.batch_summary(batch_id)
+    sending = any(
+        job["job_type"] == "send_emails"
+        and job["status"] not in JOB_FINISHED_STATUSES
+        and json.loads(job["params"] or "{}").get("batch_id") == batch_id
+        for job in get_job_manager().list_jobs()
+    )
+    if sending:
+        st.caption("This batch is being sent")
+        return
+    # A cancelled or interrupted send leaves its remaining recipients queued
+    if summary["queued"] and st.button("Resume Sending"):
+        submit_job(
+            "send_emails",
+            {"batch_id": batch_id},
+            state_key="send_emails_job",
+            title=f"Email resume (batch {batch_id})",
+        )
+    if summary["failed"] and st.button("Retry Failed Recipients"):
+        outbox.requeue_failed(batch_id)
+        submit_job(
+            "send_emails",
+            {"batch_id": batch_id},
+            state_key="send_emails_job",
+            title=f"Email retry (batch {batch_id})",
+        )
+
+
+#################
+# Email Outbox  #
+#################
+#
+# Emails are written to a persistent outbox (email_batches and
+# email_outbox) and delivered by EmailOutbox.deliver() over a small pool of
+# reused SMTP connections, rate limited, with per-recipient status and
+# retry with exponential backoff. A batch that was interrupted or had
+# failures can be delivered again; only queued rows are sent.
+
+EMAIL_ATTACHMENT_DIR = os.path.join("uploads", "email_attachments")
+EMAIL_STATUS_WRITE_BATCH = 50  # Status rows written per commit
+
+
+class SMTPConnectionPool:
+    """
+    Up to `size` SMTP sessions shared by worker threads. A session is
+    returned to the pool after a successful send and dropped after any
+    error, so a broken connection is never reused.
+
+    Sessions are encrypted before logging in: with implicit TLS when
+    use_ssl is set, otherwise with STARTTLS, which fails the connection if
+    the server does not offer it. use_tls=False (plain SMTP, logging in
+    only if the server advertises AUTH) is meant for a local test server.
+    """
+
+    def __init__(
+        self,
+        host: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = SMTP_PASSWORD,
+        size: int = SMTP_POOL_SIZE,
+        timeout: float = 30,
+        use_tls: bool = SMTP_USE_TLS,
+        use_ssl: bool = SMTP_USE_SSL,
+    ):
+        import queue
+
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        import ssl
+
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(
+                self.host, self.port, timeout=self.timeout, context=ssl.create_default_context()
+            )
+            server.ehlo()
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            server.ehlo()
+            if self.use_tls:
+                # Raises SMTPNotSupportedError rather than continue unencrypted
+                server.starttls(context=ssl.create_default_context())
+                server.ehlo()
+        encrypted = self.use_ssl or self.use_tls
+        if self.username and self.password and (encrypted or server.has_extn("auth")):
+            server.login(self.username, self.password)
+        self.connections_opened += 1
+        return server
+
+    @contextmanager
+    def connection(self):
+        import queue
+
+        with self._slots:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                server = self._connect()
+            try:
+                yield server
+            except BaseException:
+                try:
+                    server.close()
+                except Exception:
+                    pass
+                raise
+            self._idle.put(server)
+
+    def close(self):
+        import queue
+
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+
+class RateLimiter:
+    """Spaces calls to acquire() at most `rate` per second across threads"""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _is_transient_smtp_error(error: Exception) -> bool:
+    """Connection errors and 4xx replies are retried; 5xx replies are permanent"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+class EmailOutbox:
+    """
+    Persistent outbox for bulk email.
+
+    Example:
+        outbox = EmailOutbox()
+        batch_id = outbox.enqueue(["a@example.com"], "Subject", "Body")
+        outbox.deliver(batch_id)
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        host: str = SMTP_SERVER,
+        port: int = SMTP_PORT,
+        username: Optional[str] = SMTP_USERNAME,
+        password: Optional[str] = SMTP_PASSWORD,
+        sender: Optional[str] = None,
+        pool_size: int = SMTP_POOL_SIZE,
+        rate_per_second: Optional[float] = EMAIL_RATE_PER_SECOND,
+        max_attempts: int = EMAIL_MAX_ATTEMPTS,
+        retry_delay: float = EMAIL_RETRY_DELAY,
+        use_tls: bool = SMTP_USE_TLS,
+        use_ssl: bool = SMTP_USE_SSL,
+    ):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.pool_size = pool_size
+        self.rate_per_second = rate_per_second
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+
+    def enqueue(self, recipients, subject: str, body: str, attachment_path: Optional[str] = None) -> int:
+        """
+        Stores a batch and one queued row per distinct recipient.
+
+        Returns:
+            The batch ID
+        """
+        recipients = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+        conn = connect_db(self.db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            batch_id = conn.execute(
+                """
+                INSERT INTO email_batches (subject, body, attachment_path, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (subject, body, attachment_path, _now_text()),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO email_outbox (batch_id, recipient) VALUES (?, ?)",
+                [(batch_id, recipient) for recipient in recipients],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return batch_id
+
+    def _build_message(self, recipient: str, subject: str, body: str, attachment) -> str:
+        msg = MIMEMultipart()
+        msg["From"] = self.sender
+        msg["To"] = recipient
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+        if attachment is not None:
+            msg.attach(attachment)
+        return msg.as_string()
+
+    def _send(self, pool: SMTPConnectionPool, limiter: RateLimiter, row, batch, attachment):
+        """Sends one queued row; returns (outbox_id, attempts, error or None, transient)"""
+        outbox_id, recipient, attempts = row
+        limiter.acquire()
+        try:
+            message = self._build_message(recipient, batch["subject"], batch["body"], attachment)
+            with pool.connection() as server:
+                server.sendmail(self.sender, [recipient], message)
+            return outbox_id, attempts + 1, None, False
+        except Exception as e:
+            return outbox_id, attempts + 1, str(e), _is_transient_smtp_error(e)
+
+    def _write_statuses(self, conn, results):
+        sent, retry, failed = [], [], []
+        now = datetime.now()
+        for outbox_id, attempts, error, transient in results:
+            if error is None:
+                sent.append((attempts, now.isoformat(sep=" ", timespec="seconds"), outbox_id))
+            elif transient and attempts < self.max_attempts:
+                next_attempt = now + timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+                retry.append(
+                    (attempts, error, next_attempt.isoformat(sep=" ", timespec="seconds"), outbox_id)
+                )
+            else:
+                failed.append((attempts, error, outbox_id))
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL WHERE outbox_id = ?",
+            sent,
+        )
+        conn.executemany(
+            "UPDATE email_outbox SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE outbox_id = ?",
+            retry,
+        )
+        conn.executemany(
+            "UPDATE email_outbox SET status = 'failed', attempts = ?, last_error = ? WHERE outbox_id = ?",
+            failed,
+        )
+        conn.commit()
+        return len(sent) + len(failed)
+
+    def deliver(self, batch_id: int, progress_callback=None) -> Dict[str, Any]:
+        """
+        Sends every queued row of a batch, retrying transient failures with
+        exponential backoff until they succeed or run out of attempts.
+
+        The attachment is read and base64-encoded once for the whole batch.
+        Statuses are written by the calling thread in batches; if
+        progress_callback raises (e.g. a cancelled job), in-flight sends
+        finish and are recorded and the remaining rows stay queued.
+
+        Args:
+            batch_id: Batch returned by enqueue()
+            progress_callback: Optional callable(done, total) with done
+                counting sent and permanently failed recipients
+
+        Returns:
+            batch_summary() plus connections opened and elapsed seconds
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+        conn = connect_db(self.db_path)
+        conn.row_factory = sqlite3.Row
+        batch = conn.execute("SELECT * FROM email_batches WHERE batch_id = ?", (batch_id,)).fetchone()
+        conn.row_factory = None
+        if batch is None:
+            conn.close()
+            raise ValueError(f"Unknown email batch: {batch_id}")
+
+        attachment = None
+        if batch["attachment_path"]:
+            with open(batch["attachment_path"], "rb") as f:
+                attachment = MIMEApplication(f.read(), _subtype="pdf")
+            attachment.add_header(
+                "Content-Disposition",
+                "attachment",
+                filename=get_upload_store().original_name(batch["attachment_path"], conn),
+            )
+
+        pool = SMTPConnectionPool(
+            self.host,
+            self.port,
+            self.username,
+            self.password,
+            size=self.pool_size,
+            use_tls=self.use_tls,
+            use_ssl=self.use_ssl,
+        )
+        limiter = RateLimiter(self.rate_per_second)
+        executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="smtp")
+        started = time.perf_counter()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM email_outbox WHERE batch_id = ?", (batch_id,)
+        ).fetchone()[0]
+        done = conn.execute(
+            "SELECT COUNT(*) FROM email_outbox WHERE batch_id = ? AND status != 'queued'",
+            (batch_id,),
+        ).fetchone()[0]
+        try:
+            while True:
+                if progress_callback:
+                    progress_callback(done, total)
+                rows = conn.execute(
+                    """
+                    SELECT outbox_id, recipient, attempts FROM email_outbox
+                    WHERE batch_id = ? AND status = 'queued'
+                      AND (next_attempt_at IS NULL OR next_attempt_at <= ?)
+                    ORDER BY outbox_id
+                    """,
+                    (batch_id, _now_text()),
+                ).fetchall()
+                if not rows:
+                    next_attempt = conn.execute(
+                        "SELECT MIN(next_attempt_at) FROM email_outbox WHERE batch_id = ? AND status = 'queued'",
+                        (batch_id,),
+                    ).fetchone()[0]
+                    if next_attempt is None:
+                        break
+                    delay = (datetime.fromisoformat(next_attempt) - datetime.now()).total_seconds()
+                    time.sleep(min(max(delay, 0.1), 1.0))
+                    continue
+
+                futures = [
+                    executor.submit(self._send, pool, limiter, row, batch, attachment)
+                    for row in rows
+                ]
+                handled, results = set(), []
+                try:
+                    for future in as_completed(futures):
+                        handled.add(future)
+                        results.append(future.result())
+                        if len(results) >= EMAIL_STATUS_WRITE_BATCH:
+                            done += self._write_statuses(conn, results)
+                            results = []
+                            if progress_callback:
+                                progress_callback(done, total)
+                finally:
+                    # Record sends already in flight even when interrupted
+                    for future in futures:
+                        future.cancel()
+                    wait(futures)
+                    results += [
+                        future.result()
+                        for future in futures
+                        if future not in handled and not future.cancelled()
+                    ]
+                    done += self._write_statuses(conn, results)
+            summary = self.batch_summary(batch_id, conn)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            pool.close()
+            conn.close()
+        summary["connections_opened"] = pool.connections_opened
+        summary["seconds"] = time.perf_counter() - started
+        return summary
+
+    def batch_summary(self, batch_id: int, conn=None) -> Dict[str, int]:
+        """Recipient counts of a batch by status"""
+        own_conn = conn is None
+        conn = conn or connect_db(self.db_path)
+        try:
+            counts = dict(
+                conn.execute(
+                    "SELECT status, COUNT(*) FROM email_outbox WHERE batch_id = ? GROUP BY status",
+                    (batch_id,),
+                ).fetchall()
+            )
+        finally:
+            if own_conn:
+                conn.close()
+        return {
+            "batch_id": batch_id,
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "queued": counts.get("queued", 0),
+        }
+
+    def recipient_status(self, batch_id: int) -> pd.DataFrame:
+        """Per-recipient status, attempts and last error of a batch"""
+        conn = connect_db(self.db_path)
+        try:
+            return pd.read_sql_query(
+                """
+                SELECT recipient, status, attempts, last_error, sent_at
+                FROM email_outbox WHERE batch_id = ? ORDER BY outbox_id
+                """,
+                conn,
+                params=(batch_id,),
+            )
+        finally:
+            conn.close()
+
+    def requeue_failed(self, batch_id: int) -> int:
+        """Queues a batch's failed recipients again; returns how many"""
+        conn = connect_db(self.db_path)
+        try:
+            requeued = conn.execute(
+                """
+                UPDATE email_outbox
+                SET status = 'queued', attempts = 0, next_attempt_at = NULL
+                WHERE batch_id = ? AND status = 'failed'
+                """,
+                (batch_id,),
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        return requeued
+
+    def list_batches(self, limit: int = 20) -> pd.DataFrame:
+        """Recent batches with their recipient counts"""
+        conn = connect_db(self.db_path)
         try:
-            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            for recipient in recipients:
-                msg = MIMEMultipart()
-                msg["From"] = SMTP_USERNAME
-                msg["To"] = recipient
-                msg["Subject"] = subject
-                msg.attach(MIMEText(message_body, "plain"))
-
-                # If a PDF attachment was uploaded, attach it.
-                if attachment_file is not None:
-                    # Save the uploaded PDF temporarily if needed.
-                    attachment_path = save_uploaded_file(attachment_file, "uploads")
-                    if attachment_path and os.path.exists(attachment_path):
-                        with open(attachment_path, "rb") as f:
-                            pdf_attachment = MIMEApplication(f.read(), _subtype="pdf")
-                        pdf_attachment.add_header(
-                            "Content-Disposition",
-                            "attachment",
-                            filename=os.path.basename(attachment_path),
-                        )
-                        msg.attach(pdf_attachment)
-                server.sendmail(SMTP_USERNAME, recipient, msg.as_string())
-            server.quit()
-            st.success("Emails sent successfully!")
-        except Exception as e:
-            st.error(f"Error sending emails: {e}")
+            return pd.read_sql_query(
+                """
+                SELECT b.batch_id, b.subject, b.created_at,
+                       COUNT(o.outbox_id) AS recipients,
+                       SUM(o.status = 'sent') AS sent,
+                       SUM(o.status = 'failed') AS failed,
+                       SUM(o.status = 'queued') AS queued
+                FROM email_batches b
+                LEFT JOIN email_outbox o ON o.batch_id = b.batch_id
+                GROUP BY b.batch_id
+                ORDER BY b.batch_id DESC
+                LIMIT ?
+                """,
+                conn,
+                params=(limit,),
+            )
+        finally:
+            conn.close()
 
 
 ##############################
@@ -5919,57 +12471,189 @@ def send_emails():
 ##############################
 
 
-def generate_batch_pdfs(document_type="student_info"):
-    temp_dir = "temp_pdfs"
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
+def _safe_filename_part(value) -> str:
+    """Makes an ID usable inside a file name (IDs may contain slashes)"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(value)).strip("_") or "unknown"
 
-    try:
-        conn = sqlite3.connect("student_registration.db")
 
+def _batch_pdf_tasks(conn, document_type):
+    """
+    Prefetches every row a batch needs with a single query and returns the
+    render tasks in ID order: (document_type, zip entry name, row, student_info).
+    """
+    previous_factory = conn.row_factory
+    conn.row_factory = sqlite3.Row
+    try:
         if document_type == "student_info":
-            students_df = pd.read_sql_query("SELECT * FROM student_info", conn)
-            for _, student in students_df.iterrows():
-                try:
-                    pdf_file = generate_student_info_pdf(student)
-                    new_path = os.path.join(temp_dir, os.path.basename(pdf_file))
-                    shutil.move(pdf_file, new_path)
-                except Exception as e:
-                    print(
-                        f"Error generating PDF for student {student['student_id']}: {str(e)}"
+            rows = conn.execute(
+                "SELECT * FROM student_info ORDER BY student_id"
+            ).fetchall()
+            return [
+                (
+                    document_type,
+                    f"student_info_{_safe_filename_part(row['student_id'])}.pdf",
+                    dict(row, receipt_amount=row["receipt_amount"] or 0.0),
+                    None,
+                )
+                for row in rows
+            ]
+
+        rows = conn.execute(
+            """
+            SELECT cr.*, si.surname, si.other_names, si.passport_photo_path, si.email
+            FROM course_registration cr
+            LEFT JOIN student_info si ON cr.student_id = si.student_id
+            ORDER BY cr.registration_id
+            """
+        ).fetchall()
+        return [
+            (
+                document_type,
+                f"course_registration_{row['registration_id']}_"
+                f"{_safe_filename_part(row['student_id'])}.pdf",
+                dict(row, receipt_amount=row["receipt_amount"] or 0.0),
+                (
+                    (
+                        row["passport_photo_path"],
+                        row["surname"],
+                        row["other_names"],
+                        row["email"],
                     )
-                    continue
+                    if row["surname"] is not None
+                    else ()
+                ),
+            )
+            for row in rows
+        ]
+    finally:
+        conn.row_factory = previous_factory
+
 
+def _batch_pdf_worker_init():
+    """
+    Runs once in every forked worker. Locks another thread of the parent
+    held at fork time would stay locked forever in the child, so the ones
+    the renderers touch are replaced.
+    """
+    global _thumbnail_cache_lock, _pdf_cache_lock, _file_digests_lock
+    _thumbnail_cache_lock = threading.Lock()
+    _pdf_cache_lock = threading.Lock()
+    _file_digests_lock = threading.Lock()
+    for cache in (_thumbnail_cache, _pdf_cache):
+        if cache is not None:
+            cache._lock = threading.Lock()
+
+
+def _render_batch_pdf(task):
+    """
+    Renders (or fetches from the PDF cache) one batch PDF in memory.
+
+    Returns:
+        (entry name, bytes or None, error, whether it was a cache hit)
+    """
+    document_type, arcname, row, student_info = task
+    buffer = io.BytesIO()
+    hits_before = get_pdf_cache().metrics["hits"]
+    try:
+        if document_type == "student_info":
+            generate_student_info_pdf(row, buffer)
         else:
-            registrations_df = pd.read_sql_query(
-                """
-                SELECT cr.*, si.surname, si.other_names, si.passport_photo_path
-                FROM course_registration cr
-                LEFT JOIN student_info si ON cr.student_id = si.student_id
-            """,
-                conn,
-            )
+            generate_course_registration_pdf(row, buffer, student_info=student_info)
+        cache_hit = get_pdf_cache().metrics["hits"] > hits_before
+        return arcname, buffer.getvalue(), None, cache_hit
+    except Exception as e:
+        return arcname, None, str(e), False
 
-            for _, registration in registrations_df.iterrows():
-                try:
-                    pdf_file = generate_course_registration_pdf(registration)
-                    new_path = os.path.join(temp_dir, os.path.basename(pdf_file))
-                    shutil.move(pdf_file, new_path)
-                except Exception as e:
-                    print(
-                        f"Error generating PDF for registration {registration['registration_id']}: {str(e)}"
-                    )
-                    continue
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects container/affinity limits)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def fork_process_pool(task_count, max_workers=None, initializer=None):
+    """
+    Process pool sized for task_count tasks, or None to work in-process.
+
+    Workers are forked: Streamlit executes this script as __main__, so
+    spawned workers could not import the functions they run.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    workers = min(max_workers or available_cpus(), task_count)
+    if workers < 2:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=initializer,
+    )
+
+
+def _batch_pdf_executor(task_count, max_workers=None):
+    """Process pool for batch rendering, or None to render in-process"""
+    return fork_process_pool(task_count, max_workers, _batch_pdf_worker_init)
+
+
+def generate_batch_pdfs(
+    document_type="student_info", progress_callback=None, max_workers=None
+):
+    """
+    Renders every student info or course registration PDF and streams them
+    into a ZIP file.
+
+    All rows are prefetched in one query, then rendered in parallel worker
+    processes that each build the stylesheet and read the logo once. PDFs
+    never touch the disk before being written into the archive; entries are
+    named after the record IDs and written in ID order.
+
+    Args:
+        document_type: "student_info" or "course_registration"
+        progress_callback: Optional callable(done, total) invoked per PDF
+        max_workers: Number of worker processes (default: CPU count)
+
+    Returns:
+        Path of the ZIP file, or None on failure
+    """
+    try:
+        conn = connect_db()
+        try:
+            tasks = _batch_pdf_tasks(conn, document_type)
+        finally:
+            conn.close()
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         zip_filename = f"all_{document_type}_pdfs_{timestamp}.zip"
 
-        with zipfile.ZipFile(zip_filename, "w") as zipf:
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.basename(file_path)
-                    zipf.write(file_path, arcname)
+        executor = _batch_pdf_executor(len(tasks), max_workers)
+        try:
+            if executor:
+                # Small chunks keep workers busy while results stream back in order
+                chunksize = max(1, min(16, len(tasks) // (available_cpus() * 4)))
+                results = executor.map(_render_batch_pdf, tasks, chunksize=chunksize)
+            else:
+                results = map(_render_batch_pdf, tasks)
+
+            pdf_cache = get_pdf_cache()
+            with zipfile.ZipFile(zip_filename, "w") as zipf:
+                for done, (arcname, pdf_bytes, error, cache_hit) in enumerate(
+                    results, 1
+                ):
+                    if error:
+                        print(f"Error generating PDF {arcname}: {error}")
+                    else:
+                        zipf.writestr(arcname, pdf_bytes)
+                        if executor:
+                            # Workers count in their own process; mirror it here
+                            pdf_cache.metrics["hits" if cache_hit else "misses"] += 1
+                            if not cache_hit:
+                                pdf_cache.metrics["generated"] += 1
+                    if progress_callback:
+                        progress_callback(done, len(tasks))
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
 
         return zip_filename
 
@@ -5977,11 +12661,6 @@ def generate_batch_pdfs(document_type="student_info"):
         print(f"Error in batch PDF generation: {str(e)}")
         return None
 
-    finally:
-        conn.close()
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-
 
 
 
@@ -6160,13 +12839,11 @@ class DocumentUploadHandler:
         return None
 
     def _save_document(self, source_path: str, identifier: str, doc_type: str) -> str:
-        """Save a document to the uploads directory."""
+        """Save a document to the upload store."""
         ext = os.path.splitext(source_path)[1]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{identifier}_{doc_type}_{timestamp}{ext}"
-        dest_path = os.path.join(self.upload_base_dir, filename)
-        shutil.copy2(source_path, dest_path)
-        return dest_path
+        return get_upload_store(self.upload_base_dir).put_file(
+            source_path, f"{identifier}_{doc_type}{ext}", owner=identifier
+        )
 
     def _update_database(
         self,
@@ -6174,7 +12851,7 @@ class DocumentUploadHandler:
         reg_docs: Dict[str, Dict[str, str]],
     ):
         """Update database with new document paths."""
-        conn = sqlite3.connect("student_registration.db")
+        conn = connect_db()
         c = conn.cursor()
 
         try:
@@ -6195,6 +12872,7 @@ class DocumentUploadHandler:
                     c.execute(query, list(docs.values()) + [reg_id])
 
             conn.commit()
+            invalidate_query_cache("student_info", "course_registration")
 
         except Exception as e:
             conn.rollback()
@@ -6247,7 +12925,7 @@ class NotificationSystem:
         self.setup_notification_table()
 
     def setup_notification_table(self):
-        conn = sqlite3.connect("student_registration.db")
+        conn = connect_db()
         c = conn.cursor()
         c.execute(
             """
@@ -6278,6 +12956,20 @@ class NotificationSystem:
         conn.commit()
         conn.close()
 
+    def _audience(self, recipient_type, recipient_id) -> Tuple[str, tuple]:
+        """
+        SQL selecting the students a notification is addressed to.
+        Broadcasts only touch students that already have a counter row; the
+        others get theirs computed in full on first use (see unread_count).
+        """
+        if recipient_type == "student":
+            return "SELECT ?", (recipient_id,)
+        if recipient_type == "program":
+            return "SELECT student_id FROM student_info WHERE programme = ?", (recipient_id,)
+        if recipient_type == "all":
+            return "SELECT student_id FROM notification_counters", ()
+        return "SELECT NULL WHERE 0", ()
+
     def create_notification(
         self,
         title,
@@ -6288,39 +12980,82 @@ class NotificationSystem:
         metadata=None,
         expires_at=None,
     ):
-        conn = sqlite3.connect("student_registration.db")
-        c = conn.cursor()
-        c.execute(
-            """
-            INSERT INTO notifications (
-                recipient_id, recipient_type, title, message,
-                notification_type, metadata, expires_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                recipient_id,
-                recipient_type,
-                title,
-                message,
-                notification_type,
-                json.dumps(metadata) if metadata else None,
-                expires_at.isoformat() if expires_at else None,
-            ),
-        )
-        notification_id = c.lastrowid
-        conn.commit()
-        conn.close()
+        """Stores a notification and bumps the unread counter of every recipient"""
+        conn = connect_db()
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute(
+                """
+                INSERT INTO notifications (
+                    recipient_id, recipient_type, title, message,
+                    notification_type, metadata, expires_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    recipient_id,
+                    recipient_type,
+                    title,
+                    message,
+                    notification_type,
+                    json.dumps(metadata) if metadata else None,
+                    expires_at.isoformat() if expires_at else None,
+                ),
+            )
+            notification_id = c.lastrowid
+            audience, params = self._audience(recipient_type, recipient_id)
+            c.execute(
+                f"""
+                UPDATE notification_counters SET unread = unread + 1
+                WHERE student_id IN ({audience})
+                """,
+                params,
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
         return notification_id
 
     def get_notifications(
-        self, student_id: str, include_read: bool = False, limit: int = 50
+        self,
+        student_id: str,
+        include_read: bool = False,
+        limit: int = 50,
+        before_id: Optional[int] = None,
     ) -> List[Dict]:
-        """Get notifications for a specific student"""
-        conn = sqlite3.connect("student_registration.db")
+        """
+        Get notifications for a specific student, newest first.
+
+        Each recipient type is read through its own index range and the
+        student's programme is looked up once. Pass the ID of the last
+        notification shown as before_id to fetch the next page.
+        """
+        conn = connect_db()
         c = conn.cursor()
 
         try:
-            query = """
+            row = c.execute(
+                "SELECT programme FROM student_info WHERE student_id = ?", (student_id,)
+            ).fetchone()
+            programme = row[0] if row else None
+            page = "" if before_id is None else "AND notification_id < :before_id"
+
+            query = f"""
+                WITH addressed AS (
+                    SELECT notification_id FROM notifications
+                    WHERE recipient_type = 'student' AND recipient_id = :student_id
+                      {page}
+                    UNION ALL
+                    SELECT notification_id FROM notifications
+                    WHERE recipient_type = 'program' AND recipient_id = :programme
+                      {page}
+                    UNION ALL
+                    SELECT notification_id FROM notifications
+                    WHERE recipient_type = 'all' {page}
+                )
                 SELECT 
                     n.notification_id,
                     n.title,
@@ -6328,35 +13063,30 @@ class NotificationSystem:
                     n.notification_type,
                     n.created_at,
                     n.metadata,
-                    CASE 
-                        WHEN nr.read_at IS NOT NULL THEN 1 
-                        ELSE 0 
-                    END as is_read
-                FROM notifications n
+                    nr.notification_id IS NOT NULL AS is_read
+                FROM addressed a
+                JOIN notifications n ON n.notification_id = a.notification_id
                 LEFT JOIN notification_reads nr 
-                    ON n.notification_id = nr.notification_id 
-                    AND nr.student_id = ?
-                WHERE (
-                    n.recipient_id = ? 
-                    OR n.recipient_type = 'all'
-                    OR (
-                        n.recipient_type = 'program' 
-                        AND n.recipient_id = (
-                            SELECT programme 
-                            FROM student_info 
-                            WHERE student_id = ?
-                        )
-                    )
-                )
-                AND (n.expires_at IS NULL OR n.expires_at > datetime('now'))
+                    ON nr.notification_id = n.notification_id
+                    AND nr.student_id = :student_id
+                WHERE (n.expires_at IS NULL OR n.expires_at > :now)
             """
 
             if not include_read:
-                query += " AND nr.read_at IS NULL"
+                query += " AND nr.notification_id IS NULL"
 
-            query += " ORDER BY n.created_at DESC LIMIT ?"
+            query += " ORDER BY n.notification_id DESC LIMIT :limit"
 
-            c.execute(query, (student_id, student_id, student_id, limit))
+            c.execute(
+                query,
+                {
+                    "student_id": student_id,
+                    "programme": programme,
+                    "before_id": before_id,
+                    "now": datetime.now().isoformat(),
+                    "limit": limit,
+                },
+            )
 
             notifications = []
             for row in c.fetchall():
@@ -6375,52 +13105,202 @@ class NotificationSystem:
         finally:
             conn.close()
 
-    def mark_as_read(self, notification_id, student_id):
-        conn = sqlite3.connect("student_registration.db")
-        c = conn.cursor()
-        c.execute(
-            "INSERT OR IGNORE INTO notification_reads (notification_id, student_id) VALUES (?, ?)",
-            (notification_id, student_id),
-        )
-        conn.commit()
-        conn.close()
-
-    def mark_all_as_read(self, student_id):
-        conn = sqlite3.connect("student_registration.db")
-        c = conn.cursor()
-        c.execute(
+    def _count_unread(self, conn, student_id: str) -> int:
+        """Unread notifications addressed to a student, counted in full"""
+        return conn.execute(
             """
-            INSERT INTO notification_reads (notification_id, student_id)
-            SELECT n.notification_id, ?
-            FROM notifications n
-            LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id AND nr.student_id = ?
-            WHERE nr.read_at IS NULL AND (
-                n.recipient_id = ? OR n.recipient_type = 'all' OR (
-                    n.recipient_type = 'program' AND n.recipient_id = (
-                        SELECT programme FROM student_info WHERE student_id = ?
+            SELECT COUNT(*) FROM notifications n
+            WHERE (
+                (n.recipient_type = 'student' AND n.recipient_id = :student_id)
+                OR (
+                    n.recipient_type = 'program'
+                    AND n.recipient_id = (
+                        SELECT programme FROM student_info WHERE student_id = :student_id
                     )
                 )
+                OR n.recipient_type = 'all'
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM notification_reads nr
+                WHERE nr.notification_id = n.notification_id AND nr.student_id = :student_id
             )
             """,
-            (student_id, student_id, student_id, student_id),
-        )
-        conn.commit()
-        conn.close()
+            {"student_id": student_id},
+        ).fetchone()[0]
+
+    def unread_count(self, student_id: str) -> int:
+        """
+        Unread badge count from the student's counter row, which is kept
+        up to date by create, read and delete. A missing row (new student,
+        programme change) is computed in full once and stored.
+
+        Expired notifications count until purge_expired() removes them.
+        """
+        conn = connect_db()
+        try:
+            row = conn.execute(
+                "SELECT unread FROM notification_counters WHERE student_id = ?",
+                (student_id,),
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            conn.execute("BEGIN IMMEDIATE")
+            unread = self._count_unread(conn, student_id)
+            conn.execute(
+                "INSERT OR REPLACE INTO notification_counters (student_id, unread) VALUES (?, ?)",
+                (student_id, unread),
+            )
+            conn.commit()
+            return unread
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def mark_as_read(self, notification_id, student_id):
+        conn = connect_db()
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute(
+                "INSERT OR IGNORE INTO notification_reads (notification_id, student_id) VALUES (?, ?)",
+                (notification_id, student_id),
+            )
+            if c.rowcount:
+                c.execute(
+                    """
+                    UPDATE notification_counters SET unread = MAX(unread - 1, 0)
+                    WHERE student_id = ?
+                    """,
+                    (student_id,),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def mark_all_as_read(self, student_id):
+        conn = connect_db()
+        try:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            c.execute(
+                """
+                INSERT OR IGNORE INTO notification_reads (notification_id, student_id)
+                SELECT n.notification_id, :student_id
+                FROM notifications n
+                WHERE (n.recipient_type = 'student' AND n.recipient_id = :student_id)
+                   OR (n.recipient_type = 'program' AND n.recipient_id = (
+                        SELECT programme FROM student_info WHERE student_id = :student_id
+                   ))
+                   OR n.recipient_type = 'all'
+                """,
+                {"student_id": student_id},
+            )
+            c.execute(
+                "INSERT OR REPLACE INTO notification_counters (student_id, unread) VALUES (?, 0)",
+                (student_id,),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _remove_notifications(self, conn, notification_ids):
+        """Deletes notifications, taking them off their unread readers' counters"""
+        for notification_id in notification_ids:
+            row = conn.execute(
+                "SELECT recipient_type, recipient_id FROM notifications WHERE notification_id = ?",
+                (notification_id,),
+            ).fetchone()
+            if row is None:
+                continue
+            audience, params = self._audience(*row)
+            conn.execute(
+                f"""
+                UPDATE notification_counters SET unread = MAX(unread - 1, 0)
+                WHERE student_id IN ({audience})
+                  AND student_id NOT IN (
+                      SELECT student_id FROM notification_reads WHERE notification_id = ?
+                  )
+                """,
+                params + (notification_id,),
+            )
+            conn.execute(
+                "DELETE FROM notification_reads WHERE notification_id = ?",
+                (notification_id,),
+            )
+            conn.execute(
+                "DELETE FROM notifications WHERE notification_id = ?", (notification_id,)
+            )
 
     def delete_notification(self, notification_id):
-        conn = sqlite3.connect("student_registration.db")
-        c = conn.cursor()
-        c.execute(
-            "DELETE FROM notification_reads WHERE notification_id = ?",
-            (notification_id,),
-        )
-        c.execute(
-            "DELETE FROM notifications WHERE notification_id = ?", (notification_id,)
-        )
-        conn.commit()
-        conn.close()
+        conn = connect_db()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._remove_notifications(conn, [notification_id])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def purge_expired(self) -> int:
+        """Deletes expired notifications and their reads; returns how many"""
+        conn = connect_db()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT notification_id FROM notifications WHERE expires_at <= ?",
+                    (datetime.now().isoformat(),),
+                )
+            ]
+            self._remove_notifications(conn, expired)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(expired)
 
 
+NOTIFICATION_PURGE_INTERVAL = 15 * 60  # Seconds between expired-notification purges
+NOTIFICATION_PAGE_SIZE = 20
+
+_notification_purger = None
+_notification_purger_lock = threading.Lock()
+
+
+def start_notification_purger(interval: float = NOTIFICATION_PURGE_INTERVAL):
+    """Starts (once per process) a daemon thread purging expired notifications"""
+    global _notification_purger
+
+    def purge_forever():
+        while True:
+            try:
+                purged = NotificationSystem().purge_expired()
+                if purged:
+                    logging.info(f"Purged {purged} expired notifications")
+            except Exception:
+                logging.exception("Purging expired notifications failed")
+            time.sleep(interval)
+
+    with _notification_purger_lock:
+        if _notification_purger is None:
+            _notification_purger = threading.Thread(
+                target=purge_forever, name="notification-purger", daemon=True
+            )
+            _notification_purger.start()
+
 def display_notifications(notifications: List[Dict]):
     """Display notifications in the Streamlit UI"""
     if not notifications:
@@ -6464,16 +13344,10 @@ def admin_notification_interface():
         recipient_id = None
         if recipient_type == "program":
             recipient_id = st.selectbox(
-                "Select Program", ["CIMG", "CIM-UK", "ICAG", "ACCA"]
+                "Select Program", get_course_catalog().programmes
             )
         elif recipient_type == "student":
-            conn = sqlite3.connect("student_registration.db")
-            c = conn.cursor()
-            c.execute(
-                "SELECT student_id, surname, other_names FROM student_info ORDER BY surname, other_names"
-            )
-            students = c.fetchall()
-            conn.close()
+            students = list(get_student_options().itertuples(index=False, name=None))
             if students:
                 options = [
                     f"{id} - {surname} {other_names}"
@@ -6546,7 +13420,7 @@ def admin_notification_interface():
                 st.error(f"Error creating notification: {str(e)}")
 
     with tab2:
-        conn = sqlite3.connect("student_registration.db")
+        conn = connect_db()
         c = conn.cursor()
         c.execute(
             """
@@ -6581,8 +13455,9 @@ def admin_notification_interface():
 
 
 # Fetch Student Information from Database
+@query_cache.cached("student_info")
 def get_student_info(student_id):
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
     query = "SELECT * FROM student_info WHERE student_id = ?"
     student = pd.read_sql(query, conn, params=(student_id,)).to_dict("records")
     conn.close()
@@ -6591,7 +13466,7 @@ def get_student_info(student_id):
 
 def get_student_registrations(student_id: str) -> list:
     # Retrieve course registrations for student.
-    conn = sqlite3.connect("student_registration.db")
+    conn = connect_db()
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute(
@@ -6610,8 +13485,11 @@ def display_profile(student):
         if student.get("passport_photo_path") and os.path.exists(
             student["passport_photo_path"]
         ):
-            img = PILImage.open(student["passport_photo_path"])
-            st.image(img, width=200, caption="Profile Photo")
+            st.image(
+                thumbnail_path(student["passport_photo_path"]),
+                width=200,
+                caption="Profile Photo",
+            )
         else:
             st.image("https://via.placeholder.com/200", caption="Profile Photo")
     with col2:
@@ -6635,11 +13513,8 @@ def display_courses(registrations: list):
                 f"**Level:** {reg.get('level', '')} | **Semester:** {reg.get('semester', '')}"
             )
             if reg.get("courses"):
-                courses = reg["courses"].split("\n")
-                for course in courses:
-                    if "|" in course:
-                        code, title, credits = course.split("|")
-                        st.write(f"- {code}: {title} ({credits} credits)")
+                for course in get_course_catalog().parse(reg["courses"]):
+                    st.write(f"- {course.code}: {course.title} ({course.credits} credits)")
             st.markdown("---")
     else:
         st.info("No course registrations found.")
@@ -6659,8 +13534,7 @@ def display_documents(student: dict):
         if doc_path and os.path.exists(doc_path):
             if doc_path.lower().endswith((".jpg", ".jpeg", ".png")):
                 try:
-                    img = PILImage.open(doc_path)
-                    st.image(img, width=200, caption=doc_name)
+                    st.image(thumbnail_path(doc_path), width=200, caption=doc_name)
                 except Exception as e:
                     st.error(f"Error displaying image: {e}")
             else:
@@ -6830,6 +13704,7 @@ class ZipFileCleanupHandler:
                 "temp_pdfs",
                 "temp_downloads",
                 "temp_import",
+                "exports",
                 "db_backups"
             ]
         
@@ -6887,43 +13762,12 @@ class ZipFileCleanupHandler:
 zip_cleanup_handler = ZipFileCleanupHandler()
 
 
-def get_student_info(student_id):
-    # Dummy implementation; replace with actual database retrieval
-    return {
-        "surname": "Doe",
-        "other_names": "John",
-        "student_id": student_id,
-        "programme": "Computer Science",
-        "email": "john.doe@example.com",
-        "telephone": "1234567890",
-        "residential_address": "123 Main St",
-        "postal_address": "PO Box 456",
-        "last_login": "2023-10-10",
-        "passport_photo_path": "path/to/photo.jpg",
-    }
-
-
-def get_student_registrations(student_id):
-    # Dummy implementation; replace with actual database retrieval
-    return [
-        {
-            "registration_id": 1,
-            "programme": "Computer Science",
-            "semester": "First",
-            "level": "1",
-            "academic_year": "2023/2024",
-            "courses": "CS101|Intro to CS|3\nCS102|Data Structures|3",
-        }
-    ]
-    
-
-
-
-
 def initialize_app():
     if "db_initialized" not in st.session_state:
         init_db()
         st.session_state.db_initialized = True
+    start_notification_purger()
+    start_upload_gc()
 
     if "admin_logged_in" not in st.session_state:
         st.session_state.admin_logged_in = False
@@ -6932,8 +13776,8 @@ def initialize_app():
 
 class RegistrationConstraintsManager:
     """
-    Manages registration constraints and storage cleanup.
-    Prevents duplicate submissions and cleans up old files.
+    Manages registration constraints.
+    Prevents duplicate submissions.
     """
 
     def __init__(self, db_path: str = "student_registration.db"):
@@ -6944,7 +13788,7 @@ class RegistrationConstraintsManager:
     def optimized_connection(self):
         conn = None
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect_db(self.db_path)
             yield conn
         finally:
             if conn:
@@ -7125,43 +13969,6 @@ class RegistrationConstraintsManager:
             )
             return cursor.fetchone() is not None
 
-    def cleanup_old_files(self, days_old: int = 30):
-        """
-        Remove files in the uploads directory that are older than 'days_old'
-        and are not referenced in the database.
-        """
-        with self.optimized_connection() as conn:
-            cursor = conn.cursor()
-            # Both SELECT statements are now modified to return three columns.
-            cursor.execute(
-                """
-                    SELECT ghana_card_path, passport_photo_path, certificate_path
-                    FROM student_info
-                    UNION
-                    SELECT receipt_path, NULL, NULL
-                    FROM course_registration
-                    """
-            )
-            db_files = set()
-            for row in cursor.fetchall():
-                # Update the set with each value in the tuple if it exists.
-                db_files.update(path for path in row if path)
-
-        uploads_dir = "uploads"
-        if os.path.exists(uploads_dir):
-            current_time = datetime.now().timestamp()
-            for filename in os.listdir(uploads_dir):
-                file_path = os.path.join(uploads_dir, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getmtime(file_path)
-                    # Remove file if it is older than days_old and not referenced in db_files.
-                    if file_age > (days_old * 86400) and file_path not in db_files:
-                        try:
-                            os.remove(file_path)
-                            print(f"Removed old file: {file_path}")
-                        except Exception as e:
-                            print(f"Error removing file {file_path}: {str(e)}")
-
 
 def admin_login():
     st.sidebar.subheader("Admin Login")
@@ -7181,10 +13988,6 @@ def admin_login():
 def main():
     initialize_app()
 
-    # Call cleanup for old files at app startup
-    rc_manager = RegistrationConstraintsManager()
-    rc_manager.cleanup_old_files(days_old=30)
-
     # Display admin login if not logged in.
     if not st.session_state.get("admin_logged_in", False):
         admin_login()